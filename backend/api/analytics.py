@@ -0,0 +1,119 @@
+import math
+from collections import defaultdict
+from decimal import Decimal
+
+from django.conf import settings
+from django.db import IntegrityError, transaction
+from django.db.models import F, Sum
+from django.db.models.functions import TruncMonth, TruncWeek
+
+from .models import MarketPriceBand, MarketRollup
+
+
+DIMENSIONS = ('all', 'vintage', 'location', 'project', 'seller')
+
+PERIODS = {
+    'day': F('day'),
+    'week': TruncWeek('day'),
+    'month': TruncMonth('day'),
+}
+
+TOTALS = ('listings', 'listed_tonnes', 'trades', 'sold_tonnes', 'volume')
+
+
+def dimension_keys(project, seller_id):
+    """
+    Returns the (dimension, key) pairs an event on `project` (a dict with id, vintage and
+    location) by `seller_id` counts towards.
+    """
+    return [
+        ('all', ''),
+        ('vintage', str(project['vintage'])),
+        ('location', project['location'].strip()),
+        ('project', str(project['id'])),
+        ('seller', str(seller_id)),
+    ]
+
+
+def price_band(price):
+    return math.floor(math.log(price) / math.log(settings.ANALYTICS_PRICE_BAND_RATIO))
+
+
+def band_price(band):
+    """
+    Geometric middle of a price band, within half a band of any price in it.
+    """
+    return Decimal(settings.ANALYTICS_PRICE_BAND_RATIO ** (band + 0.5)).quantize(Decimal('0.01'))
+
+
+def _increment(model, lookup, **deltas):
+    """
+    Adds `deltas` to the row matching `lookup`, creating it on first use.
+    """
+    updates = {name: F(name) + value for name, value in deltas.items()}
+    if model.objects.filter(**lookup).update(**updates):
+        return
+    try:
+        with transaction.atomic():
+            model.objects.create(**lookup, **deltas)
+    except IntegrityError:
+        # Another worker created the row first.
+        model.objects.filter(**lookup).update(**updates)
+
+
+def record_listing(day, project, seller_id, quantity):
+    for dimension, key in dimension_keys(project, seller_id):
+        _increment(MarketRollup, {'dimension': dimension, 'key': key, 'day': day}, listings=1, listed_tonnes=quantity)
+
+
+def record_sale(day, project, seller_id, price, quantity):
+    band = price_band(price) if price > 0 else None
+    for dimension, key in dimension_keys(project, seller_id):
+        lookup = {'dimension': dimension, 'key': key, 'day': day}
+        _increment(MarketRollup, lookup, trades=1, sold_tonnes=quantity, volume=price * quantity)
+        if band is not None:
+            _increment(MarketPriceBand, {**lookup, 'band': band}, sold_tonnes=quantity)
+
+
+def summarize(dimension, start=None, end=None, keys=None, period=None):
+    """
+    Returns marketplace totals per key of `dimension` (and per period, if given) between
+    the `start` and `end` dates inclusive, with average and median price per tonne.
+
+    Reads one row per key and day from the rollups, never the listings themselves. Medians
+    come from the price-band histogram, so they are exact to within half a band.
+    """
+    rows = MarketRollup.objects.filter(dimension=dimension)
+    bands = MarketPriceBand.objects.filter(dimension=dimension)
+    if start:
+        rows, bands = rows.filter(day__gte=start), bands.filter(day__gte=start)
+    if end:
+        rows, bands = rows.filter(day__lte=end), bands.filter(day__lte=end)
+    if keys is not None:
+        rows, bands = rows.filter(key__in=keys), bands.filter(key__in=keys)
+    group = ['key']
+    if period:
+        rows, bands = rows.annotate(period=PERIODS[period]), bands.annotate(period=PERIODS[period])
+        group.append('period')
+
+    histograms = defaultdict(list)
+    for band in bands.values(*group, 'band').annotate(tonnes=Sum('sold_tonnes')).order_by('band'):
+        histograms[tuple(band[name] for name in group)].append((band['band'], band['tonnes']))
+
+    results = []
+    for row in rows.values(*group).annotate(**{name: Sum(name) for name in TOTALS}).order_by(*group):
+        sold = row['sold_tonnes']
+        row['average_price'] = (row['volume'] / sold).quantize(Decimal('0.01')) if sold else None
+        row['median_price'] = _median(histograms[tuple(row[name] for name in group)])
+        results.append(row)
+    return results
+
+
+def _median(histogram):
+    total = sum(tonnes for _, tonnes in histogram)
+    seen = 0
+    for band, tonnes in histogram:
+        seen += tonnes
+        if seen * 2 >= total:
+            return band_price(band)
+    return None
@@ -1,6 +1,21 @@
 from django.apps import AppConfig
+from django.db.models.signals import post_migrate
+
+
+def ensure_search_index(sender, using, **kwargs):
+    # SQLite table remakes in later migrations drop the FTS triggers; put them back.
+    from django.db import connections
+    from .search import install_search_index
+    connection = connections[using]
+    if connection.vendor == 'sqlite' and 'api_project' in connection.introspection.table_names():
+        install_search_index(connection)
 
 
 class ApiConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'api'
+
+    def ready(self):
+        post_migrate.connect(ensure_search_index, sender=self)
+        # Registers the outbox handlers.
+        from . import outbox_handlers  # noqa: F401
@@ -0,0 +1,206 @@
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.core.exceptions import ObjectDoesNotExist
+from django.db.models import Q
+from django.http import HttpResponse, StreamingHttpResponse
+from django.views import View
+from rest_framework import exceptions
+from rest_framework.renderers import JSONRenderer
+from rest_framework.request import Request
+
+from .cache import listing_feed_cache
+from .filters import ListingFilterBackend
+from .models import CarbonCredit, Listing, Project
+from .pagination import CreatedAtCursorPagination
+from .prices import HBAR_USD, rate_cache, set_price_usd
+from .realtime import FEED_TOPICS, FeedFull, Subscription, broadcaster, stream
+from .serializers import CarbonCreditSerializer, ListingSerializer, ProjectSerializer
+from users.authentication import ReadOnlyClaimsJWTAuthentication
+from users.models import UserProfile
+from users.roles import aget_role
+
+
+class AsyncReadAPIView(View):
+    """
+    Base class for async (ASGI) read-only endpoints mirroring views in api/views.py.
+
+    Requests authenticate from the JWT claims alone and rows are loaded with the async ORM,
+    so while one request waits on the database or a slow client the worker serves others.
+    Serializers, filters and pagination are the ones the sync views use, so responses are
+    identical. Only bearer tokens are accepted (no session authentication), so a request
+    without one gets 401 with a WWW-Authenticate challenge where the sync view, which also
+    accepts sessions, answers 403 with the same body.
+    """
+    queryset = None
+    serializer_class = None
+    filter_backends = ()
+    allowed_roles = None  # None: any authenticated user
+    allow_anonymous = False
+
+    async def dispatch(self, request, *args, **kwargs):
+        # DRF's Request provides query_params to the shared filters and pagination.
+        self.request = Request(request)
+        try:
+            await self.check_access(self.request)
+            return await super().dispatch(request, *args, **kwargs)
+        except exceptions.APIException as exc:
+            return self.error_response(exc)
+
+    async def check_access(self, request):
+        authenticator = ReadOnlyClaimsJWTAuthentication()
+        result = authenticator.authenticate(request)
+        if result is None:
+            if self.allow_anonymous:
+                return
+            raise exceptions.NotAuthenticated()
+        request.user, request.auth = result
+        if self.allowed_roles is not None and await aget_role(request) not in self.allowed_roles:
+            raise exceptions.PermissionDenied()
+
+    def get_queryset(self):
+        return self.queryset.all()
+
+    def filter_queryset(self, queryset):
+        for backend in self.filter_backends:
+            queryset = backend().filter_queryset(self.request, queryset, self)
+        return self.serializer_class.setup_eager_loading(queryset)
+
+    def get_serializer(self, *args, **kwargs):
+        return self.serializer_class(*args, context={'request': self.request, 'view': self}, **kwargs)
+
+    def render(self, data, status=200):
+        return HttpResponse(JSONRenderer().render(data), status=status, content_type='application/json')
+
+    def error_response(self, exc):
+        data = exc.detail if isinstance(exc.detail, (list, dict)) else {'detail': exc.detail}
+        response = self.render(data, status=exc.status_code)
+        if isinstance(exc, (exceptions.NotAuthenticated, exceptions.AuthenticationFailed)):
+            response['WWW-Authenticate'] = ReadOnlyClaimsJWTAuthentication().authenticate_header(self.request)
+        return response
+
+
+class AsyncListAPIView(AsyncReadAPIView):
+    pagination_class = CreatedAtCursorPagination
+
+    async def get(self, request, *args, **kwargs):
+        return self.render(await self.list(self.request))
+
+    async def list(self, request):
+        paginator = self.pagination_class()
+        page = await paginator.apaginate_queryset(self.filter_queryset(self.get_queryset()), request, view=self)
+        return paginator.get_paginated_response(self.get_serializer(page, many=True).data).data
+
+
+class AsyncRetrieveAPIView(AsyncReadAPIView):
+    async def get(self, request, pk):
+        try:
+            instance = await self.filter_queryset(self.get_queryset()).aget(pk=pk)
+        except ObjectDoesNotExist:
+            # Same message as the sync views' get_object_or_404.
+            raise exceptions.NotFound(f'No {self.queryset.model._meta.object_name} matches the given query.')
+        return self.render(self.get_serializer(instance).data)
+
+
+class AsyncListingListAPIView(AsyncListAPIView):
+    """
+    Async version of the public listings feed (GET of ListingListCreateAPIView).
+    """
+    queryset = Listing.objects.filter(is_active=True)
+    serializer_class = ListingSerializer
+    filter_backends = [ListingFilterBackend]
+    allow_anonymous = True
+
+    async def list(self, request):
+        data = await sync_to_async(listing_feed_cache.get)(request)
+        # Also loads the rate for ListingSerializer.price_usd, which reads it synchronously.
+        rate = await rate_cache.aget(HBAR_USD)
+        if data is None:
+            data = await super().list(request)
+            await sync_to_async(listing_feed_cache.set)(request, data)
+        if settings.LISTING_PRICE_USD:
+            set_price_usd(data['results'], rate)
+        return data
+
+
+class AsyncProjectDetailAPIView(AsyncRetrieveAPIView):
+    """
+    Async version of ProjectDetailAPIView.
+    """
+    queryset = Project.objects.all()
+    serializer_class = ProjectSerializer
+
+
+class AsyncNFTDetailView(AsyncRetrieveAPIView):
+    """
+    Async version of NFTDetailView.
+    """
+    queryset = CarbonCredit.objects.all()
+    serializer_class = CarbonCreditSerializer
+
+
+class AsyncUserNFTListView(AsyncListAPIView):
+    """
+    Async version of UserNFTListView.
+    """
+    serializer_class = CarbonCreditSerializer
+
+    def get_queryset(self):
+        return CarbonCredit.objects.filter(owner_id=self.request.user.id)
+
+
+class AsyncVerifierDashboardListAPIView(AsyncListAPIView):
+    """
+    Async version of VerifierDashboardListAPIView.
+    """
+    serializer_class = ProjectSerializer
+    allowed_roles = (UserProfile.Role.VERIFIER,)
+
+    def get_queryset(self):
+        return Project.objects.filter(
+            Q(status=Project.ProjectStatus.PENDING) | Q(verifier_id=self.request.user.id)
+        ).distinct()
+
+
+class MarketplaceStreamView(AsyncReadAPIView):
+    """
+    Server-sent events for the marketplace: listing-created, listing-sold, listing-withdrawn
+    and project-approved, pushed as they commit so clients need not poll the listings.
+    Filters, each a comma-separated list: `events`, `project`, `seller`, `vintage`.
+    Reconnecting clients send Last-Event-ID (or `?last_event_id=`) to get what they missed.
+    """
+    allow_anonymous = True
+
+    async def get(self, request, *args, **kwargs):
+        params = self.request.query_params
+        events = self._parse_list(params, 'events', str)
+        if events is not None and not events <= set(FEED_TOPICS.values()):
+            raise exceptions.ValidationError({'events': f'Must be among {", ".join(FEED_TOPICS.values())}.'})
+        subscription = Subscription(
+            events=events, projects=self._parse_list(params, 'project', int),
+            sellers=self._parse_list(params, 'seller', int), vintages=self._parse_list(params, 'vintage', int),
+        )
+        last_event_id = request.headers.get('Last-Event-ID') or params.get('last_event_id')
+        if last_event_id is not None and not last_event_id.isdigit():
+            raise exceptions.ValidationError({'last_event_id': 'A whole number is required.'})
+        try:
+            broadcaster.subscribe(subscription)
+        except FeedFull:
+            response = self.render({'detail': 'Too many open streams, retry later.'}, status=503)
+            response['Retry-After'] = str(settings.REALTIME_RETRY_MS // 1000)
+            return response
+
+        response = StreamingHttpResponse(
+            stream(subscription, last_event_id and int(last_event_id)), content_type='text/event-stream'
+        )
+        response['Cache-Control'] = 'no-cache'
+        # Tells nginx not to buffer the stream.
+        response['X-Accel-Buffering'] = 'no'
+        return response
+
+    def _parse_list(self, params, name, parse):
+        if not params.get(name):
+            return None
+        try:
+            return {parse(value.strip()) for value in params[name].split(',') if value.strip()}
+        except ValueError:
+            raise exceptions.ValidationError({name: 'A comma-separated list of whole numbers is required.'})
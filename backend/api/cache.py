@@ -0,0 +1,85 @@
+import hashlib
+import time
+
+from django.conf import settings
+from django.core.cache import caches
+from django.db import transaction
+
+
+class ListingFeedCache:
+    """
+    Read-through cache of the serialized public listings feed, one entry per page/filter URL.
+
+    Entries are keyed under a generation number; invalidating bumps the generation so every
+    cached page becomes unreachable at once and simply ages out of the backend. The backend
+    is whichever Django cache `LISTING_FEED_CACHE_ALIAS` points at (local memory in development,
+    Redis in production), so hit/miss counters are shared by all workers using it.
+    """
+    prefix = 'listing-feed'
+
+    def __init__(self, alias=None, timeout=None):
+        self.alias = alias
+        self.timeout = timeout
+
+    @property
+    def cache(self):
+        return caches[self.alias or settings.LISTING_FEED_CACHE_ALIAS]
+
+    def get(self, request):
+        data = self.cache.get(self._key(request))
+        self._count('hits' if data is not None else 'misses')
+        return data
+
+    def set(self, request, data):
+        timeout = self.timeout if self.timeout is not None else settings.LISTING_FEED_CACHE_TIMEOUT
+        self.cache.set(self._key(request), data, timeout)
+
+    def invalidate(self):
+        try:
+            self.cache.incr(f'{self.prefix}:generation')
+        except ValueError:
+            # Generation key was never set or got evicted; any fresh value orphans old pages.
+            self._generation()
+
+    def invalidate_on_commit(self):
+        """
+        Invalidates once the surrounding transaction commits, so readers never repopulate
+        the cache from rows that are about to change.
+        """
+        transaction.on_commit(self.invalidate)
+
+    def stats(self):
+        values = self.cache.get_many([f'{self.prefix}:hits', f'{self.prefix}:misses'])
+        hits = values.get(f'{self.prefix}:hits', 0)
+        misses = values.get(f'{self.prefix}:misses', 0)
+        lookups = hits + misses
+        return {
+            'hits': hits,
+            'misses': misses,
+            'hit_ratio': round(hits / lookups, 4) if lookups else None,
+            'generation': self._generation(),
+        }
+
+    def _generation(self):
+        key = f'{self.prefix}:generation'
+        generation = self.cache.get(key)
+        if generation is None:
+            # Seed from the clock rather than 1 so a lost key never resurrects stale pages.
+            self.cache.add(key, time.time_ns(), None)
+            generation = self.cache.get(key)
+        return generation
+
+    def _key(self, request):
+        url = hashlib.md5(request.build_absolute_uri().encode()).hexdigest()
+        return f'{self.prefix}:{self._generation()}:{url}'
+
+    def _count(self, name):
+        key = f'{self.prefix}:{name}'
+        try:
+            self.cache.incr(key)
+        except ValueError:
+            if not self.cache.add(key, 1, None):
+                self.cache.incr(key)
+
+
+listing_feed_cache = ListingFeedCache()
@@ -0,0 +1,111 @@
+import csv
+import datetime
+
+from django.conf import settings
+from django.core.serializers.json import DjangoJSONEncoder
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+
+from .models import CarbonCredit, Listing, Project, Trade
+
+
+# Export name -> (rows, {column: lookup}). Trades are listings that sold at least one tonne;
+# fills are the trades of the order book.
+EXPORTS = {
+    'projects': (Project.objects.all(), {
+        'id': 'id', 'owner_id': 'owner_id', 'verifier_id': 'verifier_id', 'name': 'name',
+        'description': 'description', 'location': 'location', 'tonnage': 'tonnage', 'vintage': 'vintage',
+        'status': 'status', 'project_id': 'projectId', 'metadata_cid': 'metadata_cid', 'image_cid': 'image_cid',
+        'document_cid': 'document_cid', 'created_at': 'created_at', 'updated_at': 'updated_at',
+    }),
+    'credits': (CarbonCredit.objects.all(), {
+        'id': 'id', 'project_id': 'project_id', 'owner_id': 'owner_id', 'parent_id': 'parent_id',
+        'hedera_token_id': 'hedera_token_id', 'serial_number': 'serial_number', 'quantity': 'quantity',
+        'status': 'status', 'created_at': 'created_at', 'updated_at': 'updated_at',
+    }),
+    'trades': (Listing.objects.filter(quantity_sold__gt=0), {
+        'listing_id': 'id', 'credit_id': 'credit_id', 'project_id': 'credit__project_id', 'seller_id': 'seller_id',
+        'price': 'price', 'quantity_sold': 'quantity_sold', 'quantity_claimed': 'quantity_claimed',
+        'is_active': 'is_active', 'claimed': 'claimed', 'created_at': 'created_at', 'updated_at': 'updated_at',
+    }),
+    'fills': (Trade.objects.all(), {
+        'trade_id': 'id', 'project_id': 'project_id', 'bid_id': 'bid_id', 'ask_id': 'ask_id', 'buyer_id': 'buyer_id',
+        'seller_id': 'seller_id', 'credit_id': 'credit_id', 'price': 'price', 'quantity': 'quantity',
+        'claimed': 'claimed', 'created_at': 'created_at', 'updated_at': 'updated_at',
+    }),
+}
+
+FORMATS = {
+    'csv': 'text/csv; charset=utf-8',
+    'ndjson': 'application/x-ndjson',
+}
+
+
+def parse_since(value):
+    """
+    Parses an ISO 8601 `since` timestamp (naive values are taken as UTC), or returns None.
+    """
+    if not value:
+        return None
+    since = parse_datetime(value)
+    if since is None:
+        raise ValueError(f'"{value}" is not an ISO 8601 timestamp.')
+    return since if timezone.is_aware(since) else timezone.make_aware(since, datetime.timezone.utc)
+
+
+def export_rows(name, since=None, until=None):
+    """
+    Returns the column names and a row iterator of the `name` export.
+
+    Rows are read with a server-side cursor (chunked fetches on SQLite), so memory stays
+    flat however many there are. With `since`, only rows changed after it are included,
+    ordered by change time; `until` (inclusive) pins the end of the snapshot and is what
+    the next incremental export should pass as `since`.
+    """
+    queryset, columns = EXPORTS[name]
+    if until is not None:
+        queryset = queryset.filter(updated_at__lte=until)
+    if since is not None:
+        queryset = queryset.filter(updated_at__gt=since).order_by('updated_at', 'id')
+    else:
+        queryset = queryset.order_by('id')
+    rows = queryset.values_list(*columns.values()).iterator(chunk_size=settings.EXPORT_CHUNK_SIZE)
+    return list(columns), rows
+
+
+class _Buffer:
+    def __init__(self):
+        self.parts = []
+        self.size = 0
+
+    def write(self, text):
+        self.parts.append(text)
+        self.size += len(text)
+
+    def flush(self):
+        data = ''.join(self.parts).encode()
+        self.parts, self.size = [], 0
+        return data
+
+
+def stream_export(name, export_format, since=None, until=None, flush_size=64 * 1024):
+    """
+    Yields the `name` export encoded as CSV (with a header row) or NDJSON, in chunks of
+    about `flush_size` bytes.
+    """
+    columns, rows = export_rows(name, since, until)
+    buffer = _Buffer()
+    if export_format == 'csv':
+        writer = csv.writer(buffer)
+        writer.writerow(columns)
+    else:
+        encode = DjangoJSONEncoder().encode
+    for row in rows:
+        if export_format == 'csv':
+            writer.writerow([value.isoformat() if isinstance(value, datetime.datetime) else value for value in row])
+        else:
+            buffer.write(encode(dict(zip(columns, row))) + '\n')
+        if buffer.size >= flush_size:
+            yield buffer.flush()
+    if buffer.size:
+        yield buffer.flush()
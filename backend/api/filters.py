@@ -0,0 +1,74 @@
+from decimal import Decimal, InvalidOperation
+
+from django.db.models import F
+from rest_framework.exceptions import ValidationError
+from rest_framework.filters import BaseFilterBackend
+
+from .models import Project
+
+
+class ListingFilterBackend(BaseFilterBackend):
+    """
+    Server-side filters and sort orders for the public listings feed.
+
+    Filters: min_price, max_price, min_vintage, max_vintage, min_tonnage, max_tonnage,
+    location, project_status, seller.
+    Sort (`ordering`): newest (default), price, -price, tonnage, -tonnage.
+    Tonnage is what a listing sells: the tonnes left in its lot, not the project's total.
+
+    Implements `get_ordering` so CursorPagination pages over the requested sort key;
+    every ordering ends on `id` to keep the cursor position stable among equal values.
+    """
+    orderings = {
+        'newest': ('-created_at', '-id'),
+        'price': ('price', 'id'),
+        '-price': ('-price', '-id'),
+        'tonnage': ('tonnage', 'id'),
+        '-tonnage': ('-tonnage', '-id'),
+    }
+    range_filters = {
+        'price': ('price', Decimal),
+        'vintage': ('credit__project__vintage', int),
+        'tonnage': ('credit__quantity', int),
+    }
+
+    def filter_queryset(self, request, queryset, view):
+        params = request.query_params
+        filters = {}
+
+        for name, (lookup, parse) in self.range_filters.items():
+            for bound, operator in (('min', 'gte'), ('max', 'lte')):
+                param = f'{bound}_{name}'
+                if params.get(param, '') != '':
+                    filters[f'{lookup}__{operator}'] = self._parse(param, params[param], parse)
+
+        if params.get('location'):
+            filters['credit__project__location__iexact'] = params['location']
+        if params.get('project_status'):
+            if params['project_status'] not in Project.ProjectStatus.values:
+                raise ValidationError({'project_status': f'Must be one of {", ".join(Project.ProjectStatus.values)}.'})
+            filters['credit__project__status'] = params['project_status']
+        if params.get('seller'):
+            filters['seller_id'] = self._parse('seller', params['seller'], int)
+
+        queryset = queryset.filter(**filters)
+        # Cursor pagination reads the sort key straight off each row, so a related
+        # column has to be exposed as an annotation under a plain name.
+        ordering = self.get_ordering(request, queryset, view)
+        if ordering and ordering[0].lstrip('-') == 'tonnage':
+            queryset = queryset.annotate(tonnage=F('credit__quantity'))
+        return queryset
+
+    def get_ordering(self, request, queryset, view):
+        ordering = request.query_params.get('ordering')
+        if not ordering:
+            return None
+        if ordering not in self.orderings:
+            raise ValidationError({'ordering': f'Must be one of {", ".join(self.orderings)}.'})
+        return self.orderings[ordering]
+
+    def _parse(self, param, value, parse):
+        try:
+            return parse(value)
+        except (ValueError, InvalidOperation):
+            raise ValidationError({param: 'Enter a valid number.'})
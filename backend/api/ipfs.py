@@ -0,0 +1,378 @@
+import base64
+import hashlib
+import mmap
+import os
+import re
+import tempfile
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+import requests
+from django.conf import settings
+
+
+# Multicodec and multihash codes of the blocks this module can verify.
+DAG_PB = 0x70
+RAW = 0x55
+SHA2_256 = 0x12
+
+UNIXFS_RAW, UNIXFS_FILE = 0, 2
+
+_BASE58 = '123456789ABCDEFGHJKLMNPQRSTUVWXYZabcdefghijkmnopqrstuvwxyz'
+_CID_CHARS = re.compile(r'^[A-Za-z0-9]{46,100}$')
+
+
+class InvalidCID(ValueError):
+    """
+    Raised for a CID this store cannot verify: malformed, or not a sha2-256 dag-pb/raw CID.
+    """
+
+
+class ContentUnavailable(Exception):
+    """
+    Raised when a gateway could not supply content matching its CID, or it is too large.
+    """
+
+
+def encode_varint(value):
+    out = bytearray()
+    while True:
+        byte, value = value & 0x7f, value >> 7
+        out.append(byte | (0x80 if value else 0))
+        if not value:
+            return bytes(out)
+
+
+def decode_varint(data, pos=0):
+    value = shift = 0
+    while pos < len(data):
+        byte = data[pos]
+        pos += 1
+        value |= (byte & 0x7f) << shift
+        if not byte & 0x80:
+            return value, pos
+        shift += 7
+    raise ValueError('Truncated varint.')
+
+
+def b58encode(data):
+    number = int.from_bytes(data, 'big')
+    out = ''
+    while number:
+        number, rest = divmod(number, 58)
+        out = _BASE58[rest] + out
+    return '1' * (len(data) - len(data.lstrip(b'\0'))) + out
+
+
+def b58decode(text):
+    number = 0
+    for char in text:
+        number = number * 58 + _BASE58.index(char)
+    body = number.to_bytes((number.bit_length() + 7) // 8, 'big')
+    return b'\0' * (len(text) - len(text.lstrip('1'))) + body
+
+
+def make_cid(codec, block, version=1):
+    """
+    Returns the CID of `block`: CIDv1 in base32, or CIDv0 (dag-pb only) in base58.
+    """
+    multihash = bytes([SHA2_256, 32]) + hashlib.sha256(block).digest()
+    if version == 0:
+        return b58encode(multihash)
+    return _base32(encode_varint(1) + encode_varint(codec) + multihash)
+
+
+def _base32(data):
+    return 'b' + base64.b32encode(data).decode().lower().rstrip('=')
+
+
+def parse_cid(cid):
+    """
+    Returns (codec, sha256 digest) of a CIDv0 or base32 CIDv1 string.
+    """
+    try:
+        if not _CID_CHARS.match(cid):
+            raise ValueError('Unexpected characters.')
+        if cid.startswith('Qm'):
+            codec, multihash = DAG_PB, cid_bytes(cid)
+        elif cid.startswith('b'):
+            raw = cid_bytes(cid)
+            version, pos = decode_varint(raw)
+            codec, pos = decode_varint(raw, pos)
+            if version != 1:
+                raise ValueError('Unsupported CID version.')
+            multihash = raw[pos:]
+        else:
+            raise ValueError('Unsupported multibase.')
+        code, pos = decode_varint(multihash)
+        length, pos = decode_varint(multihash, pos)
+    except ValueError as exc:
+        raise InvalidCID(f'{cid}: {exc}')
+    digest = multihash[pos:]
+    if codec not in (DAG_PB, RAW) or code != SHA2_256 or length != 32 or len(digest) != 32:
+        raise InvalidCID(f'{cid}: only sha2-256 dag-pb and raw CIDs are supported.')
+    return codec, digest
+
+
+def cid_bytes(cid):
+    """
+    Returns the binary form of a CID string, as stored in dag-pb links.
+    """
+    if cid.startswith('Qm'):
+        return b58decode(cid)
+    body = cid[1:].upper()
+    return base64.b32decode(body + '=' * (-len(body) % 8))
+
+
+def link_cid(binary):
+    """
+    Returns the string form of a binary CID found in a dag-pb link.
+    """
+    return b58encode(binary) if binary[:2] == bytes([SHA2_256, 32]) else _base32(binary)
+
+
+def protobuf_fields(data):
+    """
+    Yields (field number, value) of a protobuf message with varint and bytes fields only.
+    """
+    pos = 0
+    while pos < len(data):
+        key, pos = decode_varint(data, pos)
+        field, wire_type = key >> 3, key & 7
+        if wire_type == 0:
+            value, pos = decode_varint(data, pos)
+        elif wire_type == 2:
+            length, pos = decode_varint(data, pos)
+            value, pos = data[pos:pos + length], pos + length
+        else:
+            raise ValueError(f'Unsupported protobuf wire type {wire_type}.')
+        yield field, value
+
+
+def decode_file_node(block):
+    """
+    Returns (child CIDs, inline bytes) of a dag-pb UnixFS file node.
+    """
+    links, unixfs = [], b''
+    for field, value in protobuf_fields(block):
+        if field == 2:
+            links.append(link_cid(next(v for f, v in protobuf_fields(value) if f == 1)))
+        elif field == 1:
+            unixfs = value
+    kind, data = None, b''
+    for field, value in protobuf_fields(unixfs):
+        if field == 1:
+            kind = value
+        elif field == 2:
+            data = value
+    if kind not in (UNIXFS_RAW, UNIXFS_FILE):
+        raise ValueError('Only UnixFS files are supported.')
+    return links, data
+
+
+class IpfsGateway:
+    """
+    Fetches content from an IPFS gateway without trusting it: blocks are requested one by
+    one in their raw form (trustless gateway API) and each is checked against the hash in
+    its CID before the file's DAG is followed any further.
+    """
+    max_block_size = 2 * 1024 * 1024
+
+    def __init__(self, base_url=None, timeout=None):
+        self.base_url = (base_url or settings.IPFS_GATEWAY_URL).rstrip('/')
+        self.timeout = timeout or settings.IPFS_FETCH_TIMEOUT
+        self.session = requests.Session()
+
+    def block(self, cid):
+        _, digest = parse_cid(cid)
+        try:
+            response = self.session.get(
+                f'{self.base_url}/ipfs/{cid}', params={'format': 'raw'},
+                headers={'Accept': 'application/vnd.ipld.raw'}, timeout=self.timeout, stream=True,
+            )
+            response.raise_for_status()
+            block = response.raw.read(self.max_block_size + 1, decode_content=True)
+        except requests.RequestException as exc:
+            raise ContentUnavailable(f'{cid}: {exc}')
+        if len(block) > self.max_block_size or hashlib.sha256(block).digest() != digest:
+            raise ContentUnavailable(f'{cid}: the gateway returned a block that does not match its CID.')
+        return block
+
+    def content(self, cid):
+        """
+        Yields the verified bytes of the file `cid`, in order.
+        """
+        with ThreadPoolExecutor(max_workers=settings.IPFS_FETCH_WORKERS) as pool:
+            yield from self._walk(cid, self.block(cid), pool)
+
+    def _walk(self, cid, block, pool):
+        codec, _ = parse_cid(cid)
+        if codec == RAW:
+            yield block
+            return
+        try:
+            links, data = decode_file_node(block)
+            for link in links:
+                parse_cid(link)
+        except (ValueError, StopIteration) as exc:
+            raise ContentUnavailable(f'{cid}: {exc}')
+        if data:
+            yield data
+        # Sibling blocks are fetched concurrently but consumed in order.
+        for link, child in zip(links, pool.map(self.block, links)):
+            yield from self._walk(link, child, pool)
+
+
+class ContentStore:
+    """
+    On-disk cache of verified IPFS content, one file per CID, bounded by total size.
+
+    Reads are memory-mapped, so repeated hits are served from the page cache without
+    copying through Python. Each read touches the file's mtime; when a write takes the
+    store past `IPFS_CACHE_MAX_BYTES`, the least recently read files are evicted down to 90%.
+    Files are written to a temporary name and renamed, so readers never see partial content.
+    """
+    def __init__(self, root=None, max_bytes=None):
+        self._root = root
+        self._max_bytes = max_bytes
+        self._size = None
+        self._lock = threading.Lock()
+        self._inflight = {}
+
+    @property
+    def root(self):
+        return str(self._root or settings.IPFS_CACHE_DIR)
+
+    @property
+    def max_bytes(self):
+        return self._max_bytes or settings.IPFS_CACHE_MAX_BYTES
+
+    def path(self, cid):
+        return os.path.join(self.root, cid[-2:], cid)
+
+    def open(self, cid):
+        """
+        Returns the content of `cid` as a read-only mmap (bytes if empty), or None on a miss.
+        The caller closes it.
+        """
+        path = self.path(cid)
+        try:
+            with open(path, 'rb') as file:
+                os.utime(file.fileno())
+                if os.fstat(file.fileno()).st_size == 0:
+                    return b''
+                return mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ)
+        except FileNotFoundError:
+            return None
+
+    def fetch(self, cid, gateway=None):
+        """
+        Returns the content of `cid` like `open`, fetching and storing it first on a miss.
+        Concurrent misses on one CID in this process share a single download.
+        """
+        content = self.open(cid)
+        if content is not None:
+            return content
+        with self._lock:
+            lock = self._inflight.setdefault(cid, threading.Lock())
+        try:
+            with lock:
+                content = self.open(cid)
+                if content is None:
+                    self.put(cid, (gateway or IpfsGateway()).content(cid))
+                    content = self.open(cid)
+        finally:
+            with self._lock:
+                self._inflight.pop(cid, None)
+        return content
+
+    def put(self, cid, chunks):
+        directory = os.path.dirname(self.path(cid))
+        os.makedirs(directory, exist_ok=True)
+        size = 0
+        fd, temporary = tempfile.mkstemp(dir=directory, prefix='.tmp-')
+        try:
+            with os.fdopen(fd, 'wb') as file:
+                for chunk in chunks:
+                    size += len(chunk)
+                    if size > settings.IPFS_MAX_CONTENT_BYTES:
+                        raise ContentUnavailable(f'{cid}: larger than IPFS_MAX_CONTENT_BYTES.')
+                    file.write(chunk)
+            os.replace(temporary, self.path(cid))
+        except BaseException:
+            os.unlink(temporary)
+            raise
+        with self._lock:
+            if self._size is not None:
+                self._size += size
+            full = self._size is None or self._size > self.max_bytes
+        if full:
+            self.evict()
+        return size
+
+    def evict(self):
+        """
+        Removes the least recently read files until the store fits in 90% of its budget.
+        """
+        entries = []
+        for directory in os.scandir(self.root):
+            if directory.is_dir():
+                entries += [
+                    (entry.stat().st_mtime, entry.stat().st_size, entry.path)
+                    for entry in os.scandir(directory.path) if not entry.name.startswith('.tmp-')
+                ]
+        total = sum(size for _, size, _ in entries)
+        if total > self.max_bytes:
+            for _, size, path in sorted(entries):
+                if total <= self.max_bytes * 0.9:
+                    break
+                try:
+                    os.unlink(path)
+                except FileNotFoundError:
+                    pass
+                total -= size
+        with self._lock:
+            self._size = total
+
+
+content_store = ContentStore()
+
+
+_SIGNATURES = [
+    (b'\x89PNG\r\n\x1a\n', 'image/png'),
+    (b'\xff\xd8\xff', 'image/jpeg'),
+    (b'GIF8', 'image/gif'),
+    (b'%PDF-', 'application/pdf'),
+]
+
+
+def content_type(head):
+    """
+    Guesses the media type of IPFS content from its first bytes (IPFS stores none).
+    """
+    for signature, media_type in _SIGNATURES:
+        if head.startswith(signature):
+            return media_type
+    if head[:4] == b'RIFF' and head[8:12] == b'WEBP':
+        return 'image/webp'
+    text = head.lstrip()[:256]
+    if text[:1] in (b'{', b'['):
+        return 'application/json'
+    if text.startswith(b'<svg') or (text.startswith(b'<?xml') and b'<svg' in text):
+        return 'image/svg+xml'
+    return 'application/octet-stream'
+
+
+def prewarm(project, gateway=None):
+    """
+    Stores every IPFS object a project references, so its first page view is a cache hit.
+    """
+    gateway = gateway or IpfsGateway()
+    for cid in filter(None, (project.metadata_cid, project.image_cid, project.document_cid)):
+        try:
+            parse_cid(cid)
+        except InvalidCID:
+            continue
+        content = content_store.fetch(cid, gateway)
+        if isinstance(content, mmap.mmap):
+            content.close()
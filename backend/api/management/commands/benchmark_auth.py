@@ -0,0 +1,81 @@
+import time
+
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand
+from django.db import connection, reset_queries
+from django.test.utils import CaptureQueriesContext
+from rest_framework.test import APIClient
+from rest_framework_simplejwt.authentication import JWTAuthentication
+
+from api.models import CarbonCredit, Listing, Project
+from api.views import ListingListCreateAPIView, UserNFTListView
+from users.authentication import ReadOnlyClaimsJWTAuthentication
+from users.models import UserProfile
+from users.tokens import RoleRefreshToken
+
+
+BENCH_PREFIX = 'authbench-'
+
+
+class Command(BaseCommand):
+    help = (
+        "Compares requests/sec on read-heavy endpoints with database-backed JWT authentication "
+        "and with the claims-only fast path. Creates a small fixture on first run."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--requests', type=int, default=2000, help='Timed requests per endpoint and mode.')
+        parser.add_argument('--credits', type=int, default=20, help='Credits owned by the benchmark user.')
+
+    def handle(self, *args, **options):
+        user = self._fixture(options['credits'])
+        client = APIClient(HTTP_HOST='localhost')
+        client.credentials(HTTP_AUTHORIZATION=f'Bearer {RoleRefreshToken.for_user(user).access_token}')
+
+        modes = [
+            ('database', [JWTAuthentication]),
+            ('claims', [ReadOnlyClaimsJWTAuthentication]),
+        ]
+        endpoints = [
+            ('listings', ListingListCreateAPIView, '/api/listings/'),
+            ('my-nfts', UserNFTListView, '/api/nfts/my-nfts/'),
+        ]
+        for name, view, url in endpoints:
+            rates = {}
+            original = view.authentication_classes
+            try:
+                for mode, classes in modes:
+                    view.authentication_classes = classes
+                    rates[mode], queries = self._measure(client, url, options['requests'])
+                    self.stdout.write(f'{name:10} {mode:9} {rates[mode]:9.0f} req/s  {queries} queries')
+            finally:
+                view.authentication_classes = original
+            self.stdout.write(self.style.SUCCESS(f"{name:10} speed-up  {rates['claims'] / rates['database']:9.2f}x"))
+
+    def _measure(self, client, url, requests):
+        # The query log is a bounded deque; start from empty so the capture below is accurate.
+        reset_queries()
+        with CaptureQueriesContext(connection) as ctx:
+            assert client.get(url).status_code == 200, url
+        started = time.perf_counter()
+        for _ in range(requests):
+            client.get(url)
+        return requests / (time.perf_counter() - started), len(ctx.captured_queries)
+
+    def _fixture(self, credits):
+        user, created = User.objects.get_or_create(username=f'{BENCH_PREFIX}buyer')
+        if not created:
+            return user
+        UserProfile.objects.create(user=user, role=UserProfile.Role.BUYER)
+        project = Project.objects.create(
+            owner=user, name=f'{BENCH_PREFIX}project', description='Authentication benchmark', location='-',
+            tonnage=credits, status=Project.ProjectStatus.APPROVED,
+        )
+        for serial in range(credits):
+            credit = CarbonCredit.objects.create(
+                project=project, owner=user, hedera_token_id=f'{BENCH_PREFIX}0.0.1', serial_number=serial,
+                status=CarbonCredit.CreditStatus.LISTED if serial % 2 else CarbonCredit.CreditStatus.SOLD,
+            )
+            if serial % 2:
+                Listing.objects.create(seller=user, credit=credit, price=1 + serial)
+        return user
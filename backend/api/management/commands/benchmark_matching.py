@@ -0,0 +1,136 @@
+import random
+import time
+import uuid
+
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand
+
+from api.marketplace import cancel_order, place_order
+from api.matching import ASK, BID, BookOrder, Matcher, MatchingEngine
+from api.models import CarbonCredit, Order, Project, Trade
+from users.models import UserProfile
+
+
+class Command(BaseCommand):
+    help = (
+        "Measures order operations per second on one core: the in-memory matching engine alone, "
+        "and with --db also end to end (journal, engine, trades and lot transfers). The --db run "
+        "creates its own fixtures and applies the whole journal; use a scratch database with no "
+        "matching engine running."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--orders', type=int, default=200000, help='Order operations for the in-memory run.')
+        parser.add_argument('--books', type=int, default=20, help='Number of books (projects) the orders spread over.')
+        parser.add_argument('--cancel-ratio', type=float, default=0.2, help='Share of operations that cancel a resting order.')
+        parser.add_argument('--db', type=int, default=0, help='Order operations for the end-to-end run (0 skips it).')
+        parser.add_argument('--batch-size', type=int, default=500, help='Journal entries per engine transaction.')
+        parser.add_argument('--seed', type=int, default=1)
+
+    def handle(self, *args, **options):
+        rng = random.Random(options['seed'])
+        self._in_memory(rng, options)
+        if options['db']:
+            self._end_to_end(rng, options)
+
+    def _operations(self, rng, count, books, cancel_ratio):
+        """
+        Yields ('place', book, side, price in cents, quantity) or ('cancel',): limit orders
+        scattered around a mid price of 10.00, so a good share of them cross.
+        """
+        for _ in range(count):
+            if rng.random() < cancel_ratio:
+                yield ('cancel',)
+            else:
+                side = BID if rng.random() < 0.5 else ASK
+                price = 1000 + int(rng.gauss(0, 40)) + (-15 if side == BID else 15)
+                yield ('place', rng.randrange(books), side, max(price, 1), rng.randint(1, 50))
+
+    def _in_memory(self, rng, options):
+        engine = MatchingEngine()
+        operations = list(self._operations(rng, options['orders'], options['books'], options['cancel_ratio']))
+        latencies = []
+        fills = 0
+        next_id = 0
+        clock = time.perf_counter
+        started = clock()
+        for operation in operations:
+            begin = clock()
+            if operation[0] == 'cancel':
+                if engine.book_of:
+                    # A recently placed order: cancels mostly hit orders near the top of the book.
+                    engine.cancel(rng.randint(max(next_id - 1000, 0), next_id))
+            else:
+                _, book, side, price, quantity = operation
+                next_id += 1
+                fills += len(engine.place(book, BookOrder(next_id, side, price, quantity)))
+            latencies.append(clock() - begin)
+        elapsed = clock() - started
+
+        latencies.sort()
+        self.stdout.write(
+            f'in memory: {len(operations)} operations in {elapsed:.2f} s = {len(operations) / elapsed:,.0f} ops/s, '
+            f'{fills} fills, {len(engine.book_of)} resting, '
+            f'p50 {latencies[len(latencies) // 2] * 1e6:.1f} us, p99 {latencies[int(len(latencies) * 0.99)] * 1e6:.1f} us'
+        )
+
+    def _end_to_end(self, rng, options):
+        tag = uuid.uuid4().hex[:8]
+        seller = self._make_user(f'bench-{tag}-seller', UserProfile.Role.SELLER)
+        buyer = self._make_user(f'bench-{tag}-buyer', UserProfile.Role.BUYER)
+        projects = [
+            Project.objects.create(
+                owner=seller, name=f'Bench {tag} {i}', description='Matching benchmark', location='-',
+                tonnage=1, status=Project.ProjectStatus.APPROVED,
+            )
+            for i in range(options['books'])
+        ]
+        operations = list(self._operations(rng, options['db'], options['books'], options['cancel_ratio']))
+        credits = CarbonCredit.objects.bulk_create([
+            CarbonCredit(
+                project=projects[operation[1]], owner=seller, hedera_token_id=f'bench-{tag}', serial_number=i,
+                quantity=operation[4],
+            )
+            for i, operation in enumerate(operations) if operation[0] == 'place' and operation[2] == ASK
+        ])
+
+        try:
+            matcher = Matcher()
+            matcher.load()
+            credits = iter(credits)
+            placed = []
+            started = time.perf_counter()
+            for operation in operations:
+                if operation[0] == 'cancel':
+                    if placed:
+                        cancel_order(rng.choice(placed[-1000:]))
+                    continue
+                _, book, side, price, quantity = operation
+                price = f'{price / 100:.2f}'
+                if side == BID:
+                    placed.append(place_order(buyer, BID, price, quantity, project=projects[book]))
+                else:
+                    placed.append(place_order(seller, ASK, price, credit=next(credits)))
+            journaled = time.perf_counter()
+            while matcher.process(options['batch_size']):
+                pass
+            finished = time.perf_counter()
+
+            self.stdout.write(
+                f"end to end: {len(operations)} operations journaled in {journaled - started:.2f} s "
+                f"({len(operations) / (journaled - started):,.0f} ops/s), matched and settled in "
+                f"{finished - journaled:.2f} s ({len(operations) / (finished - journaled):,.0f} ops/s), "
+                f"{matcher.stats['trades']} trades, "
+                f"{Order.objects.filter(project__in=projects, status=Order.OrderStatus.OPEN).count()} resting"
+            )
+        finally:
+            Trade.objects.filter(project__in=projects).delete()
+            Order.objects.filter(project__in=projects).delete()
+            CarbonCredit.objects.filter(project__in=projects).delete()
+            Project.objects.filter(pk__in=[project.pk for project in projects]).delete()
+            User.objects.filter(username__startswith=f'bench-{tag}-').delete()
+
+    def _make_user(self, username, role):
+        user = User.objects.create_user(username=username, email=f'{username}@example.com')
+        UserProfile.objects.create(user=user, role=role)
+        return user
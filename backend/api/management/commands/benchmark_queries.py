@@ -0,0 +1,157 @@
+import json
+import statistics
+import time
+
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from rest_framework.test import APIClient
+
+from api.cache import listing_feed_cache
+from api.models import CarbonCredit, Listing, Project
+from users.models import UserProfile
+
+
+BENCH_PREFIX = 'bench-'
+
+
+class Command(BaseCommand):
+    help = (
+        "Seeds a large marketplace and records EXPLAIN plans and latency for every list endpoint. "
+        "Needs a fully migrated database; compare index designs by labelling and saving each run's report."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--listings', type=int, default=1_000_000, help='Credits/listings to seed.')
+        parser.add_argument('--credits-per-project', type=int, default=100)
+        parser.add_argument('--sellers', type=int, default=100)
+        parser.add_argument('--batch-size', type=int, default=5000)
+        parser.add_argument('--skip-seed', action='store_true', help='Reuse previously seeded rows.')
+        parser.add_argument('--repeat', type=int, default=20, help='Timed requests per endpoint.')
+        parser.add_argument('--label', default='run', help='Label stored in the report, e.g. the index design being measured.')
+        parser.add_argument('--output', help='Write the JSON report to this file.')
+
+    def handle(self, *args, **options):
+        if not options['skip_seed']:
+            self._seed(options)
+
+        seller = User.objects.filter(username__startswith=f'{BENCH_PREFIX}seller-').order_by('pk').first()
+        verifier = User.objects.get(username=f'{BENCH_PREFIX}verifier')
+        endpoints = [
+            ('listings', None, '/api/listings/'),
+            ('my-listings', seller, '/api/listings/my-listings/'),
+            ('my-nfts', seller, '/api/nfts/my-nfts/'),
+            ('projects', seller, '/api/projects/'),
+            ('my-projects', seller, '/api/projects/my-projects/'),
+            ('pending-review', verifier, '/api/projects/pending-review/'),
+            ('verifier-dashboard', verifier, '/api/projects/verifier-dashboard/'),
+        ]
+
+        report = {'label': options['label'], 'vendor': connection.vendor, 'endpoints': {}}
+        for name, user, url in endpoints:
+            client = APIClient(HTTP_HOST='localhost')
+            if user is not None:
+                client.force_authenticate(user)
+            report['endpoints'][name] = self._measure(client, url, options['repeat'])
+            timings = report['endpoints'][name]
+            self.stdout.write(
+                f"{name:20} p50 {timings['p50_ms']:8.2f} ms  p95 {timings['p95_ms']:8.2f} ms  "
+                f"deep page {timings['deep_page_ms']:8.2f} ms  {timings['queries']} queries"
+            )
+
+        if options['output']:
+            with open(options['output'], 'w') as fh:
+                json.dump(report, fh, indent=2)
+            self.stdout.write(self.style.SUCCESS(f"Report written to {options['output']}"))
+
+    def _measure(self, client, url, repeat):
+        samples = []
+        for _ in range(repeat):
+            listing_feed_cache.invalidate()
+            started = time.perf_counter()
+            response = client.get(url)
+            samples.append((time.perf_counter() - started) * 1000)
+            assert response.status_code == 200, (url, response.status_code)
+
+        listing_feed_cache.invalidate()
+        with CaptureQueriesContext(connection) as ctx:
+            response = client.get(url)
+        plans = [{'sql': query['sql'], 'plan': self._explain(query['sql'])} for query in ctx.captured_queries]
+
+        # Walk ten pages deep to check that later pages cost the same as the first one.
+        next_url = response.data.get('next')
+        for _ in range(9):
+            if not next_url:
+                break
+            next_url = client.get(next_url).data.get('next')
+        deep_page_ms = 0.0
+        if next_url:
+            listing_feed_cache.invalidate()
+            started = time.perf_counter()
+            client.get(next_url)
+            deep_page_ms = (time.perf_counter() - started) * 1000
+
+        samples.sort()
+        return {
+            'p50_ms': statistics.median(samples),
+            'p95_ms': samples[max(0, int(len(samples) * 0.95) - 1)],
+            'deep_page_ms': deep_page_ms,
+            'queries': len(plans),
+            'plans': plans,
+        }
+
+    def _explain(self, sql):
+        prefix = 'EXPLAIN QUERY PLAN ' if connection.vendor == 'sqlite' else 'EXPLAIN ANALYZE '
+        with connection.cursor() as cursor:
+            cursor.execute(prefix + sql)
+            return [' '.join(str(column) for column in row) for row in cursor.fetchall()]
+
+    def _seed(self, options):
+        total = options['listings']
+        batch_size = options['batch_size']
+        per_project = options['credits_per_project']
+
+        sellers = []
+        for i in range(options['sellers']):
+            user = User.objects.create_user(username=f'{BENCH_PREFIX}seller-{i}')
+            UserProfile.objects.create(user=user, role=UserProfile.Role.SELLER)
+            sellers.append(user)
+        verifier = User.objects.create_user(username=f'{BENCH_PREFIX}verifier')
+        UserProfile.objects.create(user=verifier, role=UserProfile.Role.VERIFIER)
+
+        statuses = [Project.ProjectStatus.APPROVED] * 8 + [Project.ProjectStatus.PENDING, Project.ProjectStatus.REJECTED]
+        project_count = max(1, total // per_project)
+        for start in range(0, project_count, batch_size):
+            Project.objects.bulk_create([
+                Project(
+                    owner=sellers[i % len(sellers)], verifier=verifier if i % 10 == 0 else None,
+                    name=f'Bench project {i}', description='Benchmark fixture', location=f'Region {i % 50}',
+                    tonnage=100 + i % 5000, vintage=2015 + i % 10, status=statuses[i % len(statuses)],
+                )
+                for i in range(start, min(start + batch_size, project_count))
+            ], batch_size=batch_size)
+        projects = list(Project.objects.filter(name__startswith='Bench project ').values_list('pk', 'owner_id'))
+        self.stdout.write(f'Seeded {len(projects)} projects')
+
+        for start in range(0, total, batch_size):
+            end = min(start + batch_size, total)
+            credits = CarbonCredit.objects.bulk_create([
+                CarbonCredit(
+                    project_id=projects[i % len(projects)][0], owner_id=projects[i % len(projects)][1],
+                    hedera_token_id=f'{BENCH_PREFIX}0.0.{i // 100000}', serial_number=i,
+                    status=CarbonCredit.CreditStatus.LISTED,
+                )
+                for i in range(start, end)
+            ], batch_size=batch_size)
+            Listing.objects.bulk_create([
+                Listing(
+                    seller_id=credit.owner_id, credit=credit, price=1 + (i % 500),
+                    # Roughly the steady-state mix of a busy marketplace: most listings have sold.
+                    is_active=i % 5 == 0,
+                )
+                for i, credit in enumerate(credits, start)
+            ], batch_size=batch_size)
+            self.stdout.write(f'Seeded {end}/{total} credits and listings', ending='\r')
+        self.stdout.write('')
+        connection.cursor().execute('ANALYZE')
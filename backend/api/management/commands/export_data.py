@@ -0,0 +1,36 @@
+import sys
+
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+
+from api.exports import EXPORTS, FORMATS, parse_since, stream_export
+
+
+class Command(BaseCommand):
+    help = (
+        "Streams a full or incremental dump of projects, credits, trades or order book fills as CSV "
+        "or NDJSON, in constant memory. Prints the timestamp to pass as --since on the next run."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('dataset', choices=sorted(EXPORTS))
+        parser.add_argument('--format', dest='export_format', choices=sorted(FORMATS), default='csv')
+        parser.add_argument('--since', help='Only rows changed after this ISO 8601 timestamp.')
+        parser.add_argument('--output', help='File to write (default: standard output).')
+
+    def handle(self, *args, **options):
+        try:
+            since = parse_since(options['since'])
+        except ValueError as exc:
+            raise CommandError(exc)
+        until = timezone.now()
+        output = open(options['output'], 'wb') if options['output'] else sys.stdout.buffer
+        try:
+            for chunk in stream_export(options['dataset'], options['export_format'], since, until):
+                output.write(chunk)
+        finally:
+            if options['output']:
+                output.close()
+            else:
+                output.flush()
+        self.stderr.write(f'Exported {options["dataset"]} up to {until.isoformat()} (next --since)')
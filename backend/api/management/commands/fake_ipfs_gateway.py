@@ -0,0 +1,100 @@
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlsplit
+
+from django.core.management.base import BaseCommand
+
+from api.ipfs import DAG_PB, RAW, UNIXFS_FILE, cid_bytes, encode_varint, make_cid
+
+
+def protobuf_field(field, value):
+    if isinstance(value, int):
+        return encode_varint(field << 3) + encode_varint(value)
+    return encode_varint(field << 3 | 2) + encode_varint(len(value)) + value
+
+
+def build_file(data, chunk_size, version):
+    """
+    Chunks `data` into a UnixFS file DAG and returns (root CID, {cid: block}). CIDv1 files
+    use raw leaves; CIDv0 files use dag-pb leaves, as older IPFS nodes (and Pinata) do.
+    """
+    blocks = {}
+    chunks = [data[i:i + chunk_size] for i in range(0, len(data), chunk_size)] or [b'']
+    leaves = []
+    for chunk in chunks:
+        if version == 0:
+            unixfs = protobuf_field(1, UNIXFS_FILE) + protobuf_field(2, chunk) + protobuf_field(3, len(chunk))
+            block, codec = protobuf_field(1, unixfs), DAG_PB
+        else:
+            block, codec = chunk, RAW
+        cid = make_cid(codec, block, version)
+        blocks[cid] = block
+        leaves.append((cid, block, len(chunk)))
+    if len(leaves) == 1:
+        return leaves[0][0], blocks
+
+    links = b''.join(
+        protobuf_field(2, protobuf_field(1, cid_bytes(cid)) + protobuf_field(3, len(block)))
+        for cid, block, _ in leaves
+    )
+    unixfs = protobuf_field(1, UNIXFS_FILE) + protobuf_field(3, len(data)) + b''.join(
+        protobuf_field(4, size) for _, _, size in leaves
+    )
+    root = links + protobuf_field(1, unixfs)
+    root_cid = make_cid(DAG_PB, root, version)
+    blocks[root_cid] = root
+    return root_cid, blocks
+
+
+class Command(BaseCommand):
+    help = (
+        "Serves files as IPFS blocks over the trustless gateway API (`/ipfs/<cid>?format=raw`) "
+        "and prints their CIDs, for testing the IPFS content cache offline. Set IPFS_GATEWAY_URL "
+        "to its address."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('files', nargs='+')
+        parser.add_argument('--port', type=int, default=5552)
+        parser.add_argument('--chunk-size', type=int, default=256 * 1024)
+        parser.add_argument('--cid-version', type=int, choices=[0, 1], default=1)
+        parser.add_argument('--corrupt', action='store_true', help='Serve altered blocks, to test verification.')
+
+    def handle(self, *args, **options):
+        blocks = {}
+        for path in options['files']:
+            with open(path, 'rb') as file:
+                cid, file_blocks = build_file(file.read(), options['chunk_size'], options['cid_version'])
+            blocks.update(file_blocks)
+            self.stdout.write(f'{cid}  {path}')
+        if options['corrupt']:
+            blocks = {cid: block[:-1] + bytes([block[-1] ^ 1]) if block else b'x' for cid, block in blocks.items()}
+
+        handler = type('Handler', (GatewayHandler,), {'blocks': blocks})
+        server = ThreadingHTTPServer(('127.0.0.1', options['port']), handler)
+        self.stdout.write(f"Serving {len(blocks)} blocks at http://127.0.0.1:{options['port']} (Ctrl+C to stop)")
+        try:
+            server.serve_forever()
+        except KeyboardInterrupt:
+            server.server_close()
+
+
+class GatewayHandler(BaseHTTPRequestHandler):
+    blocks = None
+
+    def do_GET(self):
+        url = urlsplit(self.path)
+        parts = url.path.strip('/').split('/')
+        block = self.blocks.get(parts[1]) if len(parts) == 2 and parts[0] == 'ipfs' else None
+        if block is None:
+            self.send_response(404)
+            self.send_header('Content-Length', '0')
+            self.end_headers()
+            return
+        self.send_response(200)
+        self.send_header('Content-Type', 'application/vnd.ipld.raw')
+        self.send_header('Content-Length', str(len(block)))
+        self.end_headers()
+        self.wfile.write(block)
+
+    def log_message(self, format, *args):
+        pass
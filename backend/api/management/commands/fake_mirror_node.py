@@ -0,0 +1,132 @@
+import bisect
+import json
+import random
+from decimal import Decimal
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlencode, urlsplit
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from api.models import CarbonCredit
+from users.models import UserProfile
+
+
+class Command(BaseCommand):
+    help = (
+        "Serves a local fake of the mirror-node endpoints used by `ingest_mirror_node`, with "
+        "synthetic NFT transfers (list, sell, withdraw, direct transfer) over the credits and "
+        "accounts in the database. For development and load testing only."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--port', type=int, default=5551)
+        parser.add_argument('--transactions', type=int, default=50000, help='Transactions to generate.')
+        parser.add_argument('--seed', type=int, default=0)
+
+    def handle(self, *args, **options):
+        marketplace = settings.HEDERA_MARKETPLACE_ACCOUNT_ID
+        if not marketplace:
+            raise CommandError('Set HEDERA_MARKETPLACE_ACCOUNT_ID so listings and sales can be simulated.')
+        accounts = dict(
+            UserProfile.objects.exclude(hedera_account_id__isnull=True).exclude(hedera_account_id='')
+            .values_list('user_id', 'hedera_account_id')
+        )
+        holders = {
+            (token_id, serial): accounts[owner_id]
+            for token_id, serial, owner_id in CarbonCredit.objects.filter(parent__isnull=True, owner_id__in=accounts)
+            .values_list('hedera_token_id', 'serial_number', 'owner_id')
+        }
+        if not holders or len(accounts) < 2:
+            raise CommandError('Needs credits owned by at least two users with a hedera_account_id.')
+
+        transactions = self._generate(holders, list(accounts.values()), marketplace, options)
+        timestamps = [Decimal(tx['consensus_timestamp']) for tx in transactions]
+        handler = type('Handler', (MirrorNodeHandler,), {
+            'transactions': transactions, 'timestamps': timestamps, 'holders': holders,
+        })
+        server = ThreadingHTTPServer(('127.0.0.1', options['port']), handler)
+        self.stdout.write(
+            f"Serving {len(transactions)} transactions over {len(holders)} serials at "
+            f"http://127.0.0.1:{options['port']} (Ctrl+C to stop)"
+        )
+        try:
+            server.serve_forever()
+        except KeyboardInterrupt:
+            server.server_close()
+
+    def _generate(self, holders, accounts, marketplace, options):
+        rng = random.Random(options['seed'])
+        keys = list(holders)
+        listed = set()
+        transactions = []
+        for i in range(options['transactions']):
+            key = rng.choice(keys)
+            owner = holders[key]
+            if key in listed:
+                listed.discard(key)
+                # Most listings sell; the rest are withdrawn.
+                receiver = rng.choice([account for account in accounts if account != owner]) if rng.random() < 0.8 else owner
+                sender = marketplace
+            elif rng.random() < 0.8:
+                listed.add(key)
+                sender, receiver = owner, marketplace
+            else:
+                sender, receiver = owner, rng.choice([account for account in accounts if account != owner])
+            if receiver != marketplace:
+                holders[key] = receiver
+            transactions.append({
+                'consensus_timestamp': f'{1700000000 + i // 1000}.{(i % 1000) * 1000:09d}',
+                'name': 'CRYPTOTRANSFER',
+                'result': 'SUCCESS',
+                'nft_transfers': [{
+                    'token_id': key[0], 'serial_number': key[1], 'is_approval': False,
+                    'sender_account_id': sender, 'receiver_account_id': receiver,
+                }],
+            })
+        for key in listed:
+            holders[key] = marketplace
+        return transactions
+
+
+class MirrorNodeHandler(BaseHTTPRequestHandler):
+    transactions = timestamps = holders = None
+
+    def do_GET(self):
+        url = urlsplit(self.path)
+        query = {name: values[-1] for name, values in parse_qs(url.query).items()}
+        if url.path == '/api/v1/transactions':
+            self._send(self._transactions(query))
+        elif url.path.startswith('/api/v1/tokens/') and url.path.endswith('/nfts'):
+            token_id = url.path.split('/')[4]
+            nfts = [
+                {'token_id': token_id, 'serial_number': serial, 'account_id': account, 'deleted': False}
+                for (token, serial), account in sorted(self.holders.items()) if token == token_id
+            ]
+            if nfts:
+                self._send({'nfts': nfts, 'links': {'next': None}})
+            else:
+                self._send({'_status': {'messages': [{'message': 'Not found'}]}}, status=404)
+        else:
+            self._send({'_status': {'messages': [{'message': 'Not found'}]}}, status=404)
+
+    def _transactions(self, query):
+        limit = min(int(query.get('limit', 25)), 100)
+        after = query.get('timestamp', 'gt:0').split(':', 1)[1]
+        start = bisect.bisect_right(self.timestamps, Decimal(after))
+        page = self.transactions[start:start + limit]
+        following = None
+        if start + limit < len(self.transactions) and page:
+            following = '/api/v1/transactions?' + urlencode({**query, 'timestamp': f"gt:{page[-1]['consensus_timestamp']}"})
+        return {'transactions': page, 'links': {'next': following}}
+
+    def _send(self, body, status=200):
+        payload = json.dumps(body).encode()
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(payload)))
+        self.end_headers()
+        self.wfile.write(payload)
+
+    def log_message(self, format, *args):
+        pass
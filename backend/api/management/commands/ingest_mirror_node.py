@@ -0,0 +1,77 @@
+import time
+
+from django.core.management.base import BaseCommand
+from requests import HTTPError, RequestException
+
+from api.mirror_node import TRANSFERS_STREAM, MirrorNodeClient, Reconciler
+from api.models import CarbonCredit, MirrorNodeCheckpoint
+
+
+class Command(BaseCommand):
+    help = (
+        "Streams NFT transfers from a Hedera mirror node into CarbonCredit and Listing, resuming "
+        "from the last checkpoint. Point --base-url at a local fake (`fake_mirror_node`) to test."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--base-url', help='Mirror node root URL (default: settings.MIRROR_NODE_URL).')
+        parser.add_argument('--batch-size', type=int, default=1000, help='Transfers applied per transaction.')
+        parser.add_argument('--follow', action='store_true', help='Keep polling for new transfers.')
+        parser.add_argument('--poll-interval', type=float, default=2.0, help='Seconds between polls in --follow mode.')
+        parser.add_argument('--holders', action='store_true', help='First reconcile owners from a snapshot of every known token.')
+        parser.add_argument('--reset', action='store_true', help='Forget the checkpoint and start from the first transfer.')
+
+    def handle(self, *args, **options):
+        client = MirrorNodeClient(options['base_url'])
+        reconciler = Reconciler()
+        if options['reset']:
+            MirrorNodeCheckpoint.objects.filter(stream=TRANSFERS_STREAM).delete()
+        if options['holders']:
+            self._reconcile_holders(client, reconciler)
+
+        while True:
+            started = time.perf_counter()
+            try:
+                events = self._drain(client, reconciler, options['batch_size'])
+            except RequestException as exc:
+                if not options['follow']:
+                    raise
+                self.stderr.write(f'Mirror node request failed, retrying: {exc}')
+                events = 0
+            if events:
+                elapsed = time.perf_counter() - started
+                self.stdout.write(
+                    f'{events} transfer(s) in {elapsed:.1f} s ({events / elapsed * 60:,.0f}/min); '
+                    f"applied {reconciler.stats['applied']}, unchanged {reconciler.stats['unchanged']}, "
+                    f"skipped {reconciler.stats['skipped']}"
+                )
+            if not options['follow']:
+                break
+            time.sleep(options['poll_interval'])
+
+    def _drain(self, client, reconciler, batch_size):
+        checkpoint = MirrorNodeCheckpoint.objects.filter(stream=TRANSFERS_STREAM).first()
+        batch, last_timestamp, total = [], None, 0
+        for transfers, page_timestamp in client.nft_transfers(after=checkpoint.timestamp if checkpoint else None):
+            batch += transfers
+            last_timestamp = page_timestamp or last_timestamp
+            if len(batch) >= batch_size:
+                reconciler.apply_transfers(batch, timestamp=last_timestamp)
+                total += len(batch)
+                batch = []
+        if last_timestamp:
+            # Also advances past pages without NFT transfers.
+            reconciler.apply_transfers(batch, timestamp=last_timestamp)
+            total += len(batch)
+        return total
+
+    def _reconcile_holders(self, client, reconciler):
+        tokens = CarbonCredit.objects.filter(parent__isnull=True).values_list('hedera_token_id', flat=True).distinct()
+        for token_id in tokens:
+            try:
+                for holders in client.nft_holders(token_id):
+                    reconciler.apply_holders(token_id, holders)
+            except HTTPError as exc:
+                self.stderr.write(f'Skipping holders of {token_id}: {exc}')
+                continue
+            self.stdout.write(f'Reconciled holders of {token_id}')
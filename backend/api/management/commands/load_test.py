@@ -0,0 +1,120 @@
+import asyncio
+import json
+import statistics
+import time
+from urllib.parse import urlsplit
+
+from django.core.management.base import BaseCommand, CommandError
+
+
+class Command(BaseCommand):
+    help = (
+        "Opens many concurrent keep-alive connections against a running server and reports "
+        "throughput and latency percentiles. Run it once against the WSGI deployment and once "
+        "against the ASGI one (e.g. /api/listings/ vs /api/async/listings/) to compare them. "
+        "1,000 connections need `ulimit -n` above 1,000 on both ends."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('url', help='Absolute URL to request, e.g. http://127.0.0.1:8000/api/async/listings/')
+        parser.add_argument('--connections', type=int, default=1000, help='Concurrent connections.')
+        parser.add_argument('--duration', type=float, default=30.0, help='Seconds to keep sending requests.')
+        parser.add_argument('--token', help='Access token sent as a Bearer Authorization header.')
+        parser.add_argument('--timeout', type=float, default=30.0, help='Per-request timeout in seconds.')
+        parser.add_argument('--label', default='run', help='Label stored in the report, e.g. "wsgi" or "asgi".')
+        parser.add_argument('--output', help='Write the JSON report to this file.')
+
+    def handle(self, *args, **options):
+        target = urlsplit(options['url'])
+        if target.scheme != 'http' or not target.hostname:
+            raise CommandError('Only plain http:// URLs are supported.')
+
+        report = asyncio.run(self._run(target, options))
+        report['label'] = options['label']
+        report['url'] = options['url']
+        self.stdout.write(
+            f"{report['label']}: {report['requests']} requests, {report['errors']} errors, "
+            f"{report['requests_per_second']:.1f} req/s, p50 {report['p50_ms']:.1f} ms, "
+            f"p99 {report['p99_ms']:.1f} ms, max {report['max_ms']:.1f} ms"
+        )
+        if options['output']:
+            with open(options['output'], 'w') as fh:
+                json.dump(report, fh, indent=2)
+            self.stdout.write(self.style.SUCCESS(f"Report written to {options['output']}"))
+
+    async def _run(self, target, options):
+        path = target.path + (f'?{target.query}' if target.query else '')
+        headers = [f'GET {path or "/"} HTTP/1.1', f'Host: {target.netloc}', 'Connection: keep-alive']
+        if options['token']:
+            headers.append(f"Authorization: Bearer {options['token']}")
+        request = ('\r\n'.join(headers) + '\r\n\r\n').encode()
+
+        latencies, errors = [], []
+        deadline = time.perf_counter() + options['duration']
+        started = time.perf_counter()
+        await asyncio.gather(*(
+            self._connection(target, request, deadline, options['timeout'], latencies, errors)
+            for _ in range(options['connections'])
+        ))
+        elapsed = time.perf_counter() - started
+
+        latencies.sort()
+        return {
+            'connections': options['connections'],
+            'requests': len(latencies),
+            'errors': len(errors),
+            'error_samples': sorted(set(errors))[:10],
+            'requests_per_second': len(latencies) / elapsed,
+            'p50_ms': statistics.median(latencies) if latencies else 0.0,
+            'p99_ms': latencies[max(0, int(len(latencies) * 0.99) - 1)] if latencies else 0.0,
+            'max_ms': latencies[-1] if latencies else 0.0,
+        }
+
+    async def _connection(self, target, request, deadline, timeout, latencies, errors):
+        reader = writer = None
+        while time.perf_counter() < deadline:
+            sent = time.perf_counter()
+            try:
+                if writer is None:
+                    reader, writer = await asyncio.wait_for(
+                        asyncio.open_connection(target.hostname, target.port or 80), timeout
+                    )
+                writer.write(request)
+                status, keep_alive = await asyncio.wait_for(self._read_response(reader), timeout)
+            except (OSError, asyncio.TimeoutError, asyncio.IncompleteReadError, ValueError) as exc:
+                errors.append(type(exc).__name__)
+                writer = self._close(writer)
+                continue
+            if status != 200:
+                errors.append(f'HTTP {status}')
+            else:
+                latencies.append((time.perf_counter() - sent) * 1000)
+            if not keep_alive:
+                writer = self._close(writer)
+        self._close(writer)
+
+    async def _read_response(self, reader):
+        status_line = await reader.readline()
+        if not status_line:
+            raise asyncio.IncompleteReadError(b'', None)
+        status = int(status_line.split()[1])
+        headers = {}
+        while (line := await reader.readline()) not in (b'\r\n', b'\n', b''):
+            name, _, value = line.decode('latin-1').partition(':')
+            headers[name.strip().lower()] = value.strip().lower()
+
+        if headers.get('transfer-encoding') == 'chunked':
+            while size := int((await reader.readline()).split(b';')[0], 16):
+                await reader.readexactly(size + 2)
+            await reader.readline()
+        elif 'content-length' in headers:
+            await reader.readexactly(int(headers['content-length']))
+        else:
+            await reader.read()
+            return status, False
+        return status, headers.get('connection') != 'close'
+
+    def _close(self, writer):
+        if writer is not None:
+            writer.close()
+        return None
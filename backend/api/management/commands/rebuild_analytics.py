@@ -0,0 +1,72 @@
+from collections import Counter, defaultdict
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from django.utils import timezone
+
+from api.analytics import dimension_keys, price_band
+from api.models import CarbonCredit, Listing, MarketPriceBand, MarketRollup, OutboxEvent, Trade
+
+
+class Command(BaseCommand):
+    help = (
+        "Recomputes the analytics rollups from the listings and trades tables, for existing data "
+        "or after a change to the rollups. Stop the outbox workers first. Individual sales through "
+        "listings are not stored, so each listing's sales count as one trade dated by its last update."
+    )
+
+    def handle(self, *args, **options):
+        if OutboxEvent.objects.filter(
+            status=OutboxEvent.EventStatus.PENDING, topic__in=['listing.created', 'listing.sold', 'trade.executed']
+        ).exists():
+            raise CommandError('Listing or trade events are still pending; run `run_outbox_worker --once` first.')
+
+        rollups = defaultdict(Counter)
+        bands = Counter()
+        listings = Listing.objects.values_list(
+            'seller_id', 'price', 'quantity_sold', 'created_at', 'updated_at', 'credit__quantity', 'credit__status',
+            'credit__project_id', 'credit__project__vintage', 'credit__project__location',
+        ).iterator(chunk_size=2000)
+        for seller_id, price, sold, created_at, updated_at, remaining, status, *project in listings:
+            project = dict(zip(('id', 'vintage', 'location'), project))
+            # A sold-out listing's lot went to the last buyer and is already in quantity_sold.
+            listed = sold + (remaining if status != CarbonCredit.CreditStatus.SOLD else 0)
+            for dimension, key in dimension_keys(project, seller_id):
+                rollup = rollups[dimension, key, timezone.localdate(created_at)]
+                rollup['listings'] += 1
+                rollup['listed_tonnes'] += listed
+                if sold:
+                    day = timezone.localdate(updated_at)
+                    sale = rollups[dimension, key, day]
+                    sale['trades'] += 1
+                    sale['sold_tonnes'] += sold
+                    sale['volume'] += price * sold
+                    if price > 0:
+                        bands[dimension, key, day, price_band(price)] += sold
+
+        trades = Trade.objects.values_list(
+            'seller_id', 'price', 'quantity', 'created_at', 'project_id', 'project__vintage', 'project__location',
+        ).iterator(chunk_size=2000)
+        for seller_id, price, quantity, created_at, *project in trades:
+            project = dict(zip(('id', 'vintage', 'location'), project))
+            day = timezone.localdate(created_at)
+            for dimension, key in dimension_keys(project, seller_id):
+                sale = rollups[dimension, key, day]
+                sale['trades'] += 1
+                sale['sold_tonnes'] += quantity
+                sale['volume'] += price * quantity
+                if price > 0:
+                    bands[dimension, key, day, price_band(price)] += quantity
+
+        with transaction.atomic():
+            MarketRollup.objects.all().delete()
+            MarketPriceBand.objects.all().delete()
+            MarketRollup.objects.bulk_create([
+                MarketRollup(dimension=dimension, key=key, day=day, **totals)
+                for (dimension, key, day), totals in rollups.items()
+            ], batch_size=1000)
+            MarketPriceBand.objects.bulk_create([
+                MarketPriceBand(dimension=dimension, key=key, day=day, band=band, sold_tonnes=tonnes)
+                for (dimension, key, day, band), tonnes in bands.items()
+            ], batch_size=1000)
+        self.stdout.write(f'Rebuilt {len(rollups)} rollup(s) and {len(bands)} price band(s)')
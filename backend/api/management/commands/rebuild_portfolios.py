@@ -0,0 +1,40 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from api.models import PortfolioSummary
+from api.portfolio import COUNTERS, compute, rebuild
+
+
+class Command(BaseCommand):
+    help = (
+        "Recomputes the portfolio summaries from projects, credits and listings, for existing "
+        "data or after a change to the counters. With --check, only reports users whose stored "
+        "counters differ."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--user', type=int, action='append', dest='users', help='Only this user id (repeatable).')
+        parser.add_argument('--check', action='store_true')
+
+    def handle(self, *args, **options):
+        users = options['users']
+        if options['check']:
+            stored = PortfolioSummary.objects.all()
+            if users:
+                stored = stored.filter(user_id__in=users)
+            stored = {row['user_id']: row for row in stored.values('user_id', *COUNTERS)}
+            drifted = 0
+            for user_id, counters in sorted(compute(users).items()):
+                row = stored.get(user_id, {})
+                diff = {name: (row.get(name), value) for name, value in counters.items() if row.get(name) != value}
+                if diff:
+                    drifted += 1
+                    self.stdout.write(f'User #{user_id}: ' + ', '.join(
+                        f'{name} {old} != {new}' for name, (old, new) in diff.items()
+                    ))
+            self.stdout.write(f'{drifted} summary(ies) out of date')
+            return
+
+        with transaction.atomic():
+            written = rebuild(users)
+        self.stdout.write(f'Rebuilt {written} portfolio summary(ies)')
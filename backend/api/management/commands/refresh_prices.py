@@ -0,0 +1,36 @@
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from requests import RequestException
+
+from api.prices import HBAR_USD, get_provider, refresh_rate
+
+
+class Command(BaseCommand):
+    help = (
+        "Fetches exchange rates from settings.PRICE_PROVIDER and stores them for /api/prices/. "
+        "Run it with --follow (or from cron) so every page view is served from the stored rate."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--pair', action='append', help=f'Pair to refresh (default: {HBAR_USD}); repeatable.')
+        parser.add_argument('--follow', action='store_true', help='Keep refreshing every --interval seconds.')
+        parser.add_argument('--interval', type=float, help='Seconds between refreshes (default: settings.PRICE_REFRESH_INTERVAL).')
+
+    def handle(self, *args, **options):
+        provider = get_provider()
+        interval = options['interval'] or settings.PRICE_REFRESH_INTERVAL
+        while True:
+            for pair in options['pair'] or [HBAR_USD]:
+                try:
+                    rate = refresh_rate(pair, provider)
+                except (RequestException, KeyError, ValueError) as exc:
+                    if not options['follow']:
+                        raise
+                    self.stderr.write(f'Refreshing {pair} failed, keeping the stored rate: {exc}')
+                    continue
+                self.stdout.write(str(rate))
+            if not options['follow']:
+                break
+            time.sleep(interval)
@@ -0,0 +1,32 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from api.matching import Matcher
+
+
+class Command(BaseCommand):
+    help = (
+        "Runs the order-book matching engine (api.matching) until stopped: rebuilds the books "
+        "from the open orders, then applies the order journal as it grows. Run exactly one."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--once', action='store_true', help='Apply the journal as it stands, then exit.')
+        parser.add_argument('--batch-size', type=int, default=500, help='Journal entries applied per transaction.')
+        parser.add_argument('--poll-interval', type=float, default=0.2, help='Seconds to wait when the journal is empty.')
+
+    def handle(self, *args, **options):
+        matcher = Matcher()
+        self.stdout.write(f'Loaded {matcher.load()} open order(s)')
+        while True:
+            applied = matcher.process(options['batch_size'])
+            if applied:
+                self.stdout.write(
+                    f"{applied} journal entry(ies) applied ({matcher.stats['placed']} placed, "
+                    f"{matcher.stats['cancelled']} cancelled, {matcher.stats['trades']} trade(s) so far)"
+                )
+            if applied < options['batch_size']:
+                if options['once']:
+                    break
+                time.sleep(options['poll_interval'])
@@ -0,0 +1,31 @@
+import time
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand
+
+from api.outbox import drain, purge
+
+
+class Command(BaseCommand):
+    help = (
+        "Runs the handlers of pending outbox events (api.outbox) until stopped. Any number of "
+        "workers can run side by side; each event is claimed by one of them."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--once', action='store_true', help='Drain what is due, then exit.')
+        parser.add_argument('--batch-size', type=int, default=100, help='Events claimed per transaction.')
+        parser.add_argument('--poll-interval', type=float, default=1.0, help='Seconds to wait when nothing is due.')
+        parser.add_argument('--purge-days', type=int, default=7, help='Delete processed events older than this (0 keeps them).')
+
+    def handle(self, *args, **options):
+        while True:
+            done, failed = drain(options['batch_size'])
+            if done or failed:
+                self.stdout.write(f'{done} event(s) processed, {failed} failed')
+            if done + failed < options['batch_size']:
+                if options['purge_days']:
+                    purge(timedelta(days=options['purge_days']))
+                if options['once']:
+                    break
+                time.sleep(options['poll_interval'])
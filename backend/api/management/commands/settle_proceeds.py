@@ -0,0 +1,30 @@
+import time
+
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+from api.settlement import settle
+
+
+class Command(BaseCommand):
+    help = (
+        "Settles the unclaimed proceeds of every seller (or of --seller) in one pass, one "
+        "settlement per seller. The default key names today's date, so rerunning the command "
+        "on the same day only settles sellers that were not settled yet."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--key', help='Idempotency key of the run (default: daily-<today>).')
+        parser.add_argument('--seller', type=int, action='append', dest='sellers', help='Only this seller id (repeatable).')
+
+    def handle(self, *args, **options):
+        key = options['key'] or f'daily-{timezone.localdate().isoformat()}'
+        started = time.perf_counter()
+        created, existing = settle(key, seller_ids=options['sellers'])
+        elapsed = time.perf_counter() - started
+        self.stdout.write(
+            f"{key}: {len(created)} settlement(s) made, {sum(s.listings for s in created)} listing(s), "
+            f"{sum(s.trades for s in created)} trade(s), "
+            f"{sum(s.tonnes for s in created)} t, {sum(s.amount for s in created)} in proceeds, "
+            f"in {elapsed:.2f} s; {len(existing)} seller(s) already settled under this key"
+        )
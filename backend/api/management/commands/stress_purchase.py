@@ -0,0 +1,96 @@
+import threading
+import time
+import uuid
+
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand
+from django.db import close_old_connections
+
+from api.marketplace import ListingUnavailable, purchase_listing
+from api.models import CarbonCredit, Listing, Project
+from users.models import UserProfile
+
+
+class Command(BaseCommand):
+    help = (
+        "Hammers a single listing with concurrent purchase attempts and checks that exactly one "
+        "buyer wins. Creates its own fixtures; run it against a scratch PostgreSQL database."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--buyers', type=int, default=200, help='Number of concurrent buyer threads.')
+        parser.add_argument('--rounds', type=int, default=5, help='Number of listings to contend on, one after another.')
+        parser.add_argument('--keep', action='store_true', help='Keep the generated fixtures.')
+
+    def handle(self, *args, **options):
+        tag = uuid.uuid4().hex[:8]
+        seller = self._make_user(f'stress-{tag}-seller', UserProfile.Role.SELLER)
+        buyers = [self._make_user(f'stress-{tag}-buyer-{i}', UserProfile.Role.BUYER) for i in range(options['buyers'])]
+        project = Project.objects.create(
+            owner=seller, name=f'Stress {tag}', description='Purchase stress test', location='-',
+            tonnage=1, status=Project.ProjectStatus.APPROVED,
+        )
+
+        failures = 0
+        try:
+            for round_number in range(options['rounds']):
+                credit = CarbonCredit.objects.create(
+                    project=project, owner=seller, hedera_token_id=f'stress-{tag}',
+                    serial_number=round_number, status=CarbonCredit.CreditStatus.LISTED,
+                )
+                listing = Listing.objects.create(seller=seller, credit=credit, price=1)
+                winners, losers, errors, elapsed = self._contend(listing.pk, buyers)
+
+                credit.refresh_from_db()
+                ok = len(winners) == 1 and not errors and credit.owner_id == winners[0]
+                failures += not ok
+                self.stdout.write(
+                    f'round {round_number}: {len(winners)} winner(s), {losers} conflict(s), '
+                    f'{len(errors)} error(s) in {elapsed * 1000:.1f} ms'
+                    + ('' if ok else f' -- FAILED {errors[:3]}')
+                )
+        finally:
+            if not options['keep']:
+                project.delete()
+                User.objects.filter(username__startswith=f'stress-{tag}-').delete()
+
+        if failures:
+            self.stderr.write(self.style.ERROR(f'{failures} round(s) did not have exactly one winner.'))
+        else:
+            self.stdout.write(self.style.SUCCESS('Every round had exactly one winner.'))
+
+    def _make_user(self, username, role):
+        user = User.objects.create_user(username=username)
+        UserProfile.objects.create(user=user, role=role)
+        return user
+
+    def _contend(self, listing_id, buyers):
+        barrier = threading.Barrier(len(buyers))
+        lock = threading.Lock()
+        winners, errors = [], []
+        losers = 0
+
+        def attempt(buyer):
+            nonlocal losers
+            barrier.wait()
+            try:
+                purchase_listing(listing_id, buyer)
+            except ListingUnavailable:
+                with lock:
+                    losers += 1
+            except Exception as exc:
+                with lock:
+                    errors.append(repr(exc))
+            else:
+                with lock:
+                    winners.append(buyer.pk)
+            finally:
+                close_old_connections()
+
+        threads = [threading.Thread(target=attempt, args=(buyer,)) for buyer in buyers]
+        started = time.perf_counter()
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        return winners, losers, errors, time.perf_counter() - started
@@ -0,0 +1,375 @@
+import heapq
+import itertools
+from collections import defaultdict, deque, namedtuple
+from decimal import Decimal
+
+from django.db import connection, transaction
+from django.db.models import Count, F, Sum
+from django.utils import timezone
+
+from .models import CarbonCredit, Order, OrderJournalEntry, Trade
+from .outbox import enqueue_many
+from .portfolio import adjust
+
+
+BID, ASK = Order.Side.BID, Order.Side.ASK
+
+# Prices are matched as integer cents: exact, and much cheaper to compare than Decimals.
+CENT = Decimal('0.01')
+
+Fill = namedtuple('Fill', 'bid_id ask_id price quantity')
+
+
+def to_ticks(price):
+    return int(Decimal(price) / CENT)
+
+
+def from_ticks(ticks):
+    return Decimal(ticks) * CENT
+
+
+class BookOrder:
+    __slots__ = ('id', 'side', 'price', 'remaining', 'owner_id')
+
+    def __init__(self, id, side, price, remaining, owner_id=None):
+        self.id = id
+        self.side = side
+        self.price = price
+        self.remaining = remaining
+        self.owner_id = owner_id
+
+
+class BookSide:
+    """
+    One side of a book: a heap of price levels (negated for bids, so the best price is
+    always on top) and a FIFO queue of orders per level, which gives price-time priority.
+
+    Cancelled orders are only marked (remaining = 0) and dropped when they reach the front
+    of their level, so cancelling is O(1); each level's live volume is kept up to date.
+    """
+    def __init__(self, sign):
+        self.sign = sign
+        self.prices = []
+        self.levels = {}
+        self.volume = {}
+
+    def add(self, order):
+        level = self.levels.get(order.price)
+        if level is None:
+            level = self.levels[order.price] = deque()
+            self.volume[order.price] = 0
+            heapq.heappush(self.prices, self.sign * order.price)
+        level.append(order)
+        self.volume[order.price] += order.remaining
+
+    def best(self):
+        """
+        Returns (price, level) of the best level with a live order at its front, or (None, None).
+        """
+        while self.prices:
+            price = self.sign * self.prices[0]
+            level = self.levels[price]
+            while level and not level[0].remaining:
+                level.popleft()
+            if level:
+                return price, level
+            heapq.heappop(self.prices)
+            del self.levels[price], self.volume[price]
+        return None, None
+
+    def depth(self, levels):
+        """
+        Returns up to `levels` (price, volume) pairs, best first.
+        """
+        ordered = (self.sign * key for key in sorted(self.prices))
+        return list(itertools.islice(((price, self.volume[price]) for price in ordered if self.volume[price]), levels))
+
+
+class OrderBook:
+    def __init__(self):
+        self.bids = BookSide(-1)
+        self.asks = BookSide(1)
+        self.orders = {}
+
+    def rest(self, order):
+        """
+        Adds `order` to its side without matching (recovery of orders already in the book).
+        """
+        (self.bids if order.side == BID else self.asks).add(order)
+        self.orders[order.id] = order
+
+    def place(self, order):
+        """
+        Matches `order` against the opposite side, best price first and oldest first within
+        a price, at the resting order's price. Rests whatever is left and returns the fills.
+        """
+        bid = order.side == BID
+        opposite = self.asks if bid else self.bids
+        fills = []
+        while order.remaining:
+            price, level = opposite.best()
+            if price is None or (price > order.price if bid else price < order.price):
+                break
+            resting = level[0]
+            quantity = min(order.remaining, resting.remaining)
+            order.remaining -= quantity
+            resting.remaining -= quantity
+            opposite.volume[price] -= quantity
+            if not resting.remaining:
+                level.popleft()
+                del self.orders[resting.id]
+            fills.append(Fill(order.id, resting.id, price, quantity) if bid else Fill(resting.id, order.id, price, quantity))
+        if order.remaining:
+            self.rest(order)
+        return fills
+
+    def cancel(self, order_id):
+        """
+        Takes an order out of the book and returns its unfilled quantity (0 if not in the book).
+        """
+        order = self.orders.pop(order_id, None)
+        if order is None:
+            return 0
+        remaining, order.remaining = order.remaining, 0
+        (self.bids if order.side == BID else self.asks).volume[order.price] -= remaining
+        return remaining
+
+
+class MatchingEngine:
+    """
+    In-memory order books, one per project, and an index of which book holds each order.
+    """
+    def __init__(self):
+        self.books = defaultdict(OrderBook)
+        self.book_of = {}
+
+    def rest(self, book_key, order):
+        self.books[book_key].rest(order)
+        self.book_of[order.id] = book_key
+
+    def place(self, book_key, order):
+        book = self.books[book_key]
+        fills = book.place(order)
+        for fill in fills:
+            for order_id in (fill.bid_id, fill.ask_id):
+                if order_id not in book.orders:
+                    self.book_of.pop(order_id, None)
+        if order.id in book.orders:
+            self.book_of[order.id] = book_key
+        return fills
+
+    def cancel(self, order_id):
+        book_key = self.book_of.pop(order_id, None)
+        return self.books[book_key].cancel(order_id) if book_key is not None else 0
+
+    def depth(self, book_key, levels=10):
+        book = self.books.get(book_key)
+        if book is None:
+            return {'bids': [], 'asks': []}
+        return {'bids': book.bids.depth(levels), 'asks': book.asks.depth(levels)}
+
+
+class StaleAsk(Exception):
+    """
+    Raised when an ask's reserved lot was moved outside the order book (e.g. by an on-chain
+    transfer picked up by the mirror-node ingester), so it cannot be delivered.
+    """
+    def __init__(self, order_id, owner_id):
+        super().__init__(order_id)
+        self.order_id = order_id
+        self.owner_id = owner_id
+
+
+class Matcher:
+    """
+    Runs the matching engine against the database: applies unapplied journal entries in
+    id order, writes the resulting order updates, trades and lot transfers, and marks the
+    entries applied, a batch per transaction.
+
+    The books are rebuilt from the open orders on start and after any failed batch, so the
+    in-memory state never runs ahead of what was committed. Run exactly one per database.
+    """
+    def __init__(self):
+        self.engine = MatchingEngine()
+        self.stats = {'placed': 0, 'cancelled': 0, 'trades': 0}
+
+    def load(self):
+        self.engine = MatchingEngine()
+        open_orders = Order.objects.filter(status=Order.OrderStatus.OPEN).order_by('sequence').values_list(
+            'pk', 'project_id', 'side', 'price', 'remaining', 'owner_id'
+        )
+        for pk, project_id, side, price, remaining, owner_id in open_orders.iterator(chunk_size=2000):
+            self.engine.rest(project_id, BookOrder(pk, side, to_ticks(price), remaining, owner_id))
+        return len(self.engine.book_of)
+
+    def process(self, batch_size=500):
+        """
+        Applies up to `batch_size` journal entries in one transaction and returns how many.
+        """
+        while True:
+            entries = list(
+                OrderJournalEntry.objects.filter(applied=False).select_related('order', 'order__credit')
+                .order_by('pk')[:batch_size]
+            )
+            if not entries:
+                return 0
+            batch = _Batch()
+            try:
+                with transaction.atomic():
+                    for entry in entries:
+                        self._apply(entry, batch)
+                    batch.save()
+                    OrderJournalEntry.objects.filter(pk__in=[entry.pk for entry in entries]).update(applied=True)
+            except StaleAsk as exc:
+                # Cancel the undeliverable ask and replay the batch without it.
+                with transaction.atomic():
+                    if Order.objects.filter(
+                        pk=exc.order_id, status__in=[Order.OrderStatus.PENDING, Order.OrderStatus.OPEN]
+                    ).update(status=Order.OrderStatus.CANCELLED, updated_at=timezone.now()):
+                        adjust(exc.owner_id, listings_active=-1)
+                self.load()
+                continue
+            except BaseException:
+                self.load()
+                raise
+            self.stats['placed'] += batch.placed
+            self.stats['cancelled'] += batch.cancelled
+            self.stats['trades'] += len(batch.trades)
+            return len(entries)
+
+    def _apply(self, entry, batch):
+        order = batch.orders.setdefault(entry.order_id, entry.order)
+        if entry.action == OrderJournalEntry.Action.CANCEL:
+            if order.status != Order.OrderStatus.OPEN:
+                return
+            self.engine.cancel(order.pk)
+            order.status = Order.OrderStatus.CANCELLED
+            batch.touched.add(order.pk)
+            batch.cancelled += 1
+            if order.side == ASK:
+                deltas = batch.deltas[order.owner_id]
+                deltas['listings_active'] -= 1
+                if CarbonCredit.objects.filter(
+                    pk=order.credit_id, owner_id=order.owner_id, status=CarbonCredit.CreditStatus.RESERVED
+                ).update(status=CarbonCredit.CreditStatus.MINTED, updated_at=timezone.now()):
+                    deltas['tonnes_available'] += order.remaining
+                    deltas['tonnes_listed'] -= order.remaining
+            return
+
+        if order.status != Order.OrderStatus.PENDING:
+            return
+        order.sequence = entry.pk
+        fills = self.engine.place(
+            order.project_id, BookOrder(order.pk, order.side, to_ticks(order.price), order.remaining, order.owner_id)
+        )
+        for fill in fills:
+            self._fill(fill, order, batch)
+        order.status = Order.OrderStatus.OPEN if order.remaining else Order.OrderStatus.FILLED
+        batch.touched.add(order.pk)
+        batch.placed += 1
+
+    def _fill(self, fill, incoming, batch):
+        bid, ask = (batch.order(fill.bid_id), batch.order(fill.ask_id))
+        quantity = fill.quantity
+        bid.remaining -= quantity
+        ask.remaining -= quantity
+        for order in (bid, ask):
+            if order is not incoming:
+                order.status = Order.OrderStatus.OPEN if order.remaining else Order.OrderStatus.FILLED
+            batch.touched.add(order.pk)
+
+        # Same transfer as a listing purchase (api.marketplace.split_lot): the last fill of
+        # an ask hands over its lot itself, earlier ones carve a new lot off it for the
+        # buyer. New lots are inserted with the batch's trades, in one statement.
+        reserved = {'status': CarbonCredit.CreditStatus.RESERVED, 'owner_id': ask.owner_id}
+        if ask.remaining:
+            if not CarbonCredit.objects.filter(pk=ask.credit_id, quantity__gt=quantity, **reserved).update(
+                quantity=F('quantity') - quantity, updated_at=timezone.now()
+            ):
+                raise StaleAsk(ask.pk, ask.owner_id)
+            lot = CarbonCredit(
+                project_id=ask.project_id, hedera_token_id=ask.credit.hedera_token_id, serial_number=ask.credit.serial_number,
+                quantity=quantity, parent_id=ask.credit_id, owner_id=bid.owner_id, status=CarbonCredit.CreditStatus.SOLD,
+            )
+            batch.lots.append(lot)
+        else:
+            if not CarbonCredit.objects.filter(pk=ask.credit_id, quantity=quantity, **reserved).update(
+                owner_id=bid.owner_id, status=CarbonCredit.CreditStatus.SOLD, updated_at=timezone.now()
+            ):
+                raise StaleAsk(ask.pk, ask.owner_id)
+            lot = ask.credit
+
+        price = from_ticks(fill.price)
+        batch.trades.append(Trade(
+            project_id=ask.project_id, bid_id=bid.pk, ask_id=ask.pk, buyer_id=bid.owner_id, seller_id=ask.owner_id,
+            credit=lot, price=price, quantity=quantity,
+        ))
+        # Counted like a sale through a listing (api.marketplace.purchase_listing).
+        seller, buyer = batch.deltas[ask.owner_id], batch.deltas[bid.owner_id]
+        seller['credits_owned'] -= 0 if ask.remaining else 1
+        seller['listings_active'] -= 0 if ask.remaining else 1
+        seller['tonnes_owned'] -= quantity
+        seller['tonnes_listed'] -= quantity
+        seller['tonnes_sold'] += quantity
+        seller['proceeds_unclaimed'] += price * quantity
+        buyer['credits_owned'] += 1
+        buyer['tonnes_owned'] += quantity
+
+
+ORDER_UPDATE_SQL = f'UPDATE {Order._meta.db_table} SET remaining = %s, status = %s, sequence = %s, updated_at = %s WHERE id = %s'
+
+
+class _Batch:
+    """
+    Writes collected while applying a batch of journal entries, flushed together.
+    """
+    def __init__(self):
+        self.orders = {}
+        self.touched = set()
+        self.lots = []
+        self.trades = []
+        self.deltas = defaultdict(lambda: defaultdict(int))
+        self.placed = self.cancelled = 0
+
+    def order(self, pk):
+        if pk not in self.orders:
+            self.orders[pk] = Order.objects.select_related('credit').get(pk=pk)
+        return self.orders[pk]
+
+    def save(self):
+        # One prepared UPDATE run per row: bulk_update's CASE expressions grow with the batch
+        # and took half of the engine's time.
+        now = timezone.now()
+        with connection.cursor() as cursor:
+            cursor.executemany(ORDER_UPDATE_SQL, [
+                (order.remaining, order.status, order.sequence, now, order.pk)
+                for order in map(self.orders.get, self.touched)
+            ])
+        CarbonCredit.objects.bulk_create(self.lots, batch_size=500)
+        trades = Trade.objects.bulk_create(self.trades, batch_size=500)
+        for user_id, deltas in self.deltas.items():
+            adjust(user_id, **deltas)
+        if trades:
+            enqueue_many('trade.executed', [
+                ({
+                    'trade_id': trade.pk, 'project_id': trade.project_id, 'bid_id': trade.bid_id, 'ask_id': trade.ask_id,
+                    'buyer_id': trade.buyer_id, 'seller_id': trade.seller_id, 'credit_id': trade.credit_id,
+                    'price': str(trade.price), 'quantity': trade.quantity,
+                }, f'trade.executed:{trade.pk}')
+                for trade in trades
+            ])
+
+
+def book_depth(project_id, levels=10):
+    """
+    Returns the top `levels` price levels of each side of a project's book as committed by
+    the matching engine, best first: {'bids': [{price, tonnes, orders}], 'asks': [...]}.
+    """
+    open_orders = Order.objects.filter(project_id=project_id, status=Order.OrderStatus.OPEN)
+    return {
+        key: list(
+            open_orders.filter(side=side).values('price')
+            .annotate(tonnes=Sum('remaining'), orders=Count('id')).order_by(order_by)[:levels]
+        )
+        for side, key, order_by in ((BID, 'bids', '-price'), (ASK, 'asks', 'price'))
+    }
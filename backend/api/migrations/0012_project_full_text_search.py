@@ -0,0 +1,78 @@
+from django.db import migrations
+
+
+# The DDL as it stood when this migration was written; api/search.py may change later.
+# SQLite (DEBUG) gets an external-content FTS5 index over api_project kept up to date by
+# triggers, PostgreSQL a weighted tsvector generated column indexed with GIN.
+SQLITE_INSTALL = [
+    """
+    CREATE VIRTUAL TABLE IF NOT EXISTS api_project_fts USING fts5(
+        name, description, location,
+        content='api_project', content_rowid='id', tokenize='unicode61 remove_diacritics 2'
+    )
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS api_project_fts_ai AFTER INSERT ON api_project BEGIN
+        INSERT INTO api_project_fts(rowid, name, description, location)
+        VALUES (new.id, new.name, new.description, new.location);
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS api_project_fts_ad AFTER DELETE ON api_project BEGIN
+        INSERT INTO api_project_fts(api_project_fts, rowid, name, description, location)
+        VALUES ('delete', old.id, old.name, old.description, old.location);
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS api_project_fts_au AFTER UPDATE OF name, description, location ON api_project BEGIN
+        INSERT INTO api_project_fts(api_project_fts, rowid, name, description, location)
+        VALUES ('delete', old.id, old.name, old.description, old.location);
+        INSERT INTO api_project_fts(rowid, name, description, location)
+        VALUES (new.id, new.name, new.description, new.location);
+    END
+    """,
+    "INSERT INTO api_project_fts(api_project_fts) VALUES ('rebuild')",
+]
+SQLITE_UNINSTALL = [
+    'DROP TRIGGER IF EXISTS api_project_fts_ad',
+    'DROP TRIGGER IF EXISTS api_project_fts_ai',
+    'DROP TRIGGER IF EXISTS api_project_fts_au',
+    'DROP TABLE IF EXISTS api_project_fts',
+]
+
+POSTGRES_INSTALL = [
+    """
+    ALTER TABLE api_project ADD COLUMN IF NOT EXISTS search_vector tsvector GENERATED ALWAYS AS (
+        setweight(to_tsvector('simple', coalesce(name, '')), 'A') ||
+        setweight(to_tsvector('simple', coalesce(location, '')), 'B') ||
+        setweight(to_tsvector('simple', coalesce(description, '')), 'C')
+    ) STORED
+    """,
+    'CREATE INDEX IF NOT EXISTS api_project_search_idx ON api_project USING GIN (search_vector)',
+]
+POSTGRES_UNINSTALL = [
+    'DROP INDEX IF EXISTS api_project_search_idx',
+    'ALTER TABLE api_project DROP COLUMN IF EXISTS search_vector',
+]
+
+
+def run(statements):
+    def operation(apps, schema_editor):
+        vendor = schema_editor.connection.vendor
+        for statement in statements.get(vendor, ()):
+            schema_editor.execute(statement)
+    return operation
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0011_listing_filter_indexes'),
+    ]
+
+    operations = [
+        migrations.RunPython(
+            run({'sqlite': SQLITE_INSTALL, 'postgresql': POSTGRES_INSTALL}),
+            run({'sqlite': SQLITE_UNINSTALL, 'postgresql': POSTGRES_UNINSTALL}),
+        ),
+    ]
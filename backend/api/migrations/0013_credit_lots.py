@@ -0,0 +1,55 @@
+# Generated by Django 5.0 on 2026-10-18 13:14
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+def backfill_lot_state(apps, schema_editor):
+    CarbonCredit = apps.get_model('api', 'CarbonCredit')
+    Listing = apps.get_model('api', 'Listing')
+    # Withdrawn listings used to leave their credit LISTED; lots are now only LISTED while on sale.
+    CarbonCredit.objects.filter(status='LISTED', listing__is_active=False).update(status='MINTED')
+    # Every pre-existing credit was minted for its project's whole tonnage.
+    CarbonCredit.objects.filter(project__tonnage__gt=0).update(quantity=models.Subquery(
+        CarbonCredit.objects.filter(pk=models.OuterRef('pk')).values('project__tonnage')[:1]
+    ))
+    # Sales were all-or-nothing, so a completed sale sold the whole lot.
+    Listing.objects.filter(is_active=False, credit__status='SOLD').update(quantity_sold=models.Subquery(
+        CarbonCredit.objects.filter(pk=models.OuterRef('credit_id')).values('quantity')[:1]
+    ))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0012_project_full_text_search'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AlterUniqueTogether(
+            name='carboncredit',
+            unique_together=set(),
+        ),
+        migrations.AddField(
+            model_name='carboncredit',
+            name='parent',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.RESTRICT, related_name='lots', to='api.carboncredit'),
+        ),
+        migrations.AddField(
+            model_name='carboncredit',
+            name='quantity',
+            field=models.PositiveIntegerField(default=1),
+        ),
+        migrations.AddField(
+            model_name='listing',
+            name='quantity_sold',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddConstraint(
+            model_name='carboncredit',
+            constraint=models.UniqueConstraint(condition=models.Q(('parent__isnull', True)), fields=('hedera_token_id', 'serial_number'), name='credit_token_serial_uniq'),
+        ),
+        migrations.RunPython(backfill_lot_state, migrations.RunPython.noop),
+    ]
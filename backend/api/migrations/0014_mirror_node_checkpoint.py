@@ -0,0 +1,23 @@
+# Generated by Django 5.0 on 2026-10-18 13:28
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0013_credit_lots'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='MirrorNodeCheckpoint',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('stream', models.CharField(max_length=100, unique=True)),
+                ('timestamp', models.CharField(blank=True, default='', max_length=32)),
+                ('events', models.BigIntegerField(default=0)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+        ),
+    ]
@@ -0,0 +1,38 @@
+# Generated by Django 5.0 on 2026-10-18 13:50
+
+import django.utils.timezone
+from django.db import migrations, models
+
+
+def backfill_credit_updated_at(apps, schema_editor):
+    CarbonCredit = apps.get_model('api', 'CarbonCredit')
+    CarbonCredit.objects.update(updated_at=models.F('created_at'))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0016_exchange_rate'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='carboncredit',
+            name='updated_at',
+            field=models.DateTimeField(auto_now=True, default=django.utils.timezone.now),
+            preserve_default=False,
+        ),
+        migrations.RunPython(backfill_credit_updated_at, migrations.RunPython.noop),
+        migrations.AddIndex(
+            model_name='carboncredit',
+            index=models.Index(fields=['updated_at', 'id'], name='credit_updated_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='project',
+            index=models.Index(fields=['updated_at', 'id'], name='project_updated_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='listing',
+            index=models.Index(fields=['updated_at', 'id'], name='listing_updated_idx'),
+        ),
+    ]
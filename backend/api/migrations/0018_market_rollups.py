@@ -0,0 +1,53 @@
+# Generated by Django 5.0 on 2026-10-18 13:41
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0017_export_updated_at'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='MarketRollup',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('dimension', models.CharField(max_length=20)),
+                ('key', models.CharField(blank=True, default='', max_length=255)),
+                ('day', models.DateField()),
+                ('listings', models.PositiveIntegerField(default=0)),
+                ('listed_tonnes', models.PositiveBigIntegerField(default=0)),
+                ('trades', models.PositiveIntegerField(default=0)),
+                ('sold_tonnes', models.PositiveBigIntegerField(default=0)),
+                ('volume', models.DecimalField(decimal_places=2, default=0, max_digits=20)),
+            ],
+        ),
+        migrations.CreateModel(
+            name='MarketPriceBand',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('dimension', models.CharField(max_length=20)),
+                ('key', models.CharField(blank=True, default='', max_length=255)),
+                ('day', models.DateField()),
+                ('band', models.IntegerField()),
+                ('sold_tonnes', models.PositiveBigIntegerField(default=0)),
+            ],
+            options={
+                'indexes': [models.Index(fields=['dimension', 'day'], name='market_price_band_day_idx')],
+            },
+        ),
+        migrations.AddConstraint(
+            model_name='marketpriceband',
+            constraint=models.UniqueConstraint(fields=('dimension', 'key', 'day', 'band'), name='market_price_band_uniq'),
+        ),
+        migrations.AddIndex(
+            model_name='marketrollup',
+            index=models.Index(fields=['dimension', 'day'], name='market_rollup_day_idx'),
+        ),
+        migrations.AddConstraint(
+            model_name='marketrollup',
+            constraint=models.UniqueConstraint(fields=('dimension', 'key', 'day'), name='market_rollup_uniq'),
+        ),
+    ]
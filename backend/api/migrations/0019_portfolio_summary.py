@@ -0,0 +1,33 @@
+# Generated by Django 5.0 on 2026-10-18 13:44
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0018_market_rollups'),
+        ('auth', '0012_alter_user_first_name_max_length'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='PortfolioSummary',
+            fields=[
+                ('user', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='portfolio', serialize=False, to=settings.AUTH_USER_MODEL)),
+                ('projects_pending', models.IntegerField(default=0)),
+                ('projects_approved', models.IntegerField(default=0)),
+                ('projects_rejected', models.IntegerField(default=0)),
+                ('credits_owned', models.IntegerField(default=0)),
+                ('tonnes_owned', models.BigIntegerField(default=0)),
+                ('tonnes_available', models.BigIntegerField(default=0)),
+                ('listings_active', models.IntegerField(default=0)),
+                ('tonnes_listed', models.BigIntegerField(default=0)),
+                ('tonnes_sold', models.BigIntegerField(default=0)),
+                ('proceeds_unclaimed', models.DecimalField(decimal_places=2, default=0, max_digits=20)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+        ),
+    ]
@@ -0,0 +1,74 @@
+# Generated by Django 5.0 on 2026-10-18 14:02
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+def backfill_quantity_claimed(apps, schema_editor):
+    # Listings claimed before settlements existed were claimed in full.
+    Listing = apps.get_model('api', 'Listing')
+    Listing.objects.filter(claimed=True).update(quantity_claimed=models.F('quantity_sold'))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0020_order_book'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Settlement',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('idempotency_key', models.CharField(max_length=255)),
+                ('listings', models.PositiveIntegerField(default=0)),
+                ('tonnes', models.PositiveBigIntegerField(default=0)),
+                ('amount', models.DecimalField(decimal_places=2, default=0, max_digits=20)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+            ],
+        ),
+        migrations.CreateModel(
+            name='SettlementLine',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('tonnes', models.PositiveIntegerField()),
+                ('amount', models.DecimalField(decimal_places=2, max_digits=20)),
+            ],
+        ),
+        migrations.AddField(
+            model_name='listing',
+            name='quantity_claimed',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.RunPython(backfill_quantity_claimed, migrations.RunPython.noop),
+        migrations.AddIndex(
+            model_name='listing',
+            index=models.Index(condition=models.Q(('quantity_sold__gt', models.F('quantity_claimed'))), fields=['seller', 'id'], name='listing_unsettled_idx'),
+        ),
+        migrations.AddField(
+            model_name='settlement',
+            name='seller',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='settlements', to=settings.AUTH_USER_MODEL),
+        ),
+        migrations.AddField(
+            model_name='settlementline',
+            name='listing',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='settlement_lines', to='api.listing'),
+        ),
+        migrations.AddField(
+            model_name='settlementline',
+            name='settlement',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='lines', to='api.settlement'),
+        ),
+        migrations.AddIndex(
+            model_name='settlement',
+            index=models.Index(fields=['seller', '-created_at', '-id'], name='settlement_seller_created_idx'),
+        ),
+        migrations.AddConstraint(
+            model_name='settlement',
+            constraint=models.UniqueConstraint(fields=('seller', 'idempotency_key'), name='settlement_seller_key_uniq'),
+        ),
+    ]
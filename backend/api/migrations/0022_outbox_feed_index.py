@@ -0,0 +1,17 @@
+# Generated by Django 5.0 on 2026-10-18 14:09
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0021_settlements'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='outboxevent',
+            index=models.Index(condition=models.Q(('topic__in', ['listing.created', 'listing.sold', 'listing.withdrawn', 'project.approved'])), fields=['created_at'], name='outbox_feed_idx'),
+        ),
+    ]
@@ -0,0 +1,58 @@
+# Generated by Django 5.0 on 2026-10-18 14:25
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+def reserve_ask_lots(apps, schema_editor):
+    # Lots of asks still in the book were marked LISTED, like those of listings.
+    CarbonCredit = apps.get_model('api', 'CarbonCredit')
+    Order = apps.get_model('api', 'Order')
+    open_asks = Order.objects.filter(side='ASK', status__in=['PENDING', 'OPEN'])
+    CarbonCredit.objects.filter(pk__in=open_asks.values('credit_id'), status='LISTED').update(status='RESERVED')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0023_listing_relist'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='settlement',
+            name='trades',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='settlementline',
+            name='trade',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='settlement_lines', to='api.trade'),
+        ),
+        migrations.AddField(
+            model_name='trade',
+            name='claimed',
+            field=models.BooleanField(default=False),
+        ),
+        migrations.AlterField(
+            model_name='carboncredit',
+            name='status',
+            field=models.CharField(choices=[('MINTED', 'Minted'), ('LISTED', 'Listed for Sale'), ('RESERVED', 'Reserved by an Ask'), ('SOLD', 'Sold')], default='MINTED', max_length=10),
+        ),
+        migrations.AlterField(
+            model_name='settlementline',
+            name='listing',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='settlement_lines', to='api.listing'),
+        ),
+        migrations.AddIndex(
+            model_name='trade',
+            index=models.Index(condition=models.Q(('claimed', False)), fields=['seller'], name='trade_unclaimed_idx'),
+        ),
+        migrations.AddConstraint(
+            model_name='settlementline',
+            constraint=models.CheckConstraint(check=models.Q(models.Q(('listing__isnull', False), ('trade__isnull', True)), models.Q(('listing__isnull', True), ('trade__isnull', False)), _connector='OR'), name='settlement_line_one_source'),
+        ),
+        migrations.RunPython(reserve_ask_lots, migrations.RunPython.noop),
+    ]
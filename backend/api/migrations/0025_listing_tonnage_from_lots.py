@@ -0,0 +1,23 @@
+# Generated by Django 5.0 on 2026-10-18 14:45
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0024_order_book_accounting'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.RemoveIndex(
+            model_name='project',
+            name='project_tonnage_idx',
+        ),
+        migrations.AddIndex(
+            model_name='carboncredit',
+            index=models.Index(condition=models.Q(('status', 'LISTED')), fields=['quantity', 'id'], name='credit_listed_quantity_idx'),
+        ),
+    ]
@@ -0,0 +1,30 @@
+# Generated by Django 5.0 on 2026-10-18 16:20
+
+import django.utils.timezone
+from django.db import migrations, models
+
+
+def backfill_trade_updated_at(apps, schema_editor):
+    Trade = apps.get_model('api', 'Trade')
+    Trade.objects.update(updated_at=models.F('created_at'))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0025_listing_tonnage_from_lots'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='trade',
+            name='updated_at',
+            field=models.DateTimeField(auto_now=True, default=django.utils.timezone.now),
+            preserve_default=False,
+        ),
+        migrations.RunPython(backfill_trade_updated_at, migrations.RunPython.noop),
+        migrations.AddIndex(
+            model_name='trade',
+            index=models.Index(fields=['updated_at', 'id'], name='trade_updated_idx'),
+        ),
+    ]
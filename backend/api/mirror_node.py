@@ -0,0 +1,265 @@
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import urljoin
+
+import requests
+from django.conf import settings
+from django.db import transaction
+from django.utils import timezone
+
+from .cache import listing_feed_cache
+from .marketplace import account_sale
+from .models import CarbonCredit, Listing, MirrorNodeCheckpoint
+from .portfolio import rebuild
+from users.models import UserProfile
+
+
+TRANSFERS_STREAM = 'nft-transfers'
+
+
+def normalize_entity_id(value):
+    """
+    Returns a mirror-node account or token id as `shard.realm.num`. Long-zero EVM
+    addresses (0x000...0<num>) are converted; other values are returned unchanged.
+    """
+    if not value:
+        return None
+    if value.startswith('0x') and len(value) == 42 and int(value[2:26], 16) == 0:
+        return f'0.0.{int(value[26:], 16)}'
+    return value
+
+
+class MirrorNodeClient:
+    """
+    Minimal client for the Hedera mirror-node REST API. `pages` follows `links.next` and
+    requests each following page while the caller is still processing the current one.
+    """
+    def __init__(self, base_url=None, timeout=30):
+        self.base_url = (base_url or settings.MIRROR_NODE_URL).rstrip('/') + '/'
+        self.timeout = timeout
+        self.session = requests.Session()
+
+    def get(self, path, params=None):
+        response = self.session.get(urljoin(self.base_url, path.lstrip('/')), params=params, timeout=self.timeout)
+        response.raise_for_status()
+        return response.json()
+
+    def pages(self, path, params=None):
+        with ThreadPoolExecutor(max_workers=1) as prefetch:
+            pending = prefetch.submit(self.get, path, params)
+            while pending is not None:
+                page = pending.result()
+                following = (page.get('links') or {}).get('next')
+                pending = prefetch.submit(self.get, following) if following else None
+                yield page
+
+    def nft_transfers(self, after=None, limit=100):
+        """
+        Yields pages of NFT transfers from successful crypto transfers after the consensus
+        timestamp `after`, oldest first. Each page is a list of transfer dicts.
+        """
+        params = {'transactiontype': 'CRYPTOTRANSFER', 'result': 'success', 'order': 'asc', 'limit': limit}
+        if after:
+            params['timestamp'] = f'gt:{after}'
+        for page in self.pages('/api/v1/transactions', params):
+            transactions = page.get('transactions', [])
+            yield [
+                {
+                    'timestamp': tx['consensus_timestamp'],
+                    'token_id': normalize_entity_id(transfer['token_id']),
+                    'serial_number': int(transfer['serial_number']),
+                    'sender': normalize_entity_id(transfer.get('sender_account_id')),
+                    'receiver': normalize_entity_id(transfer.get('receiver_account_id')),
+                }
+                for tx in transactions
+                for transfer in tx.get('nft_transfers') or ()
+            ], transactions[-1]['consensus_timestamp'] if transactions else None
+
+    def nft_holders(self, token_id, limit=100):
+        """
+        Yields pages of (serial_number, account_id) for every live serial of `token_id`.
+        """
+        for page in self.pages(f'/api/v1/tokens/{token_id}/nfts', {'limit': limit}):
+            yield [
+                (int(nft['serial_number']), normalize_entity_id(nft.get('account_id')))
+                for nft in page.get('nfts', []) if not nft.get('deleted')
+            ]
+
+
+class Reconciler:
+    """
+    Applies on-chain NFT movements to the originally minted lot of each serial, in batches.
+
+    A batch loads its lots, their active listings and the accounts involved with three
+    locking/lookup queries, replays the events in memory, then writes only the rows that
+    changed with bulk updates, so the cost per event stays flat. The portfolio summaries of
+    everyone involved are recomputed once per batch. Lots split off-chain
+    (fractional sales) are not represented on-chain and are left alone.
+
+    - owner -> marketplace account: the lot is LISTED if it has an active listing; a lot
+      escrowed ahead of its listing stays as it is, so the API can still list it.
+    - marketplace -> its owner: the listing was withdrawn; the lot returns to MINTED.
+    - marketplace -> another user: the lot was bought and the listing closes.
+    - user -> user: the lot changes owner and any listing or ask of it closes.
+    Events already applied through the API leave the rows unchanged.
+    """
+    def __init__(self, marketplace_account=None):
+        self.marketplace_account = marketplace_account or settings.HEDERA_MARKETPLACE_ACCOUNT_ID
+        self.stats = {'applied': 0, 'unchanged': 0, 'skipped': 0}
+
+    def apply_transfers(self, transfers, stream=TRANSFERS_STREAM, timestamp=None):
+        """
+        Applies `transfers` (consensus order) and advances the `stream` checkpoint to
+        `timestamp` in the same transaction.
+        """
+        with transaction.atomic():
+            credits, listings, users = self._load(
+                {(t['token_id'], t['serial_number']) for t in transfers},
+                {account for t in transfers for account in (t['sender'], t['receiver']) if account},
+            )
+            changed_credits, changed_listings, sales = {}, set(), []
+            for transfer in transfers:
+                credit = credits.get((transfer['token_id'], transfer['serial_number']))
+                if credit is None or transfer['sender'] is None or transfer['receiver'] is None:
+                    # Unknown serial, mint or burn: nothing to reconcile.
+                    self.stats['skipped'] += 1
+                    continue
+                before = (credit.owner_id, credit.status)
+                listing = listings.get(credit.pk)
+                if not self._apply(transfer, credit, listing, users, sales):
+                    self.stats['skipped'] += 1
+                    continue
+                self._track(credit, before, listing, changed_credits, changed_listings)
+                if listing is not None and not listing.is_active:
+                    del listings[credit.pk]
+
+            self._save(changed_credits, changed_listings, sales)
+            if timestamp:
+                checkpoint, _ = MirrorNodeCheckpoint.objects.select_for_update().get_or_create(stream=stream)
+                checkpoint.timestamp = timestamp
+                checkpoint.events += len(transfers)
+                checkpoint.save()
+
+    def apply_holders(self, token_id, holders):
+        """
+        Reconciles current owners from a snapshot of (serial_number, account_id) pairs.
+        """
+        with transaction.atomic():
+            credits, listings, users = self._load(
+                {(token_id, serial) for serial, _ in holders}, {account for _, account in holders if account}
+            )
+            changed_credits, changed_listings = {}, set()
+            for serial, account in holders:
+                credit = credits.get((token_id, serial))
+                if credit is None or account is None:
+                    self.stats['skipped'] += 1
+                    continue
+                listing = listings.get(credit.pk)
+                before = (credit.owner_id, credit.status)
+                if account == self.marketplace_account:
+                    self._escrow(credit, listing)
+                elif users.get(account) is None:
+                    self.stats['skipped'] += 1
+                    continue
+                elif users[account] != credit.owner_id or credit.status == CarbonCredit.CreditStatus.LISTED:
+                    self._transfer(credit, listing, users[account])
+                self._track(credit, before, listing, changed_credits, changed_listings)
+            self._save(changed_credits, changed_listings)
+
+    def _apply(self, transfer, credit, listing, users, sales):
+        sender, receiver = transfer['sender'], transfer['receiver']
+        if receiver == self.marketplace_account:
+            self._escrow(credit, listing)
+            return True
+
+        user_id = users.get(receiver)
+        if user_id is None:
+            return False
+        if sender == self.marketplace_account and user_id == credit.owner_id:
+            # Withdrawn from sale.
+            if credit.status == CarbonCredit.CreditStatus.LISTED:
+                credit.status = CarbonCredit.CreditStatus.MINTED
+            if listing is not None:
+                listing.is_active = False
+        elif sender == self.marketplace_account:
+            # Bought. Only what was still on sale is sold now: tonnes bought through the API
+            # were carved off the listed lot and are already in quantity_sold.
+            remainder = credit.quantity if credit.status == CarbonCredit.CreditStatus.LISTED else 0
+            credit.owner_id, credit.status = user_id, CarbonCredit.CreditStatus.SOLD
+            if listing is not None:
+                listing.is_active = False
+                if remainder:
+                    listing.quantity_sold += remainder
+                    listing.claimed = False
+                    sales.append((listing, credit.project_id, credit.pk, user_id, remainder))
+        elif user_id != credit.owner_id:
+            self._transfer(credit, listing, user_id)
+        return True
+
+    def _escrow(self, credit, listing):
+        # Only a lot with an active listing is LISTED: list_credit only accepts MINTED lots.
+        if listing is not None:
+            credit.status = CarbonCredit.CreditStatus.LISTED
+
+    def _transfer(self, credit, listing, user_id):
+        credit.owner_id = user_id
+        # An ask holding the lot can no longer deliver it; the matching engine cancels it.
+        if credit.status in (CarbonCredit.CreditStatus.LISTED, CarbonCredit.CreditStatus.RESERVED):
+            credit.status = CarbonCredit.CreditStatus.MINTED
+        if listing is not None:
+            listing.is_active = False
+
+    def _track(self, credit, before, listing, changed_credits, changed_listings):
+        changed = False
+        if (credit.owner_id, credit.status) != before:
+            # Remembers the owner the lot had when loaded, whose summary changes too.
+            changed_credits.setdefault(credit, before[0])
+            changed = True
+        if listing is not None and not listing.is_active and listing not in changed_listings:
+            changed_listings.add(listing)
+            changed = True
+        self.stats['applied' if changed else 'unchanged'] += 1
+
+    def _load(self, keys, accounts):
+        tokens = {token_id for token_id, _ in keys}
+        serials = {serial for _, serial in keys}
+        # Same lock order as api.marketplace: listings first, then their lots.
+        listings = {
+            listing.credit_id: listing
+            for listing in Listing.objects.select_for_update(of=('self',))
+            .filter(
+                is_active=True, credit__parent__isnull=True,
+                credit__hedera_token_id__in=tokens, credit__serial_number__in=serials,
+            )
+            .only('pk', 'credit_id', 'seller_id', 'price', 'is_active', 'quantity_sold', 'claimed').order_by('pk')
+        }
+        credits = {
+            (credit.hedera_token_id, credit.serial_number): credit
+            for credit in CarbonCredit.objects.select_for_update()
+            .filter(parent__isnull=True, hedera_token_id__in=tokens, serial_number__in=serials)
+            .only('pk', 'owner_id', 'project_id', 'status', 'quantity', 'hedera_token_id', 'serial_number').order_by('pk')
+            if (credit.hedera_token_id, credit.serial_number) in keys
+        }
+        users = dict(
+            UserProfile.objects.filter(hedera_account_id__in=accounts).values_list('hedera_account_id', 'user_id')
+        )
+        return credits, listings, users
+
+    def _save(self, credits, listings, sales=()):
+        now = timezone.now()
+        if credits:
+            for credit in credits:
+                credit.updated_at = now
+            CarbonCredit.objects.bulk_update(credits, ['owner', 'status', 'updated_at'], batch_size=500)
+        if listings:
+            for listing in listings:
+                listing.updated_at = now
+            Listing.objects.bulk_update(listings, ['is_active', 'quantity_sold', 'claimed', 'updated_at'], batch_size=500)
+            listing_feed_cache.invalidate_on_commit()
+        # Sales are booked like purchases through the API (listing.sold events included);
+        # the recomputation below then settles the counters of everyone involved.
+        for sale in sales:
+            account_sale(*sale, closed=True)
+        users = {*credits.values(), *(credit.owner_id for credit in credits), *(listing.seller_id for listing in listings)}
+        users.discard(None)
+        if users:
+            rebuild(users)
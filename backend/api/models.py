@@ -1,6 +1,8 @@
 from django.db import models
 from django.contrib.auth.models import User
 from django.conf import settings
+from django.db.models.functions import Upper
+from django.utils import timezone
 
 
 class Project(models.Model):
@@ -24,6 +26,21 @@ class Project(models.Model):
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
 
+    class Meta:
+        indexes = [
+            # Approved catalogue and pending-review queues, newest first.
+            models.Index(fields=['status', '-created_at', '-id'], name='project_status_created_idx'),
+            # Pending queue as its own small index: it stays tiny however large the catalogue grows.
+            models.Index(fields=['-created_at', '-id'], condition=models.Q(status='PENDING'), name='project_pending_created_idx'),
+            # Seller dashboard (my-projects).
+            models.Index(fields=['owner', '-created_at', '-id'], name='project_owner_created_idx'),
+            # Marketplace filters on the listed project.
+            models.Index(fields=['vintage', 'tonnage'], name='project_vintage_tonnage_idx'),
+            models.Index(Upper('location'), name='project_location_upper_idx'),
+            # Incremental exports (api/exports.py).
+            models.Index(fields=['updated_at', 'id'], name='project_updated_idx'),
+        ]
+
     def __str__(self):
         return self.name
 
@@ -31,6 +48,7 @@ class CarbonCredit(models.Model):
     class CreditStatus(models.TextChoices):
         MINTED = 'MINTED', 'Minted'
         LISTED = 'LISTED', 'Listed for Sale'
+        RESERVED = 'RESERVED', 'Reserved by an Ask'
         SOLD = 'SOLD', 'Sold'
 
     project = models.ForeignKey(Project, on_delete=models.CASCADE, related_name='credits')
@@ -38,22 +56,334 @@ class CarbonCredit(models.Model):
     hedera_token_id = models.CharField(max_length=255)
     serial_number = models.BigIntegerField()
     status = models.CharField(max_length=10, choices=CreditStatus.choices, default=CreditStatus.MINTED)
+    quantity = models.PositiveIntegerField(default=1) # Tonnes held in this lot
+    parent = models.ForeignKey('self', on_delete=models.RESTRICT, null=True, blank=True, related_name='lots') # Lot this one was split from
     created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True) # Set explicitly by the queryset updates in api.marketplace
 
     class Meta:
-        unique_together = ['hedera_token_id', 'serial_number']
+        constraints = [
+            # Split lots share their token serial with the lot they were carved from;
+            # only the originally minted lot is unique per serial.
+            models.UniqueConstraint(fields=['hedera_token_id', 'serial_number'], condition=models.Q(parent__isnull=True), name='credit_token_serial_uniq'),
+        ]
+        indexes = [
+            # Owner portfolio (my-nfts), newest first.
+            models.Index(fields=['owner', '-created_at', '-id'], name='credit_owner_created_idx'),
+            # Marketplace tonnage filter and sort: the lots of active listings.
+            models.Index(fields=['quantity', 'id'], condition=models.Q(status='LISTED'), name='credit_listed_quantity_idx'),
+            # Incremental exports (api/exports.py).
+            models.Index(fields=['updated_at', 'id'], name='credit_updated_idx'),
+        ]
 
     def __str__(self):
         return f'Credit #{self.serial_number} for {self.project.name}'
 
 class Listing(models.Model):
     seller = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE, related_name='listings', null=True)
-    credit = models.OneToOneField(CarbonCredit, on_delete=models.CASCADE, related_name='listing')
-    price = models.DecimalField(max_digits=10, decimal_places=2)
+    credit = models.ForeignKey(CarbonCredit, on_delete=models.CASCADE, related_name='listings') # At most one active listing per lot
+    price = models.DecimalField(max_digits=10, decimal_places=2) # Price per tonne
     is_active = models.BooleanField(default=True)
     claimed = models.BooleanField(default=False) # New field to track if proceeds have been claimed
+    quantity_sold = models.PositiveIntegerField(default=0) # Tonnes bought from this listing so far
+    quantity_claimed = models.PositiveIntegerField(default=0) # Tonnes whose proceeds were settled; `claimed` once it reaches quantity_sold
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        constraints = [
+            # A withdrawn lot can be listed again; its past listings keep their sales history.
+            models.UniqueConstraint(fields=['credit'], condition=models.Q(is_active=True), name='listing_active_credit_uniq'),
+        ]
+        indexes = [
+            # Public marketplace feed: only active rows are ever read, newest first.
+            models.Index(fields=['-created_at', '-id'], condition=models.Q(is_active=True), name='listing_active_created_idx'),
+            # Price range filters and price sorts on the feed.
+            models.Index(fields=['price', 'id'], condition=models.Q(is_active=True), name='listing_active_price_idx'),
+            # Seller dashboard (my-listings), active and inactive.
+            models.Index(fields=['seller', '-created_at', '-id'], name='listing_seller_created_idx'),
+            # Settlement: only listings with unclaimed proceeds.
+            models.Index(fields=['seller', 'id'], condition=models.Q(quantity_sold__gt=models.F('quantity_claimed')), name='listing_unsettled_idx'),
+            # Incremental exports (api/exports.py).
+            models.Index(fields=['updated_at', 'id'], name='listing_updated_idx'),
+        ]
+
+    def __str__(self):
+        return f'Listing for {self.credit} at ${self.price}'
+
+
+class MirrorNodeCheckpoint(models.Model):
+    """
+    How far a mirror-node ingestion stream (api/mirror_node.py) has been applied.
+    """
+    stream = models.CharField(max_length=100, unique=True)
+    timestamp = models.CharField(max_length=32, blank=True, default='') # Consensus timestamp of the last transaction applied
+    events = models.BigIntegerField(default=0) # Events applied so far
+    updated_at = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return f'{self.stream} @ {self.timestamp or "start"}'
+
+
+class OutboxEvent(models.Model):
+    """
+    Side effect recorded in the same transaction as the state change that caused it and
+    carried out afterwards by the outbox worker (api/outbox.py).
+    """
+    class EventStatus(models.TextChoices):
+        PENDING = 'PENDING', 'Pending'
+        DONE = 'DONE', 'Done'
+        FAILED = 'FAILED', 'Failed'
+
+    topic = models.CharField(max_length=100)
+    payload = models.JSONField(default=dict)
+    idempotency_key = models.CharField(max_length=255, unique=True) # Recording the same key twice keeps the first event
+    status = models.CharField(max_length=10, choices=EventStatus.choices, default=EventStatus.PENDING)
+    attempts = models.PositiveIntegerField(default=0)
+    available_at = models.DateTimeField(default=timezone.now) # Not processed before this time (retry backoff)
+    last_error = models.TextField(blank=True, default='')
+    created_at = models.DateTimeField(auto_now_add=True)
+    processed_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        indexes = [
+            # Worker queue: only pending rows, due first.
+            models.Index(fields=['available_at', 'id'], condition=models.Q(status='PENDING'), name='outbox_pending_idx'),
+            # Realtime feed (api.realtime.FEED_TOPICS): recent events of the pushed topics.
+            models.Index(
+                fields=['created_at'], name='outbox_feed_idx',
+                condition=models.Q(topic__in=['listing.created', 'listing.sold', 'listing.withdrawn', 'project.approved']),
+            ),
+        ]
+
+    def __str__(self):
+        return f'{self.topic} ({self.get_status_display()})'
+
+
+class ExchangeRate(models.Model):
+    """
+    Latest price of one currency in another (e.g. HBAR-USD), refreshed by `refresh_prices`
+    and served from an in-process cache (api/prices.py).
+    """
+    pair = models.CharField(max_length=20, unique=True)
+    rate = models.DecimalField(max_digits=20, decimal_places=10) # Units of the quote currency per base unit
+    source = models.CharField(max_length=50)
+    fetched_at = models.DateTimeField()
+
+    def __str__(self):
+        return f'{self.pair} = {self.rate} ({self.source})'
+
+
+class MarketRollup(models.Model):
+    """
+    Daily marketplace totals for one value of one dimension (vintage, location, project,
+    seller, or 'all'), maintained by outbox handlers (api/analytics.py).
+    """
+    dimension = models.CharField(max_length=20)
+    key = models.CharField(max_length=255, blank=True, default='') # Dimension value ('' for 'all')
+    day = models.DateField()
+    listings = models.PositiveIntegerField(default=0)
+    listed_tonnes = models.PositiveBigIntegerField(default=0)
+    trades = models.PositiveIntegerField(default=0)
+    sold_tonnes = models.PositiveBigIntegerField(default=0)
+    volume = models.DecimalField(max_digits=20, decimal_places=2, default=0) # Sum of price x tonnes sold
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['dimension', 'key', 'day'], name='market_rollup_uniq'),
+        ]
+        indexes = [
+            # Window queries across every key of a dimension.
+            models.Index(fields=['dimension', 'day'], name='market_rollup_day_idx'),
+        ]
+
+    def __str__(self):
+        return f'{self.dimension}={self.key} on {self.day}'
+
+
+class MarketPriceBand(models.Model):
+    """
+    Tonnes sold per day within one geometric price band, per dimension value, so median
+    prices over any window come from a histogram instead of every trade.
+    """
+    dimension = models.CharField(max_length=20)
+    key = models.CharField(max_length=255, blank=True, default='')
+    day = models.DateField()
+    band = models.IntegerField() # floor(log(price) / log(ANALYTICS_PRICE_BAND_RATIO))
+    sold_tonnes = models.PositiveBigIntegerField(default=0)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['dimension', 'key', 'day', 'band'], name='market_price_band_uniq'),
+        ]
+        indexes = [
+            models.Index(fields=['dimension', 'day'], name='market_price_band_day_idx'),
+        ]
+
+    def __str__(self):
+        return f'{self.dimension}={self.key} on {self.day}, band {self.band}'
+
+
+class PortfolioSummary(models.Model):
+    """
+    Per-user dashboard counters, adjusted in the same transaction as every write that
+    changes them (api/portfolio.py) and recomputable with `rebuild_portfolios`.
+    """
+    user = models.OneToOneField(settings.AUTH_USER_MODEL, on_delete=models.CASCADE, primary_key=True, related_name='portfolio')
+    projects_pending = models.IntegerField(default=0)
+    projects_approved = models.IntegerField(default=0)
+    projects_rejected = models.IntegerField(default=0)
+    credits_owned = models.IntegerField(default=0) # Lots owned, whatever their status
+    tonnes_owned = models.BigIntegerField(default=0)
+    tonnes_available = models.BigIntegerField(default=0) # Owned and not listed (MINTED)
+    listings_active = models.IntegerField(default=0)
+    tonnes_listed = models.BigIntegerField(default=0) # Still for sale in active listings
+    tonnes_sold = models.BigIntegerField(default=0) # As a seller
+    proceeds_unclaimed = models.DecimalField(max_digits=20, decimal_places=2, default=0)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return f'Portfolio of user #{self.user_id}'
+
+
+class Order(models.Model):
+    """
+    Limit order in a project's order book. Bids are placed by buyers; asks by sellers, each
+    backed by a lot moved to RESERVED when the order is placed. Orders are matched by the
+    matching engine (api/matching.py) in the order of their journal entries.
+    """
+    class Side(models.TextChoices):
+        BID = 'BID', 'Bid'
+        ASK = 'ASK', 'Ask'
+
+    class OrderStatus(models.TextChoices):
+        PENDING = 'PENDING', 'Pending' # Journaled, not yet seen by the matching engine
+        OPEN = 'OPEN', 'Open'
+        FILLED = 'FILLED', 'Filled'
+        CANCELLED = 'CANCELLED', 'Cancelled'
+
+    owner = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE, related_name='orders')
+    project = models.ForeignKey(Project, on_delete=models.CASCADE, related_name='orders')
+    side = models.CharField(max_length=3, choices=Side.choices)
+    price = models.DecimalField(max_digits=10, decimal_places=2) # Limit price per tonne
+    quantity = models.PositiveIntegerField() # Tonnes ordered
+    remaining = models.PositiveIntegerField() # Tonnes not yet filled
+    credit = models.ForeignKey(CarbonCredit, on_delete=models.PROTECT, null=True, blank=True, related_name='orders') # Lot reserved by an ask
+    status = models.CharField(max_length=10, choices=OrderStatus.choices, default=OrderStatus.PENDING)
+    sequence = models.BigIntegerField(null=True, blank=True) # Journal position the engine accepted it at (time priority)
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
 
+    class Meta:
+        indexes = [
+            # Book depth per project: only open orders, grouped by side and price.
+            models.Index(fields=['project', 'side', 'price'], condition=models.Q(status='OPEN'), name='order_open_book_idx'),
+            # Owner's orders (my-orders), newest first.
+            models.Index(fields=['owner', '-created_at', '-id'], name='order_owner_created_idx'),
+        ]
+
+    def __str__(self):
+        return f'{self.side} {self.remaining}/{self.quantity} t @ {self.price} on project #{self.project_id}'
+
+
+class OrderJournalEntry(models.Model):
+    """
+    Order command (place or cancel), written by the API in the transaction that creates or
+    cancels the order and applied by the matching engine strictly in id order. Entries
+    applied so far plus the open orders are everything the engine needs to recover.
+    """
+    class Action(models.TextChoices):
+        PLACE = 'PLACE', 'Place'
+        CANCEL = 'CANCEL', 'Cancel'
+
+    id = models.BigAutoField(primary_key=True)
+    order = models.ForeignKey(Order, on_delete=models.CASCADE, related_name='journal')
+    action = models.CharField(max_length=10, choices=Action.choices)
+    applied = models.BooleanField(default=False)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        indexes = [
+            # Engine input: only unapplied entries, in journal order.
+            models.Index(fields=['id'], condition=models.Q(applied=False), name='order_journal_pending_idx'),
+        ]
+
+    def __str__(self):
+        return f'{self.action} order #{self.order_id}'
+
+
+class Trade(models.Model):
+    """
+    Fill between a bid and an ask, at the price of the order that was resting in the book.
+    """
+    project = models.ForeignKey(Project, on_delete=models.CASCADE, related_name='trades')
+    bid = models.ForeignKey(Order, on_delete=models.CASCADE, related_name='bid_trades')
+    ask = models.ForeignKey(Order, on_delete=models.CASCADE, related_name='ask_trades')
+    buyer = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE, related_name='bought_trades')
+    seller = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE, related_name='sold_trades')
+    credit = models.ForeignKey(CarbonCredit, on_delete=models.CASCADE, related_name='trades') # Lot the buyer received
+    price = models.DecimalField(max_digits=10, decimal_places=2)
+    quantity = models.PositiveIntegerField()
+    claimed = models.BooleanField(default=False) # Proceeds paid out to the seller by a settlement
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True) # Set explicitly by the claiming update in api.settlement
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['project', '-created_at'], name='trade_project_created_idx'),
+            models.Index(fields=['seller'], condition=models.Q(claimed=False), name='trade_unclaimed_idx'),
+            models.Index(fields=['updated_at', 'id'], name='trade_updated_idx'),
+        ]
+
+    def __str__(self):
+        return f'{self.quantity} t of project #{self.project_id} @ {self.price}'
+
+
+class Settlement(models.Model):
+    """
+    Payout of a seller's unclaimed proceeds, from one or many listings and order book
+    trades (api/settlement.py).
+    Recorded once per seller and idempotency key, so retried or concurrent requests with
+    the same key settle nothing twice.
+    """
+    seller = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE, related_name='settlements')
+    idempotency_key = models.CharField(max_length=255)
+    listings = models.PositiveIntegerField(default=0)
+    trades = models.PositiveIntegerField(default=0)
+    tonnes = models.PositiveBigIntegerField(default=0)
+    amount = models.DecimalField(max_digits=20, decimal_places=2, default=0)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['seller', 'idempotency_key'], name='settlement_seller_key_uniq'),
+        ]
+        indexes = [
+            models.Index(fields=['seller', '-created_at', '-id'], name='settlement_seller_created_idx'),
+        ]
+
+    def __str__(self):
+        return f'Settlement #{self.pk} of {self.amount} for user #{self.seller_id}'
+
+
+class SettlementLine(models.Model):
+    """
+    Tonnes and proceeds of one listing or one trade paid out by a settlement.
+    """
+    settlement = models.ForeignKey(Settlement, on_delete=models.CASCADE, related_name='lines')
+    listing = models.ForeignKey(Listing, on_delete=models.CASCADE, null=True, blank=True, related_name='settlement_lines')
+    trade = models.ForeignKey(Trade, on_delete=models.CASCADE, null=True, blank=True, related_name='settlement_lines')
+    tonnes = models.PositiveIntegerField()
+    amount = models.DecimalField(max_digits=20, decimal_places=2)
+
+    class Meta:
+        constraints = [
+            models.CheckConstraint(
+                check=models.Q(listing__isnull=False, trade__isnull=True) | models.Q(listing__isnull=True, trade__isnull=False),
+                name='settlement_line_one_source',
+            ),
+        ]
+
     def __str__(self):
-        return f'Listing for {self.credit} at ${self.price}'
\ No newline at end of file
+        source = f'listing #{self.listing_id}' if self.listing_id else f'trade #{self.trade_id}'
+        return f'{self.tonnes} t of {source} in settlement #{self.settlement_id}'
@@ -0,0 +1,119 @@
+import logging
+import uuid
+from collections import defaultdict
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import connection, transaction
+from django.utils import timezone
+
+from .models import OutboxEvent
+
+
+logger = logging.getLogger(__name__)
+
+_handlers = defaultdict(list)
+_network_handlers = defaultdict(list)
+
+
+def handler(*topics, network=False):
+    """
+    Registers the decorated function to run for every event of `topics` ('*' for all).
+
+    Database writes a handler makes commit together with marking the event processed, so
+    they happen exactly once. Handlers registered with `network=True` (HTTP calls, messages)
+    run first and outside any transaction, so a slow call holds no locks; they may be
+    repeated after a crash or retry and should be deduplicated on `event.idempotency_key`.
+    """
+    def register(func):
+        for topic in topics:
+            (_network_handlers if network else _handlers)[topic].append(func)
+        return func
+    return register
+
+
+def enqueue(topic, payload, key=None):
+    enqueue_many(topic, [(payload, key)])
+
+
+def enqueue_many(topic, events):
+    """
+    Records (payload, key) events for `topic` in the current transaction, so they exist
+    if and only if it commits. Events whose key was already recorded are dropped.
+    """
+    if not connection.in_atomic_block:
+        raise RuntimeError('Outbox events must be recorded inside the transaction that changes the state.')
+    OutboxEvent.objects.bulk_create([
+        OutboxEvent(topic=topic, payload=payload, idempotency_key=key or f'{topic}:{uuid.uuid4().hex}')
+        for payload, key in events
+    ], ignore_conflicts=True)
+
+
+def drain(batch_size=100):
+    """
+    Runs the handlers of up to `batch_size` due events and returns how many succeeded and
+    failed. Several workers can drain concurrently.
+
+    The batch is claimed in a short transaction (SKIP LOCKED) that counts the attempt and
+    pushes `available_at` OUTBOX_LEASE seconds ahead, so other workers leave the events alone
+    meanwhile and take them over if this one dies. Each event then gets its own transaction:
+    its database handlers' writes commit with marking it processed, after its network
+    handlers have run. A failing event is retried with exponential backoff and given up on
+    (FAILED) after OUTBOX_MAX_ATTEMPTS.
+    """
+    now = timezone.now()
+    with transaction.atomic():
+        events = list(
+            OutboxEvent.objects.select_for_update(skip_locked=True)
+            .filter(status=OutboxEvent.EventStatus.PENDING, available_at__lte=now)
+            .order_by('available_at', 'id')[:batch_size]
+        )
+        for event in events:
+            event.attempts += 1
+            event.available_at = now + timedelta(seconds=settings.OUTBOX_LEASE)
+        OutboxEvent.objects.bulk_update(events, ['attempts', 'available_at'])
+
+    done = failed = 0
+    for event in events:
+        try:
+            for func in _network_handlers[event.topic] + _network_handlers['*']:
+                func(event)
+            with transaction.atomic():
+                if not _still_claimed(event):
+                    continue
+                for func in _handlers[event.topic] + _handlers['*']:
+                    func(event)
+                event.status = OutboxEvent.EventStatus.DONE
+                event.processed_at = timezone.now()
+                event.save(update_fields=['status', 'processed_at'])
+            done += 1
+        except Exception as exc:
+            logger.exception('Outbox event %s (%s) failed', event.pk, event.topic)
+            with transaction.atomic():
+                if not _still_claimed(event):
+                    continue
+                event.last_error = f'{type(exc).__name__}: {exc}'
+                if event.attempts >= settings.OUTBOX_MAX_ATTEMPTS:
+                    event.status = OutboxEvent.EventStatus.FAILED
+                else:
+                    event.available_at = timezone.now() + timedelta(seconds=min(2 ** event.attempts, 3600))
+                event.save(update_fields=['status', 'available_at', 'last_error'])
+            failed += 1
+    return done, failed
+
+
+def _still_claimed(event):
+    # Locks the event for the rest of the transaction. Past its lease another worker may
+    # have claimed it again (counting another attempt); that worker finishes it.
+    return OutboxEvent.objects.select_for_update().filter(
+        pk=event.pk, status=OutboxEvent.EventStatus.PENDING, attempts=event.attempts
+    ).exists()
+
+
+def purge(older_than):
+    """
+    Deletes processed events older than the `older_than` timedelta.
+    """
+    return OutboxEvent.objects.filter(
+        status=OutboxEvent.EventStatus.DONE, processed_at__lt=timezone.now() - older_than
+    ).delete()[0]
@@ -0,0 +1,54 @@
+import json
+import logging
+from decimal import Decimal
+
+from django.utils import timezone
+
+from .analytics import record_listing, record_sale
+from .ipfs import prewarm
+from .models import Project
+from .outbox import handler
+
+
+audit_logger = logging.getLogger('api.audit')
+
+
+@handler('*')
+def audit_log(event):
+    """
+    Writes every marketplace event to the `api.audit` log as one JSON line, keyed by its
+    idempotency key so a replayed event can be recognised downstream.
+    """
+    audit_logger.info(json.dumps({
+        'key': event.idempotency_key,
+        'topic': event.topic,
+        'at': event.created_at.isoformat(),
+        **event.payload,
+    }, default=str))
+
+
+@handler('project.created', network=True)
+def prewarm_ipfs_content(event):
+    """
+    Caches the new project's IPFS objects. Gateway failures raise, so the event is retried;
+    a repeated run only fetches what is not stored yet.
+    """
+    project = Project.objects.filter(pk=event.payload['project_id']).first()
+    if project is not None:
+        prewarm(project)
+
+
+@handler('listing.created', 'listing.sold', 'trade.executed')
+def update_market_rollups(event):
+    """
+    Adds a listing, or a sale through a listing or the order book, to the analytics rollups,
+    on the day the event was recorded.
+    """
+    project = Project.objects.filter(pk=event.payload['project_id']).values('id', 'vintage', 'location').first()
+    if project is None:
+        return
+    day = timezone.localdate(event.created_at)
+    if event.topic == 'listing.created':
+        record_listing(day, project, event.payload['seller_id'], event.payload['quantity'])
+    else:
+        record_sale(day, project, event.payload['seller_id'], Decimal(event.payload['price']), event.payload['quantity'])
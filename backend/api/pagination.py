@@ -0,0 +1,149 @@
+from base64 import b64decode, b64encode
+from urllib import parse
+
+from django.core.exceptions import ValidationError as DjangoValidationError
+from django.db.models import Q
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import Cursor, CursorPagination, PageNumberPagination, _reverse_ordering
+from rest_framework.utils.urls import replace_query_param
+
+
+class CreatedAtCursorPagination(CursorPagination):
+    """
+    Keyset pagination over (created_at, id), newest first, or over the (key, id) ordering
+    a view's filter backend asks for (ListingFilterBackend).
+
+    The cursor holds the key and id of the last row seen, and a page is the rows strictly
+    after that pair in the ordering: `key < k OR (key = k AND id < i)`. Fetching any page
+    costs the same index range scan, rows sharing a key are neither skipped nor repeated,
+    and rows inserted meanwhile never shift the results.
+    """
+    ordering = ('-created_at', '-id')
+    page_size = 50
+    page_size_query_param = 'page_size'
+    max_page_size = 200
+
+    # CursorPagination.paginate_queryset, split around its one query so async views can
+    # fetch the page with the async ORM (apaginate_queryset) and share everything else.
+
+    def paginate_queryset(self, queryset, request, view=None):
+        queryset = self._prepare(queryset, request, view)
+        if queryset is None:
+            return None
+        return self._finalize(list(queryset))
+
+    async def apaginate_queryset(self, queryset, request, view=None):
+        queryset = self._prepare(queryset, request, view)
+        if queryset is None:
+            return None
+        return self._finalize([obj async for obj in queryset])
+
+    def _prepare(self, queryset, request, view):
+        """
+        Returns the queryset slice holding the requested page plus one row, or None if
+        pagination is disabled.
+        """
+        self.request = request
+        self.page_size = self.get_page_size(request)
+        if not self.page_size:
+            return None
+
+        self.base_url = request.build_absolute_uri()
+        self.ordering = self.get_ordering(request, queryset, view)
+        assert len(self.ordering) == 2 and self.ordering[1].lstrip('-') == 'id', (
+            'Keyset pagination needs a (key, id) ordering.'
+        )
+        self.cursor = self.decode_cursor(request)
+        self._reverse = self.cursor is not None and self.cursor.reverse
+
+        ordering = _reverse_ordering(self.ordering) if self._reverse else self.ordering
+        queryset = queryset.order_by(*ordering)
+        if self.cursor is not None:
+            try:
+                queryset = queryset.filter(self._after(ordering, self.cursor.position))
+            except (DjangoValidationError, ValueError, TypeError):
+                raise NotFound(self.invalid_cursor_message)
+
+        # One extra row tells whether a following page exists.
+        return queryset[:self.page_size + 1]
+
+    def _after(self, ordering, position):
+        """
+        Condition for the rows strictly after `position`, a (key, id) pair, in `ordering`.
+        """
+        (key, key_lookup), (pk, pk_lookup) = (
+            (field.lstrip('-'), 'lt' if field.startswith('-') else 'gt') for field in ordering
+        )
+        value, row_id = position
+        return Q(**{f'{key}__{key_lookup}': value}) | Q(**{key: value, f'{pk}__{pk_lookup}': row_id})
+
+    def _finalize(self, results):
+        """
+        Works out the page and the next/previous positions from the fetched rows.
+        """
+        self.page = list(results[:self.page_size])
+        has_more = len(results) > len(self.page)
+        if self._reverse:
+            self.page.reverse()
+
+        if self.page:
+            first, last = (self._get_position_from_instance(row, self.ordering) for row in (self.page[0], self.page[-1]))
+        else:
+            # Past either end: link back to where the cursor points.
+            first = last = self.cursor.position if self.cursor is not None else None
+
+        if self._reverse:
+            self.has_next, self.has_previous = True, has_more
+        else:
+            self.has_next, self.has_previous = has_more, self.cursor is not None
+        self.next_position, self.previous_position = last, first
+
+        if (self.has_previous or self.has_next) and self.template is not None:
+            self.display_page_controls = True
+
+        return self.page
+
+    def _get_position_from_instance(self, instance, ordering):
+        key = ordering[0].lstrip('-')
+        value = instance[key] if isinstance(instance, dict) else getattr(instance, key)
+        return (str(value), instance['id'] if isinstance(instance, dict) else instance.pk)
+
+    def get_next_link(self):
+        if not self.has_next or self.next_position is None:
+            return None
+        return self.encode_cursor(Cursor(offset=0, reverse=False, position=self.next_position))
+
+    def get_previous_link(self):
+        if not self.has_previous or self.previous_position is None:
+            return None
+        return self.encode_cursor(Cursor(offset=0, reverse=True, position=self.previous_position))
+
+    def decode_cursor(self, request):
+        encoded = request.query_params.get(self.cursor_query_param)
+        if encoded is None:
+            return None
+        try:
+            tokens = parse.parse_qs(b64decode(encoded.encode('ascii')).decode('ascii'), keep_blank_values=True)
+            position = (tokens['p'][0], int(tokens['i'][0]))
+            reverse = bool(int(tokens.get('r', ['0'])[0]))
+        except (TypeError, ValueError, KeyError, UnicodeError):
+            raise NotFound(self.invalid_cursor_message)
+        return Cursor(offset=0, reverse=reverse, position=position)
+
+    def encode_cursor(self, cursor):
+        value, row_id = cursor.position
+        tokens = {'p': value, 'i': row_id}
+        if cursor.reverse:
+            tokens['r'] = '1'
+        encoded = b64encode(parse.urlencode(tokens).encode('ascii')).decode('ascii')
+        return replace_query_param(self.base_url, self.cursor_query_param, encoded)
+
+
+class SearchPagination(PageNumberPagination):
+    """
+    Search results are ordered by relevance rather than by a stable key, so they are
+    paged by number over the capped, ranked id list.
+    """
+    page_size = 20
+    page_size_query_param = 'page_size'
+    max_page_size = 100
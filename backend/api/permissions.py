@@ -1,23 +1,24 @@
 from rest_framework import permissions
 from users.models import UserProfile
+from users.roles import get_role
 
 class IsSellerUser(permissions.BasePermission):
     """
     Allows access only to users with the 'SELLER' role.
     """
     def has_permission(self, request, view):
-        return request.user.is_authenticated and request.user.profile.role == UserProfile.Role.SELLER
+        return request.user.is_authenticated and get_role(request) == UserProfile.Role.SELLER
 
 class IsVerifierUser(permissions.BasePermission):
     """
     Allows access only to users with the 'VERIFIER' role.
     """
     def has_permission(self, request, view):
-        return request.user.is_authenticated and request.user.profile.role == UserProfile.Role.VERIFIER
+        return request.user.is_authenticated and get_role(request) == UserProfile.Role.VERIFIER
 
 class IsBuyerUser(permissions.BasePermission):
     """
     Allows access only to users with the 'BUYER' role.
     """
     def has_permission(self, request, view):
-        return request.user.is_authenticated and request.user.profile.role == UserProfile.Role.BUYER
\ No newline at end of file
+        return request.user.is_authenticated and get_role(request) == UserProfile.Role.BUYER
\ No newline at end of file
@@ -0,0 +1,115 @@
+from collections import defaultdict
+from decimal import Decimal
+
+from django.db import IntegrityError, transaction
+from django.db.models import Count, F, Q, Sum
+from django.utils import timezone
+
+from .models import CarbonCredit, Listing, Order, PortfolioSummary, Project, Trade
+
+
+COUNTERS = (
+    'projects_pending', 'projects_approved', 'projects_rejected',
+    'credits_owned', 'tonnes_owned', 'tonnes_available',
+    'listings_active', 'tonnes_listed', 'tonnes_sold', 'proceeds_unclaimed',
+)
+
+
+def adjust(user_id, **deltas):
+    """
+    Adds `deltas` to a user's counters. Call it inside the transaction that made the change,
+    after making it: a user without a summary yet gets one computed from the current rows,
+    which already include the change.
+    """
+    deltas = {name: value for name, value in deltas.items() if value}
+    if user_id is None or not deltas:
+        return
+    updates = {name: F(name) + value for name, value in deltas.items()}
+    if PortfolioSummary.objects.filter(user_id=user_id).update(**updates, updated_at=timezone.now()):
+        return
+    try:
+        with transaction.atomic():
+            rebuild([user_id])
+    except IntegrityError:
+        # Created concurrently from rows that could not see this transaction's change yet.
+        PortfolioSummary.objects.filter(user_id=user_id).update(**updates, updated_at=timezone.now())
+
+
+def project_status_moved(owner_id, previous, current):
+    if previous != current:
+        adjust(owner_id, **{f'projects_{previous.lower()}': -1, f'projects_{current.lower()}': 1})
+
+
+def compute(user_ids=None):
+    """
+    Returns {user_id: counters} computed from projects, credits, listings, asks and trades
+    with one grouped query each, for `user_ids` or every user that has any.
+
+    An ask in the order book counts like a listing: its reserved lot is listed tonnage
+    and its trades are sales, with proceeds to settle.
+    """
+    projects = Project.objects.all()
+    credits = CarbonCredit.objects.all()
+    listings = Listing.objects.all()
+    asks = Order.objects.filter(side=Order.Side.ASK, status__in=[Order.OrderStatus.PENDING, Order.OrderStatus.OPEN])
+    trades = Trade.objects.all()
+    if user_ids is not None:
+        projects = projects.filter(owner_id__in=user_ids)
+        credits = credits.filter(owner_id__in=user_ids)
+        listings = listings.filter(seller_id__in=user_ids)
+        asks = asks.filter(owner_id__in=user_ids)
+        trades = trades.filter(seller_id__in=user_ids)
+
+    summaries = defaultdict(lambda: dict.fromkeys(COUNTERS, 0))
+    for user_id in user_ids or ():
+        summaries[user_id]
+    for row in projects.values('owner_id', 'status').annotate(count=Count('id')).order_by():
+        summaries[row['owner_id']][f"projects_{row['status'].lower()}"] = row['count']
+    for row in credits.values('owner_id').annotate(
+        lots=Count('id'), tonnes=Sum('quantity'),
+        available=Sum('quantity', filter=Q(status=CarbonCredit.CreditStatus.MINTED), default=0),
+        reserved=Sum('quantity', filter=Q(status=CarbonCredit.CreditStatus.RESERVED), default=0),
+    ).order_by():
+        summary = summaries[row['owner_id']]
+        summary.update(
+            credits_owned=row['lots'], tonnes_owned=row['tonnes'], tonnes_available=row['available'],
+            tonnes_listed=row['reserved'],
+        )
+    for row in listings.exclude(seller_id=None).values('seller_id').annotate(
+        active=Count('id', filter=Q(is_active=True)),
+        listed=Sum('credit__quantity', filter=Q(is_active=True), default=0),
+        sold=Sum('quantity_sold'),
+        unclaimed=Sum(F('price') * (F('quantity_sold') - F('quantity_claimed')), default=Decimal(0)),
+    ).order_by():
+        summary = summaries[row['seller_id']]
+        summary['listings_active'] += row['active']
+        summary['tonnes_listed'] += row['listed']
+        summary['tonnes_sold'] += row['sold']
+        summary['proceeds_unclaimed'] += Decimal(row['unclaimed'])
+    for row in asks.values('owner_id').annotate(count=Count('id')).order_by():
+        summaries[row['owner_id']]['listings_active'] += row['count']
+    for row in trades.values('seller_id').annotate(
+        sold=Sum('quantity'),
+        unclaimed=Sum(F('price') * F('quantity'), filter=Q(claimed=False), default=Decimal(0)),
+    ).order_by():
+        summary = summaries[row['seller_id']]
+        summary['tonnes_sold'] += row['sold']
+        summary['proceeds_unclaimed'] += Decimal(row['unclaimed'])
+    for summary in summaries.values():
+        summary['proceeds_unclaimed'] = Decimal(summary['proceeds_unclaimed']).quantize(Decimal('0.01'))
+    return summaries
+
+
+def rebuild(user_ids=None):
+    """
+    Recomputes and stores the summaries of `user_ids` (every user with any rows by default).
+    Returns how many were written.
+    """
+    summaries = compute(user_ids)
+    if user_ids is None:
+        PortfolioSummary.objects.exclude(user_id__in=list(summaries)).delete()
+    PortfolioSummary.objects.bulk_create(
+        [PortfolioSummary(user_id=user_id, **counters) for user_id, counters in summaries.items()],
+        update_conflicts=True, unique_fields=['user'], update_fields=[*COUNTERS, 'updated_at'], batch_size=1000,
+    )
+    return len(summaries)
@@ -0,0 +1,138 @@
+import threading
+import time
+from datetime import timedelta
+from decimal import Decimal
+
+import requests
+from django.conf import settings
+from django.utils import timezone
+from django.utils.module_loading import import_string
+
+from .models import ExchangeRate
+
+
+HBAR_USD = 'HBAR-USD'
+
+
+class CoinGeckoProvider:
+    """
+    Reads spot prices from the CoinGecko simple price API.
+    """
+    name = 'coingecko'
+    url = 'https://api.coingecko.com/api/v3/simple/price'
+    ids = {'HBAR': 'hedera-hashgraph'}
+
+    def __init__(self, timeout=10):
+        self.timeout = timeout
+
+    def fetch(self, pair):
+        base, quote = pair.split('-')
+        coin, currency = self.ids[base], quote.lower()
+        response = requests.get(self.url, params={'ids': coin, 'vs_currencies': currency}, timeout=self.timeout)
+        response.raise_for_status()
+        return Decimal(str(response.json()[coin][currency]))
+
+
+class StubPriceProvider:
+    """
+    Returns the fixed `PRICE_STUB_RATE`, for development and tests without network access.
+    """
+    name = 'stub'
+
+    def fetch(self, pair):
+        return Decimal(settings.PRICE_STUB_RATE)
+
+
+def get_provider():
+    return import_string(settings.PRICE_PROVIDER)()
+
+
+def refresh_rate(pair=HBAR_USD, provider=None):
+    """
+    Fetches `pair` from the provider (settings.PRICE_PROVIDER by default) and stores it.
+    """
+    provider = provider or get_provider()
+    rate, _ = ExchangeRate.objects.update_or_create(
+        pair=pair, defaults={'rate': provider.fetch(pair), 'source': provider.name, 'fetched_at': timezone.now()}
+    )
+    rate_cache.clear()
+    return rate
+
+
+class RateCache:
+    """
+    Per-process cache of stored exchange rates. Each pair is read from the database at most
+    once per `PRICE_CACHE_TIMEOUT` seconds, and never from the upstream provider, so page
+    views cost no outbound calls however many there are.
+    """
+    def __init__(self):
+        self._rates = {}
+        self._lock = threading.Lock()
+
+    def get(self, pair):
+        """
+        Returns the stored ExchangeRate for `pair`, or None if it was never refreshed.
+        """
+        hit, rate = self._lookup(pair)
+        if not hit:
+            rate = self._store(pair, ExchangeRate.objects.filter(pair=pair).first())
+        return rate
+
+    async def aget(self, pair):
+        hit, rate = self._lookup(pair)
+        if not hit:
+            rate = self._store(pair, await ExchangeRate.objects.filter(pair=pair).afirst())
+        return rate
+
+    def _lookup(self, pair):
+        with self._lock:
+            entry = self._rates.get(pair)
+        if entry is not None and entry[0] > time.monotonic():
+            return True, entry[1]
+        return False, None
+
+    def _store(self, pair, rate):
+        with self._lock:
+            self._rates[pair] = (time.monotonic() + settings.PRICE_CACHE_TIMEOUT, rate)
+        return rate
+
+    def clear(self):
+        with self._lock:
+            self._rates.clear()
+
+
+rate_cache = RateCache()
+
+
+def is_stale(rate):
+    """
+    True once a rate has missed several scheduled refreshes.
+    """
+    return timezone.now() - rate.fetched_at > timedelta(seconds=3 * settings.PRICE_REFRESH_INTERVAL)
+
+
+def to_usd(amount, pair=HBAR_USD):
+    """
+    Converts `amount` of the pair's base currency to its quote currency, rounded to cents,
+    or returns None when no rate is available.
+    """
+    return convert(amount, rate_cache.get(pair))
+
+
+def convert(amount, rate):
+    """
+    Converts `amount` at the ExchangeRate `rate`, rounded to cents; None without a rate.
+    """
+    if rate is None or amount is None:
+        return None
+    return (Decimal(amount) * rate.rate).quantize(Decimal('0.01'))
+
+
+def set_price_usd(listings, rate):
+    """
+    Sets `price_usd` on serialized listings from their `price` at `rate`. The listings feed
+    is cached for longer than a rate lasts, so the feed views apply it to every response.
+    """
+    for listing in listings:
+        price = convert(listing['price'], rate)
+        listing['price_usd'] = str(price) if price is not None else None
@@ -0,0 +1,213 @@
+import asyncio
+import json
+import logging
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db.models import Q
+from django.utils import timezone
+
+from .models import OutboxEvent, Project
+
+
+logger = logging.getLogger(__name__)
+
+# Outbox topics pushed to clients, under their event names on the stream.
+FEED_TOPICS = {
+    'listing.created': 'listing-created',
+    'listing.sold': 'listing-sold',
+    'listing.withdrawn': 'listing-withdrawn',
+    'project.approved': 'project-approved',
+}
+
+
+# Payload fields pushed per topic. The stream is public: buyers and the tonnes they bought
+# stay out of it.
+PUBLIC_FIELDS = {
+    'listing.created': ('listing_id', 'credit_id', 'project_id', 'seller_id', 'price', 'quantity'),
+    'listing.sold': ('listing_id', 'project_id', 'seller_id', 'price'),
+    'listing.withdrawn': ('listing_id', 'credit_id', 'project_id', 'seller_id'),
+    'project.approved': ('project_id', 'owner_id'),
+}
+
+
+class FeedFull(Exception):
+    pass
+
+
+class FeedEvent:
+    __slots__ = ('id', 'name', 'project_id', 'seller_id', 'vintage', 'data')
+
+    def __init__(self, row, vintage):
+        payload = row.payload
+        self.id = row.pk
+        self.name = FEED_TOPICS[row.topic]
+        self.project_id = payload.get('project_id')
+        # An approved project's seller is its owner.
+        self.seller_id = payload.get('seller_id', payload.get('owner_id'))
+        self.vintage = vintage
+        self.data = {
+            **{name: payload[name] for name in PUBLIC_FIELDS[row.topic] if name in payload},
+            'vintage': vintage, 'at': row.created_at,
+        }
+
+    def encode(self):
+        return f'id: {self.id}\nevent: {self.name}\ndata: {json.dumps(self.data, cls=DjangoJSONEncoder)}\n\n'
+
+
+async def load_events(rows):
+    """
+    Turns outbox rows into FeedEvents, looking up the vintages of their projects in one query.
+    """
+    project_ids = {row.payload.get('project_id') for row in rows}
+    vintages = {
+        pk: vintage async for pk, vintage in Project.objects.filter(pk__in=project_ids).values_list('pk', 'vintage')
+    }
+    return [FeedEvent(row, vintages.get(row.payload.get('project_id'))) for row in rows]
+
+
+class Subscription:
+    """
+    One connected client: the events, projects, sellers and vintages it asked for (None
+    matches any) and a bounded queue of events waiting to be written to it.
+
+    A client that reads slower than events arrive fills its queue; it is then marked
+    lagging and dropped by the broadcaster instead of holding events in memory or slowing
+    down everyone else. Its stream ends once the queue is written, and the client
+    reconnects with Last-Event-ID to catch up from the outbox table.
+    """
+    def __init__(self, events=None, projects=None, sellers=None, vintages=None):
+        self.events = events
+        self.projects = projects
+        self.sellers = sellers
+        self.vintages = vintages
+        self.queue = asyncio.Queue(settings.REALTIME_QUEUE_SIZE)
+        self.lagging = False
+
+    def matches(self, event):
+        return all(wanted is None or value in wanted for wanted, value in (
+            (self.events, event.name), (self.projects, event.project_id),
+            (self.sellers, event.seller_id), (self.vintages, event.vintage),
+        ))
+
+    def offer(self, event):
+        try:
+            self.queue.put_nowait(event)
+        except asyncio.QueueFull:
+            self.lagging = True
+            return False
+        return True
+
+
+class Broadcaster:
+    """
+    Fans feed events out to the subscriptions of this process. A single task polls the
+    outbox table every REALTIME_POLL_INTERVAL seconds while anyone is subscribed, so the
+    database sees the same queries however many clients are connected.
+
+    Each poll reads the events recorded in the last REALTIME_COMMIT_GRACE seconds and
+    delivers those not seen yet, rather than reading past the highest id seen: ids are
+    taken when a row is inserted, so a transaction that started earlier can commit an
+    event with a lower id after a later one is already visible.
+    """
+    def __init__(self):
+        self.subscriptions = set()
+        self.seen = None
+        self.task = None
+
+    def subscribe(self, subscription):
+        if len(self.subscriptions) >= settings.REALTIME_MAX_SUBSCRIBERS:
+            raise FeedFull()
+        self.subscriptions.add(subscription)
+        if self.task is None or self.task.done():
+            self.task = asyncio.get_running_loop().create_task(self._run())
+
+    def unsubscribe(self, subscription):
+        self.subscriptions.discard(subscription)
+
+    async def _run(self):
+        # Events recorded before the first subscriber came are only sent when replayed.
+        started = timezone.now()
+        self.seen = None
+        while self.subscriptions:
+            try:
+                await self._poll(started)
+            except Exception:
+                logger.exception('Polling the marketplace feed failed')
+            await asyncio.sleep(settings.REALTIME_POLL_INTERVAL)
+
+    async def _poll(self, started):
+        since = timezone.now() - timedelta(seconds=settings.REALTIME_COMMIT_GRACE)
+        window = OutboxEvent.objects.filter(topic__in=FEED_TOPICS, created_at__gte=since)
+        if self.seen is None:
+            self.seen = {pk async for pk in window.filter(created_at__lt=started).values_list('pk', flat=True)}
+        ids = {pk async for pk in window.values_list('pk', flat=True)}
+        new = ids - self.seen
+        self.seen = ids
+        if not new:
+            return
+        rows = [
+            row async for row in OutboxEvent.objects.filter(pk__in=new)
+            .only('pk', 'topic', 'payload', 'created_at').order_by('pk')
+        ]
+        for event in await load_events(rows):
+            for subscription in list(self.subscriptions):
+                if subscription.matches(event) and not subscription.offer(event):
+                    self.unsubscribe(subscription)
+
+
+broadcaster = Broadcaster()
+
+
+async def replay(subscription, last_event_id):
+    """
+    Returns the events that `subscription` wants and may have missed since `last_event_id`,
+    and whether that is all of them: at most REALTIME_REPLAY_LIMIT recorded events are read
+    back, and events already purged from the outbox cannot be.
+
+    Ids are not in commit order (see Broadcaster), so events with lower ids recorded up to
+    REALTIME_COMMIT_GRACE seconds before `last_event_id` are sent again too; some of them
+    the client already has, and it drops the ids it has seen.
+    """
+    limit = settings.REALTIME_REPLAY_LIMIT
+    feed = OutboxEvent.objects.filter(topic__in=FEED_TOPICS)
+    missed = Q(pk__gt=last_event_id)
+    sent_at = await feed.filter(pk=last_event_id).values_list('created_at', flat=True).afirst()
+    if sent_at is not None:
+        missed |= Q(created_at__gte=sent_at - timedelta(seconds=settings.REALTIME_COMMIT_GRACE))
+    rows = [
+        row async for row in feed.filter(missed)
+        .only('pk', 'topic', 'payload', 'created_at').order_by('pk')[:limit]
+    ]
+    events = [event for event in await load_events(rows) if subscription.matches(event)]
+    return events, len(rows) < limit
+
+
+async def stream(subscription, last_event_id=None):
+    """
+    Server-sent events for a subscription already registered with the broadcaster: first
+    what was missed since `last_event_id`, then live events, with a comment line every
+    REALTIME_HEARTBEAT seconds to keep idle connections open. A `reset` event tells the
+    client that more was missed than can be replayed and it should reload its listings.
+    """
+    try:
+        yield f'retry: {settings.REALTIME_RETRY_MS}\n\n'
+        replayed = set()
+        if last_event_id is not None:
+            events, complete = await replay(subscription, last_event_id)
+            for event in events:
+                yield event.encode()
+            if not complete:
+                yield 'event: reset\ndata: {}\n\n'
+            replayed = {event.id for event in events}
+        while not (subscription.lagging and subscription.queue.empty()):
+            try:
+                event = await asyncio.wait_for(subscription.queue.get(), settings.REALTIME_HEARTBEAT)
+            except asyncio.TimeoutError:
+                yield ': keep-alive\n\n'
+                continue
+            if event.id not in replayed:
+                yield event.encode()
+    finally:
+        broadcaster.unsubscribe(subscription)
@@ -0,0 +1,149 @@
+import re
+
+from django.db import connection
+from django.db.models import Case, IntegerField, Q, When
+
+from .models import Listing, Project
+
+
+MAX_RESULTS = 1000
+MAX_TERMS = 16
+
+# SQLite (DEBUG) keeps an external-content FTS5 index over api_project, maintained by
+# triggers. Table remakes done by later SQLite migrations drop those triggers, so the
+# statements are idempotent and re-applied after every migrate (see ApiConfig.ready).
+SQLITE_FTS_STATEMENTS = [
+    """
+    CREATE VIRTUAL TABLE IF NOT EXISTS api_project_fts USING fts5(
+        name, description, location,
+        content='api_project', content_rowid='id', tokenize='unicode61 remove_diacritics 2'
+    )
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS api_project_fts_ai AFTER INSERT ON api_project BEGIN
+        INSERT INTO api_project_fts(rowid, name, description, location)
+        VALUES (new.id, new.name, new.description, new.location);
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS api_project_fts_ad AFTER DELETE ON api_project BEGIN
+        INSERT INTO api_project_fts(api_project_fts, rowid, name, description, location)
+        VALUES ('delete', old.id, old.name, old.description, old.location);
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS api_project_fts_au AFTER UPDATE OF name, description, location ON api_project BEGIN
+        INSERT INTO api_project_fts(api_project_fts, rowid, name, description, location)
+        VALUES ('delete', old.id, old.name, old.description, old.location);
+        INSERT INTO api_project_fts(rowid, name, description, location)
+        VALUES (new.id, new.name, new.description, new.location);
+    END
+    """,
+]
+SQLITE_FTS_TRIGGERS = {'api_project_fts_ai', 'api_project_fts_ad', 'api_project_fts_au'}
+
+# PostgreSQL keeps a weighted tsvector as a generated column, so it is recomputed by
+# the database on every insert/update of the row, and indexed with GIN.
+POSTGRES_FTS_STATEMENTS = [
+    """
+    ALTER TABLE api_project ADD COLUMN IF NOT EXISTS search_vector tsvector GENERATED ALWAYS AS (
+        setweight(to_tsvector('simple', coalesce(name, '')), 'A') ||
+        setweight(to_tsvector('simple', coalesce(location, '')), 'B') ||
+        setweight(to_tsvector('simple', coalesce(description, '')), 'C')
+    ) STORED
+    """,
+    "CREATE INDEX IF NOT EXISTS api_project_search_idx ON api_project USING GIN (search_vector)",
+]
+
+
+def install_search_index(db_connection):
+    """
+    Creates the full-text index for the connection's vendor if it is missing.
+    """
+    with db_connection.cursor() as cursor:
+        if db_connection.vendor == 'postgresql':
+            for statement in POSTGRES_FTS_STATEMENTS:
+                cursor.execute(statement)
+        elif db_connection.vendor == 'sqlite':
+            cursor.execute("SELECT name FROM sqlite_master WHERE type = 'trigger' AND tbl_name = 'api_project'")
+            missing = SQLITE_FTS_TRIGGERS - {row[0] for row in cursor.fetchall()}
+            for statement in SQLITE_FTS_STATEMENTS:
+                cursor.execute(statement)
+            if missing:
+                # Rows may have changed while the triggers were gone.
+                cursor.execute("INSERT INTO api_project_fts(api_project_fts) VALUES ('rebuild')")
+
+
+def uninstall_search_index(db_connection):
+    with db_connection.cursor() as cursor:
+        if db_connection.vendor == 'postgresql':
+            cursor.execute('DROP INDEX IF EXISTS api_project_search_idx')
+            cursor.execute('ALTER TABLE api_project DROP COLUMN IF EXISTS search_vector')
+        elif db_connection.vendor == 'sqlite':
+            for trigger in sorted(SQLITE_FTS_TRIGGERS):
+                cursor.execute(f'DROP TRIGGER IF EXISTS {trigger}')
+            cursor.execute('DROP TABLE IF EXISTS api_project_fts')
+
+
+def search_terms(query):
+    return re.findall(r'\w+', query.lower())[:MAX_TERMS]
+
+
+def ranked_project_ids(query, status=Project.ProjectStatus.APPROVED, limit=MAX_RESULTS):
+    """
+    Returns ids of projects matching every term of `query` (each term as a prefix),
+    best match first. Name matches outrank location matches, which outrank description ones.
+    """
+    terms = search_terms(query)
+    if not terms:
+        return []
+
+    if connection.vendor == 'postgresql':
+        sql = """
+            SELECT id FROM api_project
+            WHERE search_vector @@ to_tsquery('simple', %s) AND status = %s
+            ORDER BY ts_rank(search_vector, to_tsquery('simple', %s)) DESC, id DESC
+            LIMIT %s
+        """
+        tsquery = ' & '.join(f'{term}:*' for term in terms)
+        params = [tsquery, status, tsquery, limit]
+    elif connection.vendor == 'sqlite':
+        sql = """
+            SELECT api_project.id FROM api_project_fts
+            JOIN api_project ON api_project.id = api_project_fts.rowid
+            WHERE api_project_fts MATCH %s AND api_project.status = %s
+            ORDER BY bm25(api_project_fts, 10.0, 1.0, 4.0), api_project.id DESC
+            LIMIT %s
+        """
+        params = [' '.join(f'"{term}"*' for term in terms), status, limit]
+    else:
+        # No full-text index on this backend: fall back to an unranked scan.
+        condition = Q()
+        for term in terms:
+            condition &= Q(name__icontains=term) | Q(location__icontains=term) | Q(description__icontains=term)
+        return list(
+            Project.objects.filter(condition, status=status).order_by('-created_at', '-id').values_list('pk', flat=True)[:limit]
+        )
+
+    with connection.cursor() as cursor:
+        cursor.execute(sql, params)
+        return [row[0] for row in cursor.fetchall()]
+
+
+def ranked_listing_ids(query, limit=MAX_RESULTS):
+    """
+    Returns ids of active listings whose project matches `query`, ordered by project rank
+    and newest listing first within a project. The whole candidate set is ranked in the
+    query, before the cap, so the cap always keeps the best matches.
+    """
+    project_ids = ranked_project_ids(query)
+    if not project_ids:
+        return []
+    rank = Case(
+        *[When(credit__project_id=project_id, then=position) for position, project_id in enumerate(project_ids)],
+        output_field=IntegerField(),
+    )
+    return list(
+        Listing.objects.filter(is_active=True, credit__project_id__in=project_ids)
+        .annotate(project_rank=rank).order_by('project_rank', '-id').values_list('pk', flat=True)[:limit]
+    )
@@ -1,21 +1,46 @@
+from decimal import Decimal
+
 from rest_framework import serializers
+from django.conf import settings
 from django.contrib.auth.models import User
-from .models import Project, CarbonCredit, Listing
+from .models import Project, CarbonCredit, Listing, Order, PortfolioSummary, Settlement
 from users.models import UserProfile
+from .marketplace import LotUnavailable, list_credit
+from .prices import to_usd
+
+
+class EagerLoadingMixin:
+    """
+    Declares the relations a serializer walks so list views can load them up front.
+    Nested serializers must be covered by the parent's plan, otherwise every row
+    triggers its own queries.
+    """
+    select_related_fields = ()
+    prefetch_related_fields = ()
+
+    @classmethod
+    def setup_eager_loading(cls, queryset):
+        if cls.select_related_fields:
+            queryset = queryset.select_related(*cls.select_related_fields)
+        if cls.prefetch_related_fields:
+            queryset = queryset.prefetch_related(*cls.prefetch_related_fields)
+        return queryset
 
 class UserProfileSerializer(serializers.ModelSerializer):
     class Meta:
         model = UserProfile
         fields = ['role', 'hedera_account_id']
 
-class UserSerializer(serializers.ModelSerializer):
+class UserSerializer(EagerLoadingMixin, serializers.ModelSerializer):
+    select_related_fields = ('profile',)
     profile = UserProfileSerializer(read_only=True)
 
     class Meta:
         model = User
         fields = ['id', 'username', 'profile']
 
-class ProjectSerializer(serializers.ModelSerializer):
+class ProjectSerializer(EagerLoadingMixin, serializers.ModelSerializer):
+    select_related_fields = ('owner__profile', 'verifier__profile')
     owner = UserSerializer(read_only=True)
     verifier = UserSerializer(read_only=True)
     
@@ -44,10 +69,32 @@ class ProjectVerificationSerializer(serializers.ModelSerializer):
             raise serializers.ValidationError("Verifier can only set the status to 'Approved' or 'Rejected'.")
         return value
 
+class SerialRangeSerializer(serializers.Serializer):
+    start = serializers.IntegerField(min_value=0)
+    end = serializers.IntegerField(min_value=0)
+
+    def validate(self, attrs):
+        if attrs['end'] < attrs['start']:
+            raise serializers.ValidationError("The end of a serial range cannot be before its start.")
+        return attrs
+
+class BulkMintSerializer(serializers.Serializer):
+    MAX_SERIALS = 1_000_000
+
+    token_address = serializers.CharField(max_length=255)
+    serial_ranges = SerialRangeSerializer(many=True, allow_empty=False)
+
+    def validate_serial_ranges(self, ranges):
+        total = sum(r['end'] - r['start'] + 1 for r in ranges)
+        if total > self.MAX_SERIALS:
+            raise serializers.ValidationError(f"At most {self.MAX_SERIALS} serials can be registered per request.")
+        return ranges
+
 class SetTokenIdSerializer(serializers.Serializer):
     token_id = serializers.CharField(max_length=255)
 
-class CarbonCreditSerializer(serializers.ModelSerializer):
+class CarbonCreditSerializer(EagerLoadingMixin, serializers.ModelSerializer):
+    select_related_fields = ('project__owner__profile', 'project__verifier__profile', 'owner__profile')
     project = ProjectSerializer(read_only=True)
     owner = UserSerializer(read_only=True)
 
@@ -55,20 +102,39 @@ class CarbonCreditSerializer(serializers.ModelSerializer):
         model = CarbonCredit
         fields = '__all__'
 
-class ListingSerializer(serializers.ModelSerializer):
+class ListingSerializer(EagerLoadingMixin, serializers.ModelSerializer):
+    select_related_fields = (
+        'seller__profile',
+        'credit__owner__profile',
+        'credit__project__owner__profile',
+        'credit__project__verifier__profile',
+    )
     credit = CarbonCreditSerializer(read_only=True)
     seller = UserSerializer(read_only=True)
+    # Price per tonne in USD at the stored HBAR/USD rate; null until a rate was fetched.
+    price_usd = serializers.SerializerMethodField()
 
     class Meta:
         model = Listing
         fields = '__all__'
 
+    def get_fields(self):
+        fields = super().get_fields()
+        if not settings.LISTING_PRICE_USD:
+            del fields['price_usd']
+        return fields
+
+    def get_price_usd(self, listing):
+        price = to_usd(listing.price)
+        return str(price) if price is not None else None
+
 class ListingCreateSerializer(serializers.ModelSerializer):
     credit = serializers.PrimaryKeyRelatedField(queryset=CarbonCredit.objects.all())
+    quantity = serializers.IntegerField(min_value=1, required=False, write_only=True)
 
     class Meta:
         model = Listing
-        fields = ['credit', 'price']
+        fields = ['credit', 'price', 'quantity']
 
     def validate_credit(self, credit):
         request_user = self.context['request'].user
@@ -78,10 +144,112 @@ class ListingCreateSerializer(serializers.ModelSerializer):
             raise serializers.ValidationError("This credit is not available for sale.")
         return credit
 
+    def validate(self, attrs):
+        if attrs.get('quantity', 0) > attrs['credit'].quantity:
+            raise serializers.ValidationError({"quantity": f"This credit only holds {attrs['credit'].quantity} tonnes."})
+        return attrs
+
     def create(self, validated_data):
-        credit = validated_data['credit']
         # Assign the current user as the seller
-        listing = Listing.objects.create(seller=self.context['request'].user, **validated_data)
-        credit.status = CarbonCredit.CreditStatus.LISTED
-        credit.save()
-        return listing
+        try:
+            return list_credit(
+                validated_data['credit'], self.context['request'].user,
+                validated_data['price'], validated_data.get('quantity'),
+            )
+        except LotUnavailable:
+            raise serializers.ValidationError({"credit": "This credit is not available for sale."})
+
+
+class BulkListingItemSerializer(serializers.Serializer):
+    credit = serializers.IntegerField()
+    price = serializers.DecimalField(max_digits=10, decimal_places=2)
+
+
+class BulkListingCreateSerializer(serializers.Serializer):
+    items = BulkListingItemSerializer(many=True, allow_empty=False, max_length=1000)
+
+
+class BulkWithdrawSerializer(serializers.Serializer):
+    listings = serializers.ListField(child=serializers.IntegerField(), allow_empty=False, max_length=1000)
+
+
+class PurchaseSerializer(serializers.Serializer):
+    quantity = serializers.IntegerField(min_value=1, required=False)
+
+
+class AnalyticsQuerySerializer(serializers.Serializer):
+    start = serializers.DateField(required=False)
+    end = serializers.DateField(required=False)
+    key = serializers.ListField(child=serializers.CharField(max_length=255), required=False, max_length=100)
+    period = serializers.ChoiceField(choices=['day', 'week', 'month'], required=False)
+
+    def validate(self, attrs):
+        if attrs.get('start') and attrs.get('end') and attrs['end'] < attrs['start']:
+            raise serializers.ValidationError({"end": "The end of the window cannot be before its start."})
+        return attrs
+
+
+class MarketAnalyticsSerializer(serializers.Serializer):
+    key = serializers.CharField()
+    period = serializers.DateField(required=False)
+    listings = serializers.IntegerField()
+    listed_tonnes = serializers.IntegerField()
+    trades = serializers.IntegerField()
+    sold_tonnes = serializers.IntegerField()
+    volume = serializers.DecimalField(max_digits=20, decimal_places=2)
+    average_price = serializers.DecimalField(max_digits=20, decimal_places=2, allow_null=True)
+    median_price = serializers.DecimalField(max_digits=20, decimal_places=2, allow_null=True)
+
+
+class PortfolioSummarySerializer(serializers.ModelSerializer):
+    class Meta:
+        model = PortfolioSummary
+        exclude = ['user']
+
+
+class SettlementSerializer(serializers.ModelSerializer):
+    class Meta:
+        model = Settlement
+        fields = ['id', 'idempotency_key', 'listings', 'trades', 'tonnes', 'amount', 'created_at']
+
+
+class OrderSerializer(serializers.ModelSerializer):
+    class Meta:
+        model = Order
+        fields = ['id', 'project', 'side', 'price', 'quantity', 'remaining', 'credit', 'status', 'created_at', 'updated_at']
+
+
+class OrderCreateSerializer(serializers.Serializer):
+    side = serializers.ChoiceField(choices=Order.Side.choices)
+    price = serializers.DecimalField(max_digits=10, decimal_places=2, min_value=Decimal('0.01'))
+    quantity = serializers.IntegerField(min_value=1, required=False)
+    project = serializers.PrimaryKeyRelatedField(queryset=Project.objects.filter(status=Project.ProjectStatus.APPROVED), required=False)
+    credit = serializers.PrimaryKeyRelatedField(queryset=CarbonCredit.objects.all(), required=False)
+
+    def validate(self, attrs):
+        request_user = self.context['request'].user
+        if attrs['side'] == Order.Side.BID:
+            if 'project' not in attrs or 'quantity' not in attrs:
+                raise serializers.ValidationError("A bid needs a project and a quantity.")
+            return attrs
+        credit = attrs.get('credit')
+        if credit is None:
+            raise serializers.ValidationError({"credit": "An ask needs the credit it sells."})
+        if credit.owner_id != request_user.pk:
+            raise serializers.ValidationError({"credit": "You do not own this credit."})
+        if credit.status != CarbonCredit.CreditStatus.MINTED:
+            raise serializers.ValidationError({"credit": "This credit is not available for sale."})
+        if attrs.get('quantity', 0) > credit.quantity:
+            raise serializers.ValidationError({"quantity": f"This credit only holds {credit.quantity} tonnes."})
+        return attrs
+
+
+class BookLevelSerializer(serializers.Serializer):
+    price = serializers.DecimalField(max_digits=10, decimal_places=2)
+    tonnes = serializers.IntegerField()
+    orders = serializers.IntegerField()
+
+
+class BookDepthSerializer(serializers.Serializer):
+    bids = BookLevelSerializer(many=True)
+    asks = BookLevelSerializer(many=True)
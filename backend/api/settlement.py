@@ -0,0 +1,124 @@
+from django.contrib.auth.models import User
+from django.db import connection, transaction
+from django.db.models import BooleanField, Count, Exists, ExpressionWrapper, F, OuterRef, Q, Subquery, Sum
+from django.utils import timezone
+
+from .cache import listing_feed_cache
+from .models import Listing, Settlement, SettlementLine, Trade
+from .outbox import enqueue_many
+from .portfolio import adjust
+
+
+def unsettled(seller_ids=None, listing_ids=None):
+    """
+    Listings with proceeds not yet paid out, optionally of some sellers or listings only.
+    """
+    listings = Listing.objects.filter(quantity_sold__gt=F('quantity_claimed'))
+    if seller_ids is not None:
+        listings = listings.filter(seller_id__in=seller_ids)
+    if listing_ids is not None:
+        listings = listings.filter(pk__in=listing_ids)
+    return listings
+
+
+def unsettled_trades(seller_ids=None):
+    """
+    Order book trades whose proceeds were not paid out yet, optionally of some sellers only.
+    """
+    trades = Trade.objects.filter(claimed=False)
+    if seller_ids is not None:
+        trades = trades.filter(seller_id__in=seller_ids)
+    return trades
+
+
+def settle(key, seller_ids=None, listing_ids=None):
+    """
+    Pays out the unclaimed proceeds of `seller_ids` (every seller with any by default),
+    from their listings and order book trades or from `listing_ids` only, as one
+    Settlement per seller recorded under `key`. Returns (settlements created, settlements
+    already recorded under `key`).
+
+    The work is a fixed number of set-based statements however many listings and trades
+    are settled: the sellers' rows are locked (so concurrent settlements of one seller run
+    one after the other), one INSERT ... SELECT writes a line per listing with the tonnes
+    and proceeds not yet claimed and another one per unclaimed trade, one UPDATE moves the
+    listings' claimed quantities on by exactly the tonnes in their lines, so sales made
+    meanwhile stay unclaimed, one marks the trades in lines claimed, and one UPDATE totals
+    the settlements. Sellers that already have a settlement under `key` are skipped, which
+    makes retries with the same key safe.
+    """
+    with transaction.atomic():
+        listings = unsettled(seller_ids, listing_ids)
+        trades = unsettled_trades(seller_ids) if listing_ids is None else Trade.objects.none()
+        sellers = User.objects.filter(Q(pk__in=listings.values('seller_id')) | Q(pk__in=trades.values('seller_id')))
+        candidates = seller_ids if seller_ids is not None else sellers.values('pk')
+        list(User.objects.select_for_update().filter(pk__in=candidates).order_by('pk').values_list('pk', flat=True))
+        existing = Settlement.objects.filter(idempotency_key=key).order_by('pk')
+        if seller_ids is not None:
+            existing = existing.filter(seller_id__in=seller_ids)
+        existing = list(existing)
+        pending = sellers.filter(~Exists(Settlement.objects.filter(seller_id=OuterRef('pk'), idempotency_key=key)))
+        created = Settlement.objects.bulk_create([
+            Settlement(seller_id=seller_id, idempotency_key=key)
+            for seller_id in pending.values_list('pk', flat=True).order_by('pk')
+        ], batch_size=1000)
+        if not created:
+            return [], existing
+
+        # From here on, the settlements just created are the ones under `key` without lines
+        # yet (tonnes=0 until the totals are written last), so no id lists are needed.
+        new = Settlement.objects.filter(idempotency_key=key, tonnes=0)
+        settlement = Subquery(new.filter(seller_id=OuterRef('seller_id')).values('pk')[:1])
+        # Annotations only, so the SELECT lists its columns in the order they are declared.
+        lines = listings.annotate(
+            line_settlement=settlement,
+            line_listing=F('pk'),
+            line_tonnes=F('quantity_sold') - F('quantity_claimed'),
+            line_amount=F('price') * (F('quantity_sold') - F('quantity_claimed')),
+        ).filter(line_settlement__isnull=False).values_list('line_settlement', 'line_listing', 'line_tonnes', 'line_amount')
+        trade_lines = trades.annotate(
+            line_settlement=settlement,
+            line_trade=F('pk'),
+            line_tonnes=F('quantity'),
+            line_amount=F('price') * F('quantity'),
+        ).filter(line_settlement__isnull=False).values_list('line_settlement', 'line_trade', 'line_tonnes', 'line_amount')
+        with connection.cursor() as cursor:
+            for column, rows in (('listing_id', lines), ('trade_id', trade_lines)):
+                if rows.query.is_empty():
+                    continue
+                select, params = rows.query.sql_with_params()
+                cursor.execute(
+                    f'INSERT INTO {SettlementLine._meta.db_table} (settlement_id, {column}, tonnes, amount) {select}', params
+                )
+
+        new_lines = SettlementLine.objects.filter(settlement__idempotency_key=key, settlement__tonnes=0)
+        line = Subquery(new_lines.filter(listing=OuterRef('pk')).values('tonnes')[:1])
+        Listing.objects.filter(pk__in=new_lines.values('listing_id')).update(
+            quantity_claimed=F('quantity_claimed') + line,
+            claimed=ExpressionWrapper(Q(quantity_sold__lte=F('quantity_claimed') + line), output_field=BooleanField()),
+            updated_at=timezone.now(),
+        )
+        Trade.objects.filter(pk__in=new_lines.values('trade_id')).update(claimed=True, updated_at=timezone.now())
+        totals = SettlementLine.objects.filter(settlement=OuterRef('pk')).values('settlement')
+        new.update(
+            listings=Subquery(totals.annotate(count=Count('listing')).values('count')),
+            trades=Subquery(totals.annotate(count=Count('trade')).values('count')),
+            tonnes=Subquery(totals.annotate(tonnes=Sum('tonnes')).values('tonnes')),
+            amount=Subquery(totals.annotate(amount=Sum('amount')).values('amount')),
+        )
+
+        created = sorted(
+            Settlement.objects.in_bulk([settlement.pk for settlement in created]).values(), key=lambda settlement: settlement.pk
+        )
+        for settlement in created:
+            adjust(settlement.seller_id, proceeds_unclaimed=-settlement.amount)
+        enqueue_many('proceeds.settled', [
+            ({
+                'settlement_id': settlement.pk, 'seller_id': settlement.seller_id, 'listings': settlement.listings,
+                'trades': settlement.trades, 'tonnes': settlement.tonnes, 'amount': str(settlement.amount),
+            }, f'proceeds.settled:{settlement.pk}')
+            for settlement in created
+        ])
+        # Listings embed their claimed flag, and active ones are in the feed.
+        listing_feed_cache.invalidate_on_commit()
+    return created, existing
@@ -1,3 +1,1247 @@
-from django.test import TestCase
+import csv
+import hashlib
+import io
+import json
+import mmap
+import os
+import tempfile
+import threading
+import time
+from datetime import date, timedelta
+from decimal import Decimal
+from http.server import ThreadingHTTPServer
+from unittest import mock
 
-# Create your tests here.
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.core.management import call_command
+from django.db import connection, transaction
+from django.test import TestCase, TransactionTestCase, override_settings, skipUnlessDBFeature
+from django.urls import reverse
+from django.utils import timezone
+from rest_framework.test import APIClient
+
+from users.models import UserProfile
+from users.views import get_tokens_for_user
+from .analytics import band_price, price_band, record_listing, record_sale, summarize
+from .cache import listing_feed_cache
+from .ipfs import (
+    DAG_PB, RAW, ContentStore, ContentUnavailable, InvalidCID, IpfsGateway, content_store, make_cid, parse_cid,
+)
+from .management.commands.fake_ipfs_gateway import GatewayHandler, build_file
+from .marketplace import ListingUnavailable, listing_event, purchase_listing
+from .matching import Matcher
+from .mirror_node import Reconciler
+from .models import (
+    CarbonCredit, ExchangeRate, Listing, MarketPriceBand, MarketRollup, Order, OutboxEvent, PortfolioSummary, Project,
+    Settlement, Trade,
+)
+from . import outbox
+from .outbox import drain, enqueue
+from .search import ranked_listing_ids
+from .portfolio import COUNTERS, compute
+from .prices import HBAR_USD, rate_cache, refresh_rate
+from .realtime import Subscription, replay
+
+
+def make_user(username, role):
+    user = User.objects.create_user(username=username, email=f'{username}@example.com', password='pw-12345!')
+    UserProfile.objects.create(user=user, role=role)
+    return user
+
+
+def client_for(user):
+    client = APIClient()
+    client.credentials(HTTP_AUTHORIZATION=f"Bearer {get_tokens_for_user(user)['access']}")
+    return client
+
+
+class MarketplaceTestCase(TestCase):
+    """
+    A seller with an approved project, a buyer and a verifier, with API clients for each.
+    """
+    def setUp(self):
+        self.seller = make_user('seller', UserProfile.Role.SELLER)
+        self.buyer = make_user('buyer', UserProfile.Role.BUYER)
+        self.verifier = make_user('verifier', UserProfile.Role.VERIFIER)
+        self.project = Project.objects.create(
+            owner=self.seller, verifier=self.verifier, name='Mangroves', description='Coastal restoration',
+            location='Kenya', tonnage=100, vintage=2022, status=Project.ProjectStatus.APPROVED,
+        )
+        self.serials = 0
+        self.seller_client = client_for(self.seller)
+        self.buyer_client = client_for(self.buyer)
+
+    def make_lot(self, quantity=10, owner=None):
+        # Created directly, so make every lot of a test before its first API write.
+        self.serials += 1
+        return CarbonCredit.objects.create(
+            project=self.project, owner=owner or self.seller, hedera_token_id='0.0.100',
+            serial_number=self.serials, quantity=quantity,
+        )
+
+    def list_lot(self, credit, price, **fields):
+        response = self.seller_client.post(
+            reverse('api:listing-list-create'), {'credit': credit.pk, 'price': price, **fields}, format='json'
+        )
+        self.assertEqual(response.status_code, 201, response.content)
+        return Listing.objects.filter(seller=self.seller).latest('pk')
+
+    def buy(self, listing, quantity=None):
+        data = {} if quantity is None else {'quantity': quantity}
+        return self.buyer_client.post(reverse('api:buy-credit', args=[listing.pk]), data, format='json')
+
+    def assertPortfolioConsistent(self):
+        """
+        The counters maintained by the write paths equal a full recomputation.
+        """
+        stored = {row['user_id']: row for row in PortfolioSummary.objects.values('user_id', *COUNTERS)}
+        for user_id, counters in compute().items():
+            row = stored.get(user_id)
+            if row is None:
+                continue
+            self.assertEqual({name: row[name] for name in COUNTERS}, counters, f'user #{user_id}')
+
+
+class RelistingTests(MarketplaceTestCase):
+    def test_withdrawn_lot_can_be_listed_again(self):
+        credit = self.make_lot()
+        first = self.list_lot(credit, '3.00')
+        response = self.seller_client.post(reverse('api:withdraw-credit', args=[first.pk]))
+        self.assertEqual(response.status_code, 200, response.content)
+
+        second = self.list_lot(credit, '5.00')
+        self.assertNotEqual(first.pk, second.pk)
+        first.refresh_from_db()
+        self.assertFalse(first.is_active)
+        self.assertTrue(second.is_active)
+        self.assertPortfolioConsistent()
+
+    def test_withdrawn_listing_stays_unbuyable_after_relisting(self):
+        credit = self.make_lot()
+        first = self.list_lot(credit, '3.00')
+        self.seller_client.post(reverse('api:withdraw-credit', args=[first.pk]))
+        second = self.list_lot(credit, '5.00')
+
+        self.assertEqual(self.buy(first).status_code, 409)
+        self.assertEqual(self.seller_client.post(reverse('api:withdraw-credit', args=[first.pk])).status_code, 400)
+        first.refresh_from_db()
+        self.assertEqual(first.quantity_sold, 0)
+
+        response = self.buy(second)
+        self.assertEqual(response.status_code, 200, response.content)
+        second.refresh_from_db()
+        self.assertEqual((second.is_active, second.quantity_sold), (False, 10))
+        self.assertPortfolioConsistent()
+
+    def test_buying_a_missing_listing_is_not_found(self):
+        self.assertEqual(self.buyer_client.post(reverse('api:buy-credit', args=[999])).status_code, 404)
+
+
+class BulkListingTests(MarketplaceTestCase):
+    def bulk_list(self, items):
+        return self.seller_client.post(reverse('api:listing-bulk-create'), {'items': items}, format='json')
+
+    def test_batch_mixing_new_withdrawn_and_unavailable_lots(self):
+        fresh = self.make_lot()
+        withdrawn = self.make_lot()
+        listed = self.make_lot()
+        foreign = self.make_lot(owner=self.buyer)
+        old = self.list_lot(withdrawn, '3.00')
+        self.seller_client.post(reverse('api:withdraw-credit', args=[old.pk]))
+        self.list_lot(listed, '4.00')
+
+        response = self.bulk_list([
+            {'credit': fresh.pk, 'price': '5.00'},
+            {'credit': withdrawn.pk, 'price': '6.00'},
+            {'credit': listed.pk, 'price': '7.00'},
+            {'credit': foreign.pk, 'price': '8.00'},
+            {'credit': fresh.pk, 'price': '9.00'},
+            {'credit': 999, 'price': '1.00'},
+        ])
+
+        self.assertEqual(response.status_code, 200, response.content)
+        results = response.json()['results']
+        self.assertEqual([result['listed'] for result in results], [True, True, False, False, False, False])
+        self.assertEqual(results[3]['error'], "You do not own this credit.")
+        self.assertEqual(results[5]['error'], "Credit not found.")
+        relisted = Listing.objects.get(pk=results[1]['listing'])
+        self.assertEqual((relisted.credit_id, relisted.price, relisted.is_active), (withdrawn.pk, Decimal('6.00'), True))
+        self.assertEqual(Listing.objects.filter(credit=withdrawn).count(), 2)
+        self.assertPortfolioConsistent()
+
+    def test_bulk_withdraw_rejects_stale_listing_of_a_relisted_lot(self):
+        credit = self.make_lot()
+        old = self.list_lot(credit, '3.00')
+        self.seller_client.post(reverse('api:withdraw-credit', args=[old.pk]))
+        current = self.list_lot(credit, '5.00')
+
+        response = self.seller_client.post(
+            reverse('api:listing-bulk-withdraw'), {'listings': [old.pk, current.pk]}, format='json'
+        )
+
+        self.assertEqual(response.status_code, 200, response.content)
+        self.assertEqual([result['withdrawn'] for result in response.json()['results']], [False, True])
+        credit.refresh_from_db()
+        self.assertEqual(credit.status, CarbonCredit.CreditStatus.MINTED)
+        self.assertPortfolioConsistent()
+
+
+class PurchaseTests(MarketplaceTestCase):
+    def setUp(self):
+        super().setUp()
+        self.credit = self.make_lot(quantity=10)
+        self.listing = self.list_lot(self.credit, '2.50')
+
+    def test_second_purchase_of_a_sold_listing_conflicts(self):
+        self.assertEqual(self.buy(self.listing).status_code, 200)
+        self.assertEqual(self.buy(self.listing).status_code, 409)
+
+        self.credit.refresh_from_db()
+        self.listing.refresh_from_db()
+        self.assertEqual((self.credit.owner_id, self.credit.status), (self.buyer.pk, CarbonCredit.CreditStatus.SOLD))
+        self.assertEqual((self.listing.is_active, self.listing.quantity_sold), (False, 10))
+        self.assertPortfolioConsistent()
+
+    def test_partial_buys_split_the_lot_until_the_last_one_takes_it(self):
+        self.assertEqual(self.buy(self.listing, 3).status_code, 200)
+        self.assertEqual(self.buy(self.listing, 4).status_code, 200)
+        self.listing.refresh_from_db()
+        self.assertEqual((self.listing.is_active, self.listing.quantity_sold), (True, 7))
+
+        response = self.buy(self.listing)
+        self.assertEqual(response.status_code, 200, response.content)
+        self.assertEqual(response.json()['id'], self.credit.pk)
+        self.listing.refresh_from_db()
+        self.assertEqual((self.listing.is_active, self.listing.quantity_sold), (False, 10))
+        self.assertEqual(
+            sorted(CarbonCredit.objects.filter(owner=self.buyer).values_list('quantity', flat=True)), [3, 3, 4]
+        )
+        self.assertPortfolioConsistent()
+
+    def test_buying_more_than_is_left_conflicts(self):
+        self.assertEqual(self.buy(self.listing, 11).status_code, 409)
+        self.assertEqual(self.buy(self.listing, 6).status_code, 200)
+        self.assertEqual(self.buy(self.listing, 5).status_code, 409)
+
+        self.assertEqual(self.buy(self.listing, 4).status_code, 200)
+        self.listing.refresh_from_db()
+        self.assertEqual((self.listing.is_active, self.listing.quantity_sold), (False, 10))
+        self.assertPortfolioConsistent()
+
+
+
+class BulkMintTests(MarketplaceTestCase):
+    def setUp(self):
+        super().setUp()
+        self.pending = Project.objects.create(
+            owner=self.seller, name='Savanna', description='Grassland restoration', location='Tanzania',
+            tonnage=30, vintage=2023,
+        )
+        self.verifier_client = client_for(self.verifier)
+
+    def mint(self, *ranges, project=None):
+        return self.verifier_client.post(
+            reverse('api:project-bulk-mint', args=[(project or self.pending).pk]),
+            {'token_address': '0.0.500', 'serial_ranges': [{'start': start, 'end': end} for start, end in ranges]},
+            format='json',
+        )
+
+    def minted(self):
+        return list(CarbonCredit.objects.filter(project=self.pending).order_by('serial_number').values_list('serial_number', flat=True))
+
+    @override_settings(BULK_MINT_CHUNK_SIZE=3)
+    def test_ranges_register_one_credit_per_serial(self):
+        response = self.mint((1, 10), (20, 24))
+        self.assertEqual(response.status_code, 201, response.content)
+        self.assertEqual((response.json()['requested'], response.json()['created'], response.json()['skipped']), (15, 15, 0))
+        self.assertEqual(self.minted(), [*range(1, 11), *range(20, 25)])
+        self.assertEqual(set(CarbonCredit.objects.filter(project=self.pending).values_list('quantity', 'status')), {(1, 'MINTED')})
+        self.pending.refresh_from_db()
+        self.assertEqual((self.pending.status, self.pending.verifier_id), ('APPROVED', self.verifier.pk))
+        summary = self.seller_client.get(reverse('api:portfolio-summary')).json()
+        self.assertEqual((summary['credits_owned'], summary['tonnes_available'], summary['projects_approved']), (15, 15, 2))
+        self.assertPortfolioConsistent()
+
+    @override_settings(BULK_MINT_CHUNK_SIZE=4)
+    def test_overlapping_and_registered_serials_are_skipped(self):
+        response = self.mint((1, 10), (5, 12))
+        self.assertEqual((response.json()['requested'], response.json()['created'], response.json()['skipped']), (18, 12, 6))
+        response = self.mint((1, 14))
+        self.assertEqual(response.status_code, 201, response.content)
+        self.assertEqual((response.json()['created'], response.json()['skipped']), (2, 12))
+        self.assertEqual(self.minted(), list(range(1, 15)))
+        self.assertPortfolioConsistent()
+
+    def test_serials_beyond_the_tonnage_are_rejected(self):
+        self.assertEqual(self.mint((1, 31)).status_code, 400)
+        self.assertEqual(self.minted(), [])
+        self.pending.refresh_from_db()
+        self.assertEqual(self.pending.status, 'PENDING')
+
+    def test_a_project_approved_as_one_lot_is_not_minted_again(self):
+        response = self.verifier_client.patch(
+            reverse('api:project-review', args=[self.pending.pk]),
+            {'status': 'APPROVED', 'serial_number': 1, 'token_address': '0.0.500'}, format='json',
+        )
+        self.assertEqual(response.status_code, 200, response.content)
+        self.assertEqual(self.mint((2, 3)).status_code, 400)
+        self.assertEqual(list(CarbonCredit.objects.filter(project=self.pending).values_list('quantity', flat=True)), [30])
+        self.assertPortfolioConsistent()
+
+    def test_reapproval_keeps_the_issued_credits(self):
+        self.assertEqual(self.mint((1, 30)).status_code, 201)
+        review = reverse('api:project-review', args=[self.pending.pk])
+        self.verifier_client.patch(review, {'status': 'REJECTED'}, format='json')
+        response = self.verifier_client.patch(
+            review, {'status': 'APPROVED', 'serial_number': 99, 'token_address': '0.0.500'}, format='json'
+        )
+        self.assertEqual(response.status_code, 200, response.content)
+        self.assertEqual(self.minted(), list(range(1, 31)))
+        self.assertPortfolioConsistent()
+
+    def test_a_rejected_project_is_not_minted(self):
+        Project.objects.filter(pk=self.pending.pk).update(status=Project.ProjectStatus.REJECTED)
+        self.assertEqual(self.mint((1, 3)).status_code, 400)
+        self.assertEqual(self.minted(), [])
+
+
+class SettlementTests(MarketplaceTestCase):
+    def setUp(self):
+        super().setUp()
+        lots = [self.make_lot(), self.make_lot()]
+        self.listings = [self.list_lot(credit, price) for credit, price in zip(lots, ('2.00', '3.00'))]
+
+    def settle(self, key=None, listing=None):
+        headers = {'HTTP_IDEMPOTENCY_KEY': key} if key else {}
+        if listing is not None:
+            return self.seller_client.post(reverse('api:claim-proceeds', args=[listing.pk]), **headers)
+        return self.seller_client.post(reverse('api:settlement-list-create'), **headers)
+
+    def test_retries_with_the_same_key_settle_once(self):
+        self.buy(self.listings[0], 4)
+        self.buy(self.listings[1])
+
+        first = self.settle('payout-1')
+        self.assertEqual(first.status_code, 201, first.content)
+        self.assertEqual(first.json()['amount'], '38.00')
+        self.assertEqual((first.json()['listings'], first.json()['tonnes']), (2, 14))
+        retry = self.settle('payout-1')
+        self.assertEqual(retry.status_code, 200)
+        self.assertEqual(retry.json(), first.json())
+        self.assertEqual(self.settle('payout-2').status_code, 400)
+        self.assertPortfolioConsistent()
+
+    def test_a_key_reused_for_another_listing_conflicts(self):
+        self.buy(self.listings[0], 4)
+        self.buy(self.listings[1], 2)
+        self.assertEqual(self.settle('claim-1', self.listings[0]).status_code, 200)
+
+        self.assertEqual(self.settle('claim-1', self.listings[0]).status_code, 200)
+        self.assertEqual(self.settle('claim-1', self.listings[1]).status_code, 409)
+        self.listings[1].refresh_from_db()
+        self.assertEqual(self.listings[1].quantity_claimed, 0)
+        self.assertEqual(self.settle('claim-2', self.listings[1]).status_code, 200)
+        self.assertPortfolioConsistent()
+
+    def test_sales_after_a_claim_stay_claimable(self):
+        listing = self.listings[0]
+        self.assertEqual(self.settle(listing=listing).status_code, 400)
+        self.buy(listing, 4)
+        self.assertEqual(self.settle(listing=listing).status_code, 200)
+        self.buy(listing, 1)
+
+        listing.refresh_from_db()
+        self.assertEqual((listing.quantity_sold, listing.quantity_claimed, listing.claimed), (5, 4, False))
+        summary = self.seller_client.get(reverse('api:portfolio-summary')).json()
+        self.assertEqual(Decimal(summary['proceeds_unclaimed']), Decimal('2.00'))
+        self.assertEqual(self.settle(listing=listing).status_code, 200)
+        listing.refresh_from_db()
+        self.assertEqual((listing.quantity_claimed, listing.claimed), (5, True))
+        self.assertPortfolioConsistent()
+
+
+
+
+class ReconcilerTests(MarketplaceTestCase):
+    def test_on_chain_purchase_of_a_partly_sold_listing_books_the_remainder(self):
+        credit = self.make_lot()
+        UserProfile.objects.filter(user=self.buyer).update(hedera_account_id='0.0.2002')
+        listing = self.list_lot(credit, '2.00')
+        self.buy(listing, 4)
+
+        Reconciler(marketplace_account='0.0.9999').apply_transfers([
+            {'token_id': '0.0.100', 'serial_number': credit.serial_number, 'sender': '0.0.9999', 'receiver': '0.0.2002'},
+        ])
+
+        listing.refresh_from_db()
+        self.assertEqual((listing.is_active, listing.quantity_sold, listing.claimed), (False, 10, False))
+        sales = OutboxEvent.objects.filter(topic='listing.sold').order_by('pk')
+        self.assertEqual([event.payload['quantity'] for event in sales], [4, 6])
+        summary = self.seller_client.get(reverse('api:portfolio-summary')).json()
+        self.assertEqual((summary['tonnes_sold'], Decimal(summary['proceeds_unclaimed'])), (10, Decimal('20.00')))
+        self.assertPortfolioConsistent()
+
+    def test_escrow_without_a_listing_leaves_the_lot_listable(self):
+        credit = self.make_lot()
+        UserProfile.objects.filter(user=self.seller).update(hedera_account_id='0.0.2001')
+        reconciler = Reconciler(marketplace_account='0.0.9999')
+
+        reconciler.apply_transfers([
+            {'token_id': '0.0.100', 'serial_number': credit.serial_number, 'sender': '0.0.2001', 'receiver': '0.0.9999'},
+        ])
+        reconciler.apply_holders('0.0.100', [(credit.serial_number, '0.0.9999')])
+
+        credit.refresh_from_db()
+        self.assertEqual(credit.status, CarbonCredit.CreditStatus.MINTED)
+        self.assertEqual(reconciler.stats['applied'], 0)
+        self.assertTrue(self.list_lot(credit, '2.00').is_active)
+        self.assertPortfolioConsistent()
+
+
+
+class MarketAnalyticsTests(MarketplaceTestCase):
+    def setUp(self):
+        super().setUp()
+        today = timezone.localdate()
+        for seller in (self.seller, self.buyer):
+            MarketRollup.objects.create(dimension='seller', key=str(seller.pk), day=today, listings=1, listed_tonnes=10)
+
+    def seller_keys(self, client):
+        response = client.get(reverse('api:market-analytics', args=['seller']))
+        self.assertEqual(response.status_code, 200, response.content)
+        return sorted(row['key'] for row in response.json()['results'])
+
+    def test_sellers_only_see_their_own_figures(self):
+        self.assertEqual(self.seller_keys(self.seller_client), [str(self.seller.pk)])
+
+    def test_staff_see_every_seller(self):
+        User.objects.filter(pk=self.seller.pk).update(is_staff=True)
+        self.seller.refresh_from_db()
+        self.assertEqual(self.seller_keys(client_for(self.seller)), sorted([str(self.seller.pk), str(self.buyer.pk)]))
+
+
+
+class AnalyticsRollupTests(MarketplaceTestCase):
+    def setUp(self):
+        super().setUp()
+        self.place = {'id': self.project.pk, 'vintage': self.project.vintage, 'location': self.project.location}
+
+    def sale_event(self, key, price='2.00', quantity=3):
+        with transaction.atomic():
+            enqueue('listing.sold', listing_event(
+                1, 1, self.project.pk, self.seller.pk, price=Decimal(price), quantity=quantity, buyer_id=self.buyer.pk,
+            ), key=key)
+
+    def totals(self, **kwargs):
+        return [
+            (row['trades'], row['sold_tonnes'], row['volume'])
+            for row in summarize('project', keys=[str(self.project.pk)], **kwargs)
+        ]
+
+    def test_a_replayed_sale_is_counted_once(self):
+        self.sale_event('listing.sold:1:1')
+        self.sale_event('listing.sold:1:1')
+        calls = []
+
+        def fail_once(event):
+            calls.append(event.pk)
+            if len(calls) == 1:
+                raise RuntimeError('worker died')
+        with mock.patch.dict(outbox._handlers, {'*': outbox._handlers['*'] + [fail_once]}), \
+                self.assertLogs('api.outbox', 'ERROR'):
+            self.assertEqual(drain(), (0, 1))
+            self.assertEqual(self.totals(), [])
+            OutboxEvent.objects.update(available_at=timezone.now())
+            self.assertEqual(drain(), (1, 0))
+        self.assertEqual(drain(), (0, 0))
+
+        self.assertEqual(self.totals(), [(1, 3, Decimal('6.00'))])
+        self.assertEqual(
+            list(MarketPriceBand.objects.filter(dimension='project').values_list('sold_tonnes', flat=True)), [3]
+        )
+
+    def test_average_and_median_price(self):
+        day = timezone.localdate()
+        for price, quantity in (('2.00', 1), ('3.00', 5), ('10.00', 1)):
+            record_sale(day, self.place, self.seller.pk, Decimal(price), quantity)
+
+        row, = summarize('all')
+        self.assertEqual((row['trades'], row['sold_tonnes'], row['volume']), (3, 7, Decimal('27.00')))
+        self.assertEqual(row['average_price'], Decimal('3.86'))
+        self.assertEqual(row['median_price'], band_price(price_band(Decimal('3.00'))))
+        self.assertLessEqual(abs(row['median_price'] - Decimal('3.00')), Decimal('0.03'))
+
+    def test_no_prices_without_sales(self):
+        record_listing(timezone.localdate(), self.place, self.seller.pk, 10)
+        row, = summarize('seller')
+        self.assertEqual((row['listings'], row['listed_tonnes']), (1, 10))
+        self.assertEqual((row['average_price'], row['median_price']), (None, None))
+
+    def test_periods_bucket_days_by_week_and_month(self):
+        # 2026-03-30 and 2026-04-06 are Mondays.
+        for day in ('2026-03-30', '2026-04-02', '2026-04-06'):
+            record_listing(date.fromisoformat(day), self.place, self.seller.pk, 5)
+
+        def listings(period):
+            return [(str(row['period']), row['listings']) for row in summarize('all', period=period)]
+        self.assertEqual(listings('day'), [('2026-03-30', 1), ('2026-04-02', 1), ('2026-04-06', 1)])
+        self.assertEqual(listings('week'), [('2026-03-30', 2), ('2026-04-06', 1)])
+        self.assertEqual(listings('month'), [('2026-03-01', 1), ('2026-04-01', 2)])
+        self.assertEqual(
+            [(str(row['period']), row['listings']) for row in summarize('all', start=date(2026, 4, 1), period='month')],
+            [('2026-04-01', 2)],
+        )
+
+
+class RoleChangeTests(MarketplaceTestCase):
+    def test_writes_use_the_current_role_despite_the_token_claim(self):
+        credit = self.make_lot()
+        # Changed by another process: neither the token nor this process's cache knows.
+        UserProfile.objects.filter(user=self.seller).update(role=UserProfile.Role.BUYER)
+        cache.clear()
+
+        response = self.seller_client.post(
+            reverse('api:listing-list-create'), {'credit': credit.pk, 'price': '3.00'}, format='json'
+        )
+        self.assertEqual(response.status_code, 403)
+
+
+
+class RebuildPortfoliosTests(MarketplaceTestCase):
+    def setUp(self):
+        super().setUp()
+        listing = self.list_lot(self.make_lot(), '2.00')
+        self.buy(listing, 4)
+        self.correct = PortfolioSummary.objects.get(user=self.seller).tonnes_sold
+        PortfolioSummary.objects.filter(user=self.seller).update(tonnes_sold=99)
+
+    def rebuild(self, *args):
+        out = io.StringIO()
+        call_command('rebuild_portfolios', *args, stdout=out)
+        return out.getvalue()
+
+    def test_check_reports_drifted_summaries_without_fixing_them(self):
+        output = self.rebuild('--check')
+        self.assertIn(f'User #{self.seller.pk}: tonnes_sold 99 != {self.correct}', output)
+        self.assertIn('1 summary(ies) out of date', output)
+        self.assertNotIn(f'User #{self.buyer.pk}', output)
+        self.assertIn('0 summary(ies) out of date', self.rebuild('--check', '--user', str(self.buyer.pk)))
+        self.assertEqual(PortfolioSummary.objects.get(user=self.seller).tonnes_sold, 99)
+
+    def test_rebuild_repairs_them(self):
+        self.assertIn('Rebuilt', self.rebuild('--user', str(self.seller.pk)))
+        self.assertEqual(PortfolioSummary.objects.get(user=self.seller).tonnes_sold, self.correct)
+        self.assertIn('0 summary(ies) out of date', self.rebuild('--check'))
+        self.assertPortfolioConsistent()
+
+
+class ListingFilterTests(MarketplaceTestCase):
+    def setUp(self):
+        super().setUp()
+        other_seller = make_user('seller-2', UserProfile.Role.SELLER)
+        peatlands = Project.objects.create(
+            owner=other_seller, verifier=self.verifier, name='Peatlands', description='Rewetting',
+            location='Indonesia', tonnage=5000, vintage=2019, status=Project.ProjectStatus.APPROVED,
+        )
+        self.cheap = self.list_directly(self.make_lot(quantity=40), '1.50')
+        self.dear = self.list_directly(self.make_lot(quantity=3), '9.00')
+        peat_lot = CarbonCredit.objects.create(
+            project=peatlands, owner=other_seller, hedera_token_id='0.0.300', serial_number=1, quantity=12,
+        )
+        self.peat = self.list_directly(peat_lot, '4.00')
+        cache.clear()
+
+    def list_directly(self, credit, price):
+        CarbonCredit.objects.filter(pk=credit.pk).update(status=CarbonCredit.CreditStatus.LISTED)
+        return Listing.objects.create(seller=credit.owner, credit=credit, price=price).pk
+
+    def feed(self, expected_status=200, **params):
+        response = self.buyer_client.get(reverse('api:listing-list-create'), params)
+        self.assertEqual(response.status_code, expected_status, response.content)
+        return [row['id'] for row in response.json()['results']] if expected_status == 200 else response.json()
+
+    def test_filters(self):
+        for params, expected in (
+            ({'min_price': '2'}, [self.peat, self.dear]),
+            ({'max_price': '4.00'}, [self.peat, self.cheap]),
+            ({'min_vintage': '2020'}, [self.dear, self.cheap]),
+            ({'max_vintage': '2019'}, [self.peat]),
+            ({'location': 'kenya'}, [self.dear, self.cheap]),
+            ({'project_status': 'APPROVED'}, [self.peat, self.dear, self.cheap]),
+            ({'project_status': 'REJECTED'}, []),
+            ({'seller': self.seller.pk}, [self.dear, self.cheap]),
+            ({'min_price': '1', 'max_price': '5', 'location': 'Indonesia'}, [self.peat]),
+        ):
+            with self.subTest(**params):
+                self.assertEqual(self.feed(**params), expected)
+
+    def test_tonnage_is_the_listed_lot_not_the_project(self):
+        # Both Kenyan lots belong to a 100-tonne project; the Indonesian one to a 5000-tonne one.
+        self.assertEqual(self.feed(min_tonnage=10), [self.peat, self.cheap])
+        self.assertEqual(self.feed(max_tonnage=12), [self.peat, self.dear])
+        self.assertEqual(self.feed(ordering='tonnage'), [self.dear, self.peat, self.cheap])
+        self.assertEqual(self.feed(ordering='-tonnage'), [self.cheap, self.peat, self.dear])
+
+    def test_invalid_values_are_rejected(self):
+        self.assertIn('min_price', self.feed(400, min_price='cheap'))
+        self.assertIn('seller', self.feed(400, seller='me'))
+        self.assertIn('project_status', self.feed(400, project_status='MINTED'))
+        self.assertIn('ordering', self.feed(400, ordering='oldest'))
+
+
+class ListingSearchTests(MarketplaceTestCase):
+    def test_cap_keeps_the_best_ranked_projects(self):
+        # The project name matches, which outranks the description match of the other one.
+        other = Project.objects.create(
+            owner=self.seller, verifier=self.verifier, name='Peatlands', description='Next to the mangroves',
+            location='Indonesia', tonnage=100, vintage=2022, status=Project.ProjectStatus.APPROVED,
+        )
+        best = [self.make_lot(), self.make_lot()]
+        newer = []
+        for _ in range(3):
+            self.serials += 1
+            newer.append(CarbonCredit.objects.create(
+                project=other, owner=self.seller, hedera_token_id='0.0.100', serial_number=self.serials, quantity=10,
+            ))
+        listings = [self.list_lot(credit, '2.00').pk for credit in best + newer]
+
+        self.assertEqual(ranked_listing_ids('mangroves', limit=2), listings[1::-1])
+        self.assertEqual(ranked_listing_ids('mangroves', limit=3), [*listings[1::-1], listings[-1]])
+
+
+class ReplayTests(MarketplaceTestCase):
+    def record(self, key):
+        return OutboxEvent.objects.create(
+            topic='listing.created', payload={'project_id': self.project.pk}, idempotency_key=key
+        )
+
+    async def test_replays_events_committed_after_a_higher_id(self):
+        old, late, sent, after = [await sync_to_async(self.record)(key) for key in ('old', 'late', 'sent', 'after')]
+        await OutboxEvent.objects.filter(pk=old.pk).aupdate(created_at=timezone.now() - timedelta(minutes=5))
+
+        # `late` has a lower id than `sent` but may have committed after `sent` was delivered.
+        events, complete = await replay(Subscription(), sent.pk)
+
+        self.assertEqual([event.id for event in events], [late.pk, sent.pk, after.pk])
+        self.assertTrue(complete)
+
+    async def test_sales_are_pushed_without_the_buyer_or_tonnes(self):
+        sale = await OutboxEvent.objects.acreate(topic='listing.sold', idempotency_key='sale', payload=listing_event(
+            7, 8, self.project.pk, self.seller.pk, buyer_id=self.buyer.pk, price=Decimal('2.00'), quantity=4,
+        ))
+
+        (event,), _ = await replay(Subscription(), sale.pk - 1)
+
+        self.assertEqual(event.seller_id, self.seller.pk)
+        self.assertEqual(set(event.data), {'listing_id', 'project_id', 'seller_id', 'price', 'vintage', 'at'})
+        self.assertNotIn('buyer_id', event.encode())
+
+
+class OutboxTests(TransactionTestCase):
+    def setUp(self):
+        self.calls = []
+
+    def handlers(self, network=(), database=()):
+        return mock.patch.dict(outbox._network_handlers, {'test.event': list(network)}), \
+            mock.patch.dict(outbox._handlers, {'test.event': list(database)})
+
+    def record(self, name, fail=None):
+        def func(event):
+            self.calls.append((name, event.payload['n'], connection.in_atomic_block))
+            if event.payload['n'] == fail:
+                raise RuntimeError('boom')
+        return func
+
+    def test_network_handlers_run_outside_the_transaction(self):
+        event = OutboxEvent.objects.create(topic='test.event', payload={'n': 1}, idempotency_key='test.event:1')
+        network, database = self.handlers([self.record('network')], [self.record('database')])
+        with network, database:
+            self.assertEqual(drain(), (1, 0))
+
+        self.assertEqual(self.calls, [('network', 1, False), ('database', 1, True)])
+        event.refresh_from_db()
+        self.assertEqual((event.status, event.attempts), (OutboxEvent.EventStatus.DONE, 1))
+
+    def test_each_event_commits_on_its_own(self):
+        for n in (1, 2, 3):
+            OutboxEvent.objects.create(topic='test.event', payload={'n': n}, idempotency_key=f'test.event:{n}')
+
+        def write(event):
+            OutboxEvent.objects.filter(pk=event.pk).update(last_error=f'wrote {event.payload["n"]}')
+        network, database = self.handlers([self.record('network', fail=2)], [write])
+        with network, database, self.assertLogs('api.outbox', 'ERROR'):
+            self.assertEqual(drain(), (2, 1))
+
+        events = OutboxEvent.objects.order_by('pk')
+        self.assertEqual(
+            [(event.status, event.last_error) for event in events],
+            [
+                (OutboxEvent.EventStatus.DONE, 'wrote 1'),
+                (OutboxEvent.EventStatus.PENDING, 'RuntimeError: boom'),
+                (OutboxEvent.EventStatus.DONE, 'wrote 3'),
+            ],
+        )
+        self.assertGreater(events[1].available_at, timezone.now())
+        self.assertEqual(drain(), (0, 0))
+
+    def test_an_event_taken_over_after_its_lease_is_left_to_the_new_worker(self):
+        event = OutboxEvent.objects.create(topic='test.event', payload={'n': 1}, idempotency_key='test.event:1')
+
+        def taken_over(event):
+            # Another worker claimed the event once the lease ran out.
+            OutboxEvent.objects.filter(pk=event.pk).update(attempts=event.attempts + 1)
+        network, database = self.handlers([taken_over], [self.record('database')])
+        with network, database:
+            self.assertEqual(drain(), (0, 0))
+
+        self.assertEqual(self.calls, [])
+        event.refresh_from_db()
+        self.assertEqual((event.status, event.attempts), (OutboxEvent.EventStatus.PENDING, 2))
+
+
+class OrderBookTests(MarketplaceTestCase):
+    def setUp(self):
+        super().setUp()
+        self.lot = self.make_lot()
+
+    def place(self, client, **data):
+        response = client.post(reverse('api:order-list-create'), data, format='json')
+        self.assertEqual(response.status_code, 202, response.content)
+        return Order.objects.get(pk=response.json()['id'])
+
+    def match(self):
+        Matcher().load()
+        Matcher().process()
+        drain()
+
+    def test_trades_are_accounted_and_settled_like_listing_sales(self):
+        ask = self.place(self.seller_client, side='ASK', price='2.00', quantity=4, credit=self.lot.pk)
+        self.assertEqual(CarbonCredit.objects.get(pk=ask.credit_id).status, CarbonCredit.CreditStatus.RESERVED)
+        bid = self.place(self.buyer_client, side='BID', price='2.50', quantity=6, project=self.project.pk)
+        self.match()
+
+        ask.refresh_from_db()
+        bid.refresh_from_db()
+        self.assertEqual((ask.status, bid.status, bid.remaining), (Order.OrderStatus.FILLED, Order.OrderStatus.OPEN, 2))
+        trade = Trade.objects.get()
+        self.assertEqual((trade.price, trade.quantity, trade.credit.owner_id), (Decimal('2.00'), 4, self.buyer.pk))
+        summary = self.seller_client.get(reverse('api:portfolio-summary')).json()
+        self.assertEqual((summary['listings_active'], summary['tonnes_listed'], summary['tonnes_sold']), (0, 0, 4))
+        self.assertEqual(Decimal(summary['proceeds_unclaimed']), Decimal('8.00'))
+        rollup = MarketRollup.objects.get(dimension='all')
+        self.assertEqual((rollup.trades, rollup.sold_tonnes, rollup.volume), (1, 4, Decimal('8.00')))
+        self.assertPortfolioConsistent()
+
+        headers = {'HTTP_IDEMPOTENCY_KEY': 'payout-1'}
+        response = self.seller_client.post(reverse('api:settlement-list-create'), **headers)
+        self.assertEqual(response.status_code, 201, response.content)
+        self.assertEqual((response.json()['listings'], response.json()['trades'], response.json()['amount']), (0, 1, '8.00'))
+        self.assertEqual(self.seller_client.post(reverse('api:settlement-list-create'), **headers).status_code, 200)
+        trade.refresh_from_db()
+        self.assertTrue(trade.claimed)
+        self.assertPortfolioConsistent()
+
+    def test_reserved_lot_cannot_be_listed_or_bought_through_an_old_listing(self):
+        old = self.list_lot(self.lot, '3.00')
+        self.seller_client.post(reverse('api:withdraw-credit', args=[old.pk]))
+        self.place(self.seller_client, side='ASK', price='2.00', credit=self.lot.pk)
+        self.match()
+
+        self.assertEqual(self.buy(old).status_code, 409)
+        response = self.seller_client.post(
+            reverse('api:listing-list-create'), {'credit': self.lot.pk, 'price': '3.00'}, format='json'
+        )
+        self.assertEqual(response.status_code, 400)
+        summary = self.seller_client.get(reverse('api:portfolio-summary')).json()
+        self.assertEqual((summary['listings_active'], summary['tonnes_listed'], summary['tonnes_available']), (1, 10, 0))
+        self.assertPortfolioConsistent()
+
+    def test_cancelling_an_ask_releases_its_lot(self):
+        ask = self.place(self.seller_client, side='ASK', price='2.00', credit=self.lot.pk)
+        self.match()
+        response = self.seller_client.post(reverse('api:order-cancel', args=[ask.pk]))
+        self.assertEqual(response.status_code, 202, response.content)
+        self.match()
+
+        self.lot.refresh_from_db()
+        self.assertEqual(self.lot.status, CarbonCredit.CreditStatus.MINTED)
+        summary = self.seller_client.get(reverse('api:portfolio-summary')).json()
+        self.assertEqual((summary['listings_active'], summary['tonnes_listed'], summary['tonnes_available']), (0, 0, 10))
+        self.assertPortfolioConsistent()
+
+
+@skipUnlessDBFeature('has_select_for_update')
+class ConcurrentPurchaseTests(TransactionTestCase):
+    """
+    Buyers racing for one listing on separate connections: exactly one wins. Needs a
+    database with row locks (PostgreSQL); SQLite serializes writers on its own.
+    """
+    def test_exactly_one_concurrent_buyer_wins(self):
+        seller = make_user('seller', UserProfile.Role.SELLER)
+        buyers = [make_user(f'buyer-{i}', UserProfile.Role.BUYER) for i in range(8)]
+        project = Project.objects.create(
+            owner=seller, name='Race', description='-', location='-', tonnage=1, status=Project.ProjectStatus.APPROVED,
+        )
+        credit = CarbonCredit.objects.create(
+            project=project, owner=seller, hedera_token_id='0.0.200', serial_number=1,
+            status=CarbonCredit.CreditStatus.LISTED,
+        )
+        listing = Listing.objects.create(seller=seller, credit=credit, price=1)
+
+        barrier = threading.Barrier(len(buyers))
+        outcomes = []
+
+        def attempt(buyer):
+            barrier.wait()
+            try:
+                purchase_listing(listing.pk, buyer)
+                outcomes.append('won')
+            except ListingUnavailable:
+                outcomes.append('lost')
+            finally:
+                connection.close()
+
+        threads = [threading.Thread(target=attempt, args=(buyer,)) for buyer in buyers]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        self.assertEqual(sorted(outcomes), ['lost'] * (len(buyers) - 1) + ['won'])
+        credit.refresh_from_db()
+        self.assertIn(credit.owner_id, [buyer.pk for buyer in buyers])
+        self.assertEqual(Listing.objects.get(pk=listing.pk).quantity_sold, 1)
+
+
+class CursorPaginationTests(MarketplaceTestCase):
+    def setUp(self):
+        super().setUp()
+        lots = [self.make_lot() for _ in range(7)]
+        self.listings = [self.list_lot(credit, '2.00' if i % 2 else '3.00').pk for i, credit in enumerate(lots)]
+        # Ties on the sort key are what an offset-based cursor gets wrong.
+        Listing.objects.update(created_at=timezone.now())
+        cache.clear()
+
+    def walk(self, url, params):
+        pages, response = [], self.buyer_client.get(url, {**params, 'page_size': 2})
+        while True:
+            self.assertEqual(response.status_code, 200, response.content)
+            body = response.json()
+            pages.append([row['id'] for row in body['results']])
+            if not body['next']:
+                return pages, body['previous']
+            response = self.buyer_client.get(body['next'])
+
+    def test_pages_cover_ties_once_in_both_directions(self):
+        for params, expected in (
+            ({}, sorted(self.listings, reverse=True)),
+            ({'ordering': 'price'}, sorted(self.listings[1::2]) + sorted(self.listings[::2])),
+            ({'ordering': '-price'}, sorted(self.listings[::2], reverse=True) + sorted(self.listings[1::2], reverse=True)),
+        ):
+            with self.subTest(**params):
+                pages, previous = self.walk(reverse('api:listing-list-create'), params)
+                self.assertEqual([pk for page in pages for pk in page], expected)
+                self.assertEqual([len(page) for page in pages], [2, 2, 2, 1])
+
+                backwards = []
+                while previous:
+                    body = self.buyer_client.get(previous).json()
+                    backwards.insert(0, [row['id'] for row in body['results']])
+                    previous = body['previous']
+                self.assertEqual(backwards, pages[:-1])
+
+    def test_a_malformed_cursor_is_not_found(self):
+        response = self.buyer_client.get(reverse('api:listing-list-create'), {'cursor': 'cD1ub3QtYS1kYXRlJmk9MQ=='})
+        self.assertEqual(response.status_code, 404)
+
+
+class AsyncViewTests(MarketplaceTestCase):
+    """
+    The async endpoints answer exactly what their sync counterparts do, errors included.
+    """
+    def setUp(self):
+        super().setUp()
+        self.credit = self.make_lot()
+        self.listing = self.list_lot(self.make_lot(quantity=4), '2.50')
+        self.pending = Project.objects.create(
+            owner=self.seller, name='Savanna', description='Grassland restoration', location='Tanzania', tonnage=30,
+        )
+        self.verifier_client = client_for(self.verifier)
+        self.anonymous_client = APIClient()
+        cache.clear()
+
+    def assertSameResponse(self, client, sync_name, async_name, args=(), status_code=200, sync_status_code=None):
+        sync, async_ = client.get(reverse(sync_name, args=args)), client.get(reverse(async_name, args=args))
+        self.assertEqual(
+            (sync.status_code, async_.status_code), (sync_status_code or status_code, status_code), async_.content
+        )
+        self.assertEqual(async_.json(), sync.json())
+        return async_
+
+    def test_bodies_match_the_sync_views(self):
+        for client, sync_name, async_name, args in (
+            (self.anonymous_client, 'api:listing-list-create', 'api:async-listing-list', ()),
+            (self.seller_client, 'api:user-nft-list', 'api:async-user-nft-list', ()),
+            (self.verifier_client, 'api:verifier-dashboard-list', 'api:async-verifier-dashboard-list', ()),
+            (self.buyer_client, 'api:project-detail', 'api:async-project-detail', (self.project.pk,)),
+            (self.buyer_client, 'api:nft-detail', 'api:async-nft-detail', (self.credit.pk,)),
+        ):
+            with self.subTest(async_name):
+                response = self.assertSameResponse(client, sync_name, async_name, args)
+                self.assertTrue(response.json())
+
+    def test_unauthenticated_requests_get_401(self):
+        # The sync views also accept sessions, so DRF answers them with 403 instead.
+        for sync_name, async_name, args in (
+            ('api:user-nft-list', 'api:async-user-nft-list', ()),
+            ('api:project-detail', 'api:async-project-detail', (self.project.pk,)),
+            ('api:verifier-dashboard-list', 'api:async-verifier-dashboard-list', ()),
+        ):
+            with self.subTest(async_name):
+                response = self.assertSameResponse(self.anonymous_client, sync_name, async_name, args, 401, 403)
+                self.assertEqual(response['WWW-Authenticate'], 'Bearer realm="api"')
+
+    def test_errors_match_the_sync_views(self):
+        for client, sync_name, async_name, args, status_code in (
+            (self.buyer_client, 'api:verifier-dashboard-list', 'api:async-verifier-dashboard-list', (), 403),
+            (self.buyer_client, 'api:project-detail', 'api:async-project-detail', (0,), 404),
+            (self.buyer_client, 'api:nft-detail', 'api:async-nft-detail', (0,), 404),
+        ):
+            with self.subTest(async_name, status_code=status_code):
+                self.assertSameResponse(client, sync_name, async_name, args, status_code)
+
+    def test_a_bad_token_is_unauthorized(self):
+        client = APIClient()
+        client.credentials(HTTP_AUTHORIZATION='Bearer not-a-token')
+        response = client.get(reverse('api:async-user-nft-list'))
+        self.assertEqual(response.status_code, 401)
+        self.assertIn('WWW-Authenticate', response)
+
+
+class ListQueryCountTests(MarketplaceTestCase):
+    """
+    Every list endpoint runs the same number of queries however many rows its page holds,
+    so an N+1 in a serializer shows up here as a changed count.
+    """
+    rows = 6
+
+    def setUp(self):
+        super().setUp()
+        cache.clear()
+        lots = [self.make_lot() for _ in range(self.rows)] + [self.make_lot(owner=self.buyer) for _ in range(self.rows)]
+        for credit in lots[:self.rows]:
+            self.list_lot(credit, '2.00')
+            self.buy(Listing.objects.get(credit=credit, is_active=True), 1)
+        for i in range(2 * self.rows):
+            Project.objects.create(
+                owner=self.seller, verifier=None if i % 2 else self.verifier, name=f'Mangroves {i}',
+                description='Coastal restoration', location='Kenya', tonnage=100, vintage=2022,
+                status=Project.ProjectStatus.PENDING if i % 2 else Project.ProjectStatus.APPROVED,
+            )
+        for i in range(self.rows):
+            Settlement.objects.create(seller=self.seller, idempotency_key=f'payout-{i}')
+            Order.objects.create(
+                owner=self.buyer, project=self.project, side=Order.Side.BID, price='2.00', quantity=1, remaining=1,
+            )
+        self.verifier_client = client_for(self.verifier)
+        cache.clear()
+
+    def assertListQueries(self, client, name, queries, **params):
+        for page_size in (2, self.rows):
+            with self.subTest(page_size=page_size), self.assertNumQueries(queries):
+                response = client.get(reverse(name), {**params, 'page_size': page_size})
+            self.assertEqual(response.status_code, 200, response.content)
+            self.assertEqual(len(response.json()['results']), page_size)
+
+    def test_listings(self):
+        self.assertListQueries(self.buyer_client, 'api:listing-list-create', 1)
+        self.assertListQueries(self.buyer_client, 'api:async-listing-list', 1)
+        self.assertListQueries(self.seller_client, 'api:my-listings', 1)
+        self.assertListQueries(self.buyer_client, 'api:listing-search', 3, q='mangroves')
+
+    def test_projects(self):
+        self.assertListQueries(self.buyer_client, 'api:project-list-create', 1)
+        self.assertListQueries(self.seller_client, 'api:my-project-list', 1)
+        self.assertListQueries(self.verifier_client, 'api:pending-project-list', 1)
+        self.assertListQueries(self.verifier_client, 'api:verifier-dashboard-list', 1)
+        self.assertListQueries(self.verifier_client, 'api:async-verifier-dashboard-list', 1)
+        self.assertListQueries(self.buyer_client, 'api:project-search', 2, q='mangroves')
+
+    def test_credits_orders_and_settlements(self):
+        self.assertListQueries(self.buyer_client, 'api:user-nft-list', 1)
+        self.assertListQueries(self.buyer_client, 'api:async-user-nft-list', 1)
+        self.assertListQueries(self.buyer_client, 'api:order-list-create', 1)
+        self.assertListQueries(self.seller_client, 'api:settlement-list-create', 2)
+
+
+class ListingFeedCacheTests(MarketplaceTestCase):
+    """
+    Every write path that changes the public feed invalidates the cached pages, once its
+    transaction commits.
+    """
+    def setUp(self):
+        super().setUp()
+        cache.clear()
+        self.credit = self.make_lot()
+        self.spare = self.make_lot(quantity=5)
+        with self.captureOnCommitCallbacks(execute=True):
+            self.listing = self.list_lot(self.credit, '2.00')
+
+    def feed(self):
+        response = self.buyer_client.get(reverse('api:listing-list-create'))
+        self.assertEqual(response.status_code, 200, response.content)
+        return [(row['id'], row['credit']['quantity'], row['credit']['project']['status']) for row in response.json()['results']]
+
+    def test_listing_refreshes_the_feed(self):
+        self.feed()
+        with self.captureOnCommitCallbacks(execute=True):
+            spare = self.list_lot(self.spare, '3.00')
+        self.assertEqual([row[0] for row in self.feed()], [spare.pk, self.listing.pk])
+
+    def test_purchase_refreshes_the_feed(self):
+        self.assertEqual(self.feed(), [(self.listing.pk, 10, 'APPROVED')])
+        with self.captureOnCommitCallbacks(execute=True):
+            self.assertEqual(self.buy(self.listing, 4).status_code, 200)
+        self.assertEqual(self.feed(), [(self.listing.pk, 6, 'APPROVED')])
+        with self.captureOnCommitCallbacks(execute=True):
+            self.assertEqual(self.buy(self.listing).status_code, 200)
+        self.assertEqual(self.feed(), [])
+
+    def test_withdrawal_refreshes_the_feed(self):
+        self.feed()
+        with self.captureOnCommitCallbacks(execute=True):
+            response = self.seller_client.post(reverse('api:withdraw-credit', args=[self.listing.pk]))
+        self.assertEqual(response.status_code, 200, response.content)
+        self.assertEqual(self.feed(), [])
+
+    def test_project_review_refreshes_the_feed(self):
+        self.feed()
+        with self.captureOnCommitCallbacks(execute=True):
+            response = client_for(self.verifier).patch(
+                reverse('api:project-review', args=[self.project.pk]), {'status': 'REJECTED'}, format='json'
+            )
+        self.assertEqual(response.status_code, 200, response.content)
+        self.assertEqual(self.feed(), [(self.listing.pk, 10, 'REJECTED')])
+
+    def test_stats_count_hits_and_misses_for_admins(self):
+        self.feed()
+        self.feed()
+        admin = make_user('admin', UserProfile.Role.BUYER)
+        admin.is_staff = True
+        admin.save(update_fields=['is_staff'])
+        url = reverse('api:listing-feed-cache-stats')
+
+        self.assertEqual(self.seller_client.get(url).status_code, 403)
+        stats = client_for(admin).get(url).json()
+        self.assertEqual((stats['hits'], stats['misses'], stats['hit_ratio']), (1, 1, 0.5))
+
+
+@override_settings(PRICE_PROVIDER='api.prices.StubPriceProvider', PRICE_STUB_RATE='0.05')
+class ExchangeRateTests(MarketplaceTestCase):
+    def setUp(self):
+        super().setUp()
+        cache.clear()
+        rate_cache.clear()
+        self.addCleanup(rate_cache.clear)
+
+    def rate(self, expected_status=200):
+        response = self.buyer_client.get(reverse('api:price-hbar-usd'))
+        self.assertEqual(response.status_code, expected_status, response.content)
+        return response.json()
+
+    def prices_usd(self, name):
+        response = self.buyer_client.get(reverse(name))
+        self.assertEqual(response.status_code, 200, response.content)
+        return [row['price_usd'] for row in response.json()['results']]
+
+    def test_no_rate_before_the_first_refresh(self):
+        self.assertIn('error', self.rate(503))
+        self.list_lot(self.make_lot(), '2.00')
+        self.assertEqual(self.prices_usd('api:listing-list-create'), [None])
+
+    def test_refresh_stores_the_stub_rate(self):
+        refresh_rate()
+        stored = ExchangeRate.objects.get(pair=HBAR_USD)
+        self.assertEqual((stored.rate, stored.source), (Decimal('0.05'), 'stub'))
+        data = self.rate()
+        self.assertEqual((data['pair'], data['rate'], data['source'], data['stale']), (HBAR_USD, '0.0500000000', 'stub', False))
+
+    def test_rate_is_stale_after_missed_refreshes(self):
+        refresh_rate()
+        ExchangeRate.objects.update(fetched_at=timezone.now() - timedelta(seconds=3 * settings.PRICE_REFRESH_INTERVAL + 1))
+        rate_cache.clear()
+        self.assertTrue(self.rate()['stale'])
+
+    def test_cached_feed_shows_the_current_rate(self):
+        refresh_rate()
+        self.list_lot(self.make_lot(), '2.00')
+        for name in ('api:listing-list-create', 'api:async-listing-list'):
+            with self.subTest(name=name):
+                self.assertEqual(self.prices_usd(name), ['0.10'])
+
+        with override_settings(PRICE_STUB_RATE='0.10'):
+            refresh_rate()
+        for name in ('api:listing-list-create', 'api:async-listing-list'):
+            with self.subTest(name=name):
+                self.assertEqual(self.prices_usd(name), ['0.20'])
+        self.assertEqual(listing_feed_cache.stats()['misses'], 2)
+
+
+class IpfsTests(MarketplaceTestCase):
+    data = b'{"name": "Mangroves"}' + bytes(range(256)) * 4
+
+    def setUp(self):
+        super().setUp()
+        cache_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(cache_dir.cleanup)
+        self.blocks = {}
+        server = ThreadingHTTPServer(('127.0.0.1', 0), type('Handler', (GatewayHandler,), {'blocks': self.blocks}))
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        self.addCleanup(server.server_close)
+        self.addCleanup(server.shutdown)
+        settings_override = override_settings(
+            IPFS_CACHE_DIR=cache_dir.name, IPFS_GATEWAY_URL=f'http://127.0.0.1:{server.server_port}',
+        )
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+        content_store._size = None
+
+    def add_file(self, data=None, version=1, chunk_size=100):
+        cid, blocks = build_file(self.data if data is None else data, chunk_size, version)
+        self.blocks.update(blocks)
+        return cid
+
+    def get(self, cid, **headers):
+        return APIClient().get(reverse('api:ipfs-content', args=[cid]), headers=headers)
+
+    def test_parses_v0_and_v1_cids(self):
+        block = b'block'
+        digest = hashlib.sha256(block).digest()
+        self.assertEqual(parse_cid(make_cid(DAG_PB, block, version=0)), (DAG_PB, digest))
+        self.assertEqual(parse_cid(make_cid(RAW, block)), (RAW, digest))
+        for cid in ('Qm-not-a-cid', 'z' + 'a' * 50, make_cid(0x71, block), make_cid(RAW, block)[:-4]):
+            with self.subTest(cid=cid), self.assertRaises(InvalidCID):
+                parse_cid(cid)
+
+    def test_walks_the_dag_and_verifies_every_block(self):
+        for version in (0, 1):
+            with self.subTest(version=version):
+                cid = self.add_file(version=version)
+                self.assertGreater(len(self.blocks), 2)
+                self.assertEqual(b''.join(IpfsGateway().content(cid)), self.data)
+
+    def test_a_block_not_matching_its_cid_is_rejected(self):
+        cid = self.add_file()
+        leaf = next(link for link in self.blocks if link != cid)
+        self.blocks[leaf] = self.blocks[leaf][:-1] + b'x'
+        with self.assertRaises(ContentUnavailable):
+            b''.join(IpfsGateway().content(cid))
+
+    def test_serves_a_project_file_and_caches_it(self):
+        cid = self.add_file()
+        Project.objects.filter(pk=self.project.pk).update(metadata_cid=cid)
+
+        response = self.get(cid)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(b''.join(response.streaming_content), self.data)
+        self.assertEqual((response['Content-Type'], response['ETag']), ('application/json', f'"{cid}"'))
+        self.assertIn('immutable', response['Cache-Control'])
+
+        self.blocks.clear()
+        content = content_store.open(cid)
+        self.addCleanup(content.close)
+        self.assertIsInstance(content, mmap.mmap)
+        self.assertEqual(b''.join(self.get(cid).streaming_content), self.data)
+        self.assertEqual(self.get(cid, if_none_match=f'"{cid}"').status_code, 304)
+
+    def test_corrupt_gateway_content_answers_502(self):
+        cid = self.add_file()
+        # As served by `fake_ipfs_gateway --corrupt`.
+        self.blocks.update({link: block[:-1] + bytes([block[-1] ^ 1]) for link, block in self.blocks.items()})
+        Project.objects.filter(pk=self.project.pk).update(image_cid=cid)
+
+        self.assertEqual(self.get(cid).status_code, 502)
+        self.assertIsNone(content_store.open(cid))
+
+    def test_only_project_content_is_fetched(self):
+        self.assertEqual(self.get(self.add_file()).status_code, 404)
+        self.assertEqual(self.get('not-a-cid').status_code, 404)
+
+    def test_evicts_the_least_recently_read_files(self):
+        store = ContentStore(root=settings.IPFS_CACHE_DIR, max_bytes=250)
+        cids = [make_cid(RAW, bytes([n]) * 100) for n in range(3)]
+        for n, age in ((0, 30), (1, 10)):
+            store.put(cids[n], [bytes([n]) * 100])
+            os.utime(store.path(cids[n]), (time.time() - age, time.time() - age))
+
+        store.put(cids[2], [bytes([2]) * 100])
+        self.assertEqual([os.path.exists(store.path(cid)) for cid in cids], [False, True, True])
+
+
+class ExportTests(MarketplaceTestCase):
+    def setUp(self):
+        super().setUp()
+        self.verifier_client = client_for(self.verifier)
+        self.listing = self.list_lot(self.make_lot(), '2.00')
+        self.buy(self.listing, 4)
+
+    def export(self, name, since=None):
+        response = self.verifier_client.get(reverse('api:export', args=name.split('.')), {'since': since} if since else {})
+        self.assertEqual(response.status_code, 200)
+        body = b''.join(response.streaming_content).decode()
+        if name.endswith('.csv'):
+            rows = list(csv.DictReader(io.StringIO(body)))
+        else:
+            rows = [json.loads(line) for line in body.splitlines()]
+        return rows, response['X-Export-Until']
+
+    def fill(self):
+        lot = self.make_lot()
+        self.seller_client.post(
+            reverse('api:order-list-create'), {'side': 'ASK', 'price': '3.00', 'quantity': 2, 'credit': lot.pk}, format='json'
+        )
+        self.buyer_client.post(
+            reverse('api:order-list-create'), {'side': 'BID', 'price': '3.00', 'quantity': 2, 'project': self.project.pk},
+            format='json',
+        )
+        Matcher().load()
+        Matcher().process()
+        return Trade.objects.latest('pk')
+
+    def test_trades_and_fills_in_both_formats(self):
+        trade = self.fill()
+        for export_format in ('csv', 'ndjson'):
+            with self.subTest(export_format=export_format):
+                rows, _ = self.export(f'trades.{export_format}')
+                self.assertEqual(
+                    [(str(row['listing_id']), str(row['quantity_sold']), row['price']) for row in rows],
+                    [(str(self.listing.pk), '4', '2.00')],
+                )
+                rows, _ = self.export(f'fills.{export_format}')
+                self.assertEqual(
+                    [(str(row['trade_id']), str(row['buyer_id']), str(row['quantity']), row['price']) for row in rows],
+                    [(str(trade.pk), str(self.buyer.pk), '2', '3.00')],
+                )
+
+    def test_incremental_exports_resume_from_the_previous_until(self):
+        _, until = self.export('trades.csv')
+        self.assertEqual(self.export('trades.ndjson', since=until)[0], [])
+        self.assertEqual(self.export('fills.ndjson', since=until)[0], [])
+
+        trade = self.fill()
+        rows, fills_until = self.export('fills.ndjson', since=until)
+        self.assertEqual([(row['trade_id'], row['claimed']) for row in rows], [(trade.pk, False)])
+
+        self.assertEqual(self.seller_client.post(reverse('api:settlement-list-create')).status_code, 201)
+        rows, _ = self.export('fills.csv', since=fills_until)
+        self.assertEqual([(row['trade_id'], row['claimed']) for row in rows], [(str(trade.pk), 'True')])
+        rows, _ = self.export('trades.ndjson', since=until)
+        self.assertEqual([(row['listing_id'], row['quantity_claimed']) for row in rows], [(self.listing.pk, 4)])
+
+    def test_since_must_be_a_timestamp(self):
+        response = self.verifier_client.get(reverse('api:export', args=['fills', 'csv']), {'since': 'yesterday'})
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(self.buyer_client.get(reverse('api:export', args=['fills', 'csv'])).status_code, 403)
@@ -12,20 +12,57 @@ from .views import (
     NFTDetailView,
     BuyCreditAPIView,
     ClaimProceedsAPIView,
+    SettlementListCreateAPIView,
     WithdrawCreditAPIView,
+    ListingFeedCacheStatsAPIView,
+    ProjectSearchAPIView,
+    ListingSearchAPIView,
+    ProjectBulkMintAPIView,
+    BulkListingCreateAPIView,
+    BulkWithdrawAPIView,
+    ExchangeRateAPIView,
+    PortfolioSummaryAPIView,
+    OrderListCreateAPIView,
+    OrderCancelAPIView,
+    OrderBookAPIView,
+    IpfsContentAPIView,
+    ExportAPIView,
+    MarketAnalyticsAPIView,
+)
+from .async_views import (
+    AsyncListingListAPIView,
+    AsyncProjectDetailAPIView,
+    AsyncNFTDetailView,
+    AsyncUserNFTListView,
+    AsyncVerifierDashboardListAPIView,
+    MarketplaceStreamView,
 )
 
 app_name = 'api'
 
 urlpatterns = [
     path('projects/', ProjectListCreateAPIView.as_view(), name='project-list-create'),
+    path('projects/search/', ProjectSearchAPIView.as_view(), name='project-search'),
     path('projects/my-projects/', MyProjectListAPIView.as_view(), name='my-project-list'),
     path('projects/pending-review/', PendingProjectListAPIView.as_view(), name='pending-project-list'),
     path('projects/verifier-dashboard/', VerifierDashboardListAPIView.as_view(), name='verifier-dashboard-list'),
     path('projects/<int:pk>/', ProjectDetailAPIView.as_view(), name='project-detail'),
     path('projects/<int:pk>/review/', ProjectReviewAPIView.as_view(), name='project-review'),
+    path('projects/<int:pk>/mint/', ProjectBulkMintAPIView.as_view(), name='project-bulk-mint'),
     path('listings/', ListingListCreateAPIView.as_view(), name='listing-list-create'),
+    path('listings/bulk/', BulkListingCreateAPIView.as_view(), name='listing-bulk-create'),
+    path('listings/bulk-withdraw/', BulkWithdrawAPIView.as_view(), name='listing-bulk-withdraw'),
+    path('listings/search/', ListingSearchAPIView.as_view(), name='listing-search'),
     path('listings/my-listings/', MyListingsAPIView.as_view(), name='my-listings'),
+    path('listings/cache-stats/', ListingFeedCacheStatsAPIView.as_view(), name='listing-feed-cache-stats'),
+    path('prices/hbar-usd/', ExchangeRateAPIView.as_view(), name='price-hbar-usd'),
+    path('ipfs/<str:cid>/', IpfsContentAPIView.as_view(), name='ipfs-content'),
+    path('exports/<slug:dataset>.<slug:export_format>', ExportAPIView.as_view(), name='export'),
+    path('analytics/<slug:dimension>/', MarketAnalyticsAPIView.as_view(), name='market-analytics'),
+    path('portfolio/summary/', PortfolioSummaryAPIView.as_view(), name='portfolio-summary'),
+    path('orders/', OrderListCreateAPIView.as_view(), name='order-list-create'),
+    path('orders/<int:pk>/cancel/', OrderCancelAPIView.as_view(), name='order-cancel'),
+    path('orderbook/<int:project_id>/', OrderBookAPIView.as_view(), name='order-book'),
 
     # NFT Management
     path('nfts/my-nfts/', UserNFTListView.as_view(), name='user-nft-list'),
@@ -34,5 +71,14 @@ urlpatterns = [
     # Marketplace Interactions
     path('listings/<int:pk>/buy/', BuyCreditAPIView.as_view(), name='buy-credit'),
     path('listings/<int:pk>/claim/', ClaimProceedsAPIView.as_view(), name='claim-proceeds'),
+    path('settlements/', SettlementListCreateAPIView.as_view(), name='settlement-list-create'),
     path('listings/<int:pk>/withdraw/', WithdrawCreditAPIView.as_view(), name='withdraw-credit'),
+
+    # Async (ASGI) read endpoints, same responses as their sync counterparts above
+    path('async/listings/', AsyncListingListAPIView.as_view(), name='async-listing-list'),
+    path('async/projects/verifier-dashboard/', AsyncVerifierDashboardListAPIView.as_view(), name='async-verifier-dashboard-list'),
+    path('async/projects/<int:pk>/', AsyncProjectDetailAPIView.as_view(), name='async-project-detail'),
+    path('async/nfts/my-nfts/', AsyncUserNFTListView.as_view(), name='async-user-nft-list'),
+    path('async/nfts/<int:pk>/', AsyncNFTDetailView.as_view(), name='async-nft-detail'),
+    path('stream/marketplace/', MarketplaceStreamView.as_view(), name='marketplace-stream'),
 ]
\ No newline at end of file
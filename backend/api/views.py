@@ -1,10 +1,87 @@
+import uuid
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Q
+from django.http import Http404, HttpResponseNotModified, StreamingHttpResponse
 from django.shortcuts import get_object_or_404
+from django.utils import timezone
+from django.utils.cache import patch_cache_control
 from rest_framework import status
 from rest_framework.response import Response
 from rest_framework import generics, permissions
-from .models import CarbonCredit, Project, Listing
-from .serializers import  ProjectSerializer, ProjectVerificationSerializer,   CarbonCreditSerializer, ListingCreateSerializer, ListingSerializer
+from rest_framework.authentication import SessionAuthentication
+from rest_framework.exceptions import PermissionDenied, ValidationError
+from rest_framework.views import APIView
+from .models import CarbonCredit, Project, Listing, Order, PortfolioSummary, Settlement
+from .serializers import (
+    ProjectSerializer, ProjectVerificationSerializer, CarbonCreditSerializer, ListingCreateSerializer, ListingSerializer,
+    PurchaseSerializer, BulkMintSerializer, BulkListingCreateSerializer, BulkWithdrawSerializer,
+    AnalyticsQuerySerializer, MarketAnalyticsSerializer, PortfolioSummarySerializer, OrderSerializer, OrderCreateSerializer,
+    BookDepthSerializer, SettlementSerializer,
+)
 from .permissions import IsSellerUser, IsVerifierUser, IsBuyerUser
+from .marketplace import (
+    ListingUnavailable, LotUnavailable, TonnageExceeded, bulk_list_credits, bulk_withdraw_listings, cancel_order, mint_serials, place_order,
+    purchase_listing, withdraw_listing,
+)
+from .cache import listing_feed_cache
+from .outbox import enqueue
+from .prices import HBAR_USD, is_stale, rate_cache, set_price_usd
+from .ipfs import ContentUnavailable, InvalidCID, content_store, content_type, parse_cid
+from .exports import EXPORTS, FORMATS, parse_since, stream_export
+from .analytics import DIMENSIONS, summarize
+from .portfolio import adjust, project_status_moved, rebuild
+from .matching import book_depth
+from .settlement import settle
+from .filters import ListingFilterBackend
+from .pagination import SearchPagination
+from .search import ranked_listing_ids, ranked_project_ids
+from users.authentication import ReadOnlyClaimsJWTAuthentication
+from users.models import UserProfile
+from users.roles import get_role
+
+
+class EagerLoadingViewMixin:
+    """
+    Applies the serializer's eager-loading plan to the view's queryset so list and
+    detail endpoints run a constant number of queries regardless of page size.
+    """
+    def filter_queryset(self, queryset):
+        queryset = super().filter_queryset(queryset)
+        setup_eager_loading = getattr(self.get_serializer_class(), 'setup_eager_loading', None)
+        if setup_eager_loading is not None:
+            queryset = setup_eager_loading(queryset)
+        return queryset
+
+
+class ClaimsAuthenticationMixin:
+    """
+    Authenticates read requests from the JWT claims alone, without loading the User row.
+    Views using it must need no more of `request.user` on GET than its id and role.
+    """
+    authentication_classes = [SessionAuthentication, ReadOnlyClaimsJWTAuthentication]
+
+
+class RankedSearchMixin:
+    """
+    Lists search results for `?q=` in relevance order: the ranked id list is paged first,
+    then only the rows of the requested page are loaded.
+    """
+    pagination_class = SearchPagination
+
+    def get_ranked_ids(self, query):
+        raise NotImplementedError
+
+    def list(self, request, *args, **kwargs):
+        query = request.query_params.get('q', '').strip()
+        if not query:
+            raise ValidationError({'q': 'This query parameter is required.'})
+        page = self.paginate_queryset(self.get_ranked_ids(query))
+        objects = self.filter_queryset(self.get_queryset()).in_bulk(page)
+        serializer = self.get_serializer([objects[pk] for pk in page if pk in objects], many=True)
+        return self.get_paginated_response(serializer.data)
+
 
 # PROJECT AND LISTING VIEWS
 
@@ -18,7 +95,19 @@ class ProjectReviewAPIView(generics.UpdateAPIView):
     permission_classes = [permissions.IsAuthenticated, IsVerifierUser]
 
     def perform_update(self, serializer):
+        previous = serializer.instance.status
         serializer.save(verifier=self.request.user)
+        project = serializer.instance
+        project_status_moved(project.owner_id, previous, project.status)
+        if project.status != previous and project.status != Project.ProjectStatus.PENDING:
+            enqueue(
+                f'project.{project.status.lower()}',
+                {'project_id': project.pk, 'owner_id': project.owner_id, 'verifier_id': self.request.user.pk},
+            )
+        # Listings embed their project, so a re-review of a project on sale changes the feed.
+        if Listing.objects.filter(credit__project=serializer.instance, is_active=True).exists():
+            listing_feed_cache.invalidate_on_commit()
+
     def update(self, request, *args, **kwargs):
         partial = kwargs.pop('partial', False)
         instance = self.get_object()
@@ -31,25 +120,72 @@ class ProjectReviewAPIView(generics.UpdateAPIView):
             token_address = serializer.validated_data.get('token_address')
 
             if not serial_number or not token_address:
-                raise serializers.ValidationError({"error": "Serial number and token address are required for approved projects."}, code=status.HTTP_400_BAD_REQUEST)
-
-            self.perform_update(serializer)
-
-            # Create a single CarbonCredit for the entire project's tonnage
-            CarbonCredit.objects.create(
-                project=instance,
-                owner=instance.owner, # Initially owned by the project owner
-                hedera_token_id=token_address,
-                serial_number=serial_number,
-                status=CarbonCredit.CreditStatus.MINTED
-            )
+                raise ValidationError({"error": "Serial number and token address are required for approved projects."}, code=status.HTTP_400_BAD_REQUEST)
+
+            with transaction.atomic():
+                self.perform_update(serializer)
+
+                # A project approved again after a rejection keeps the credits it was issued.
+                if CarbonCredit.objects.filter(project=instance).exists():
+                    return Response(serializer.data)
+
+                # Create a single CarbonCredit lot holding the entire project's tonnage;
+                # sellers split it into smaller lots when listing part of it.
+                credit = CarbonCredit.objects.create(
+                    project=instance,
+                    owner=instance.owner, # Initially owned by the project owner
+                    hedera_token_id=token_address,
+                    serial_number=serial_number,
+                    quantity=max(instance.tonnage, 1),
+                    status=CarbonCredit.CreditStatus.MINTED
+                )
+                adjust(credit.owner_id, credits_owned=1, tonnes_owned=credit.quantity, tonnes_available=credit.quantity)
         else:
-            self.perform_update(serializer)
+            with transaction.atomic():
+                self.perform_update(serializer)
 
         return Response(serializer.data)
 
 
-class ProjectDetailAPIView(generics.RetrieveAPIView):
+class ProjectBulkMintAPIView(generics.GenericAPIView):
+    """
+    API endpoint for a Verifier to approve a project and register its minted NFT serials
+    (one credit per tonne) in one call, from a list of inclusive serial ranges.
+    Serials already registered for the token are skipped.
+    """
+    queryset = Project.objects.all()
+    serializer_class = BulkMintSerializer
+    permission_classes = [permissions.IsAuthenticated, IsVerifierUser]
+
+    def post(self, request, *args, **kwargs):
+        project = self.get_object()
+        serializer = self.get_serializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+
+        if project.status == Project.ProjectStatus.REJECTED:
+            return Response({"error": "Credits cannot be minted for a rejected project."}, status=status.HTTP_400_BAD_REQUEST)
+
+        try:
+            result = mint_serials(
+                project, request.user, serializer.validated_data['token_address'],
+                [(r['start'], r['end']) for r in serializer.validated_data['serial_ranges']],
+            )
+        except TonnageExceeded:
+            return Response(
+                {"error": "These serials would issue more credits than the project's tonnage."},
+                status=status.HTTP_400_BAD_REQUEST,
+            )
+        elapsed = result['elapsed_seconds']
+        return Response({
+            'requested': result['requested'],
+            'created': result['created'],
+            'skipped': result['requested'] - result['created'],
+            'elapsed_seconds': round(elapsed, 3),
+            'credits_per_second': round(result['created'] / elapsed) if elapsed else None,
+        }, status=status.HTTP_201_CREATED)
+
+
+class ProjectDetailAPIView(ClaimsAuthenticationMixin, EagerLoadingViewMixin, generics.RetrieveAPIView):
     """
     API endpoint to retrieve a project's details.
     """
@@ -58,7 +194,7 @@ class ProjectDetailAPIView(generics.RetrieveAPIView):
     permission_classes = [permissions.IsAuthenticated]
 
 
-class MyProjectListAPIView(generics.ListAPIView):
+class MyProjectListAPIView(ClaimsAuthenticationMixin, EagerLoadingViewMixin, generics.ListAPIView):
     """
     API endpoint for a Seller to list all of their own projects.
     """
@@ -66,10 +202,10 @@ class MyProjectListAPIView(generics.ListAPIView):
     permission_classes = [permissions.IsAuthenticated, IsSellerUser]
 
     def get_queryset(self):
-        return Project.objects.filter(owner=self.request.user)
+        return Project.objects.filter(owner_id=self.request.user.id)
 
 
-class PendingProjectListAPIView(generics.ListAPIView):
+class PendingProjectListAPIView(ClaimsAuthenticationMixin, EagerLoadingViewMixin, generics.ListAPIView):
     """
     API endpoint for a Verifier to list all projects pending review.
     """
@@ -80,7 +216,7 @@ class PendingProjectListAPIView(generics.ListAPIView):
         return Project.objects.filter(status=Project.ProjectStatus.PENDING)
 
 
-class VerifierDashboardListAPIView(generics.ListAPIView):
+class VerifierDashboardListAPIView(ClaimsAuthenticationMixin, EagerLoadingViewMixin, generics.ListAPIView):
     """
     API endpoint for a Verifier to list all projects for their dashboard:
     - All projects pending review.
@@ -93,12 +229,25 @@ class VerifierDashboardListAPIView(generics.ListAPIView):
         from django.db.models import Q
         user = self.request.user
         queryset = Project.objects.filter(
-            Q(status=Project.ProjectStatus.PENDING) | Q(verifier=user)
+            Q(status=Project.ProjectStatus.PENDING) | Q(verifier_id=user.id)
         ).distinct()
         return queryset
 
 
-class ProjectListCreateAPIView(generics.ListCreateAPIView):
+class ProjectSearchAPIView(ClaimsAuthenticationMixin, RankedSearchMixin, EagerLoadingViewMixin, generics.ListAPIView):
+    """
+    API endpoint for full-text search over approved projects (name, description, location).
+    Every word in `q` must match, as a prefix.
+    """
+    queryset = Project.objects.all()
+    serializer_class = ProjectSerializer
+    permission_classes = [permissions.IsAuthenticated]
+
+    def get_ranked_ids(self, query):
+        return ranked_project_ids(query)
+
+
+class ProjectListCreateAPIView(ClaimsAuthenticationMixin, EagerLoadingViewMixin, generics.ListCreateAPIView):
     """
     API endpoint to list approved projects or create a new project.
     List: Anyone authenticated can see approved projects.
@@ -117,17 +266,25 @@ class ProjectListCreateAPIView(generics.ListCreateAPIView):
 
     def perform_create(self, serializer):
         # The serializer's create method will handle assigning the owner
-        serializer.save()
+        with transaction.atomic():
+            project = serializer.save()
+            adjust(project.owner_id, projects_pending=1)
+            enqueue(
+                'project.created', {'project_id': project.pk, 'owner_id': project.owner_id},
+                key=f'project.created:{project.pk}',
+            )
 
 
 
-class ListingListCreateAPIView(generics.ListCreateAPIView):
+class ListingListCreateAPIView(ClaimsAuthenticationMixin, EagerLoadingViewMixin, generics.ListCreateAPIView):
     """
     API endpoint to list active credits for sale or create a new listing.
-    List (GET): Any user can see active listings.
+    List (GET): Any user can see active listings, filtered and sorted server-side
+    (see ListingFilterBackend for the supported query parameters).
     Create (POST): Only an authenticated seller can create a new listing.
     """
     queryset = Listing.objects.filter(is_active=True)
+    filter_backends = [ListingFilterBackend]
     
     def get_serializer_class(self):
         if self.request.method == 'POST':
@@ -139,6 +296,16 @@ class ListingListCreateAPIView(generics.ListCreateAPIView):
             return [permissions.IsAuthenticated(), IsSellerUser()]
         return [permissions.AllowAny()]
 
+    def list(self, request, *args, **kwargs):
+        # The feed is identical for every caller, so pages are cached by URL alone.
+        data = listing_feed_cache.get(request)
+        if data is None:
+            data = super().list(request, *args, **kwargs).data
+            listing_feed_cache.set(request, data)
+        if settings.LISTING_PRICE_USD:
+            set_price_usd(data['results'], rate_cache.get(HBAR_USD))
+        return Response(data)
+
     def create(self, request, *args, **kwargs):
         serializer = self.get_serializer(data=request.data)
         serializer.is_valid(raise_exception=True)
@@ -149,7 +316,19 @@ class ListingListCreateAPIView(generics.ListCreateAPIView):
         return Response(response_serializer.data, status=status.HTTP_201_CREATED, headers=headers)
 
 
-class MyListingsAPIView(generics.ListAPIView):
+class ListingSearchAPIView(ClaimsAuthenticationMixin, RankedSearchMixin, EagerLoadingViewMixin, generics.ListAPIView):
+    """
+    API endpoint for full-text search over active listings, matched on their project.
+    """
+    queryset = Listing.objects.filter(is_active=True)
+    serializer_class = ListingSerializer
+    permission_classes = [permissions.AllowAny]
+
+    def get_ranked_ids(self, query):
+        return ranked_listing_ids(query)
+
+
+class MyListingsAPIView(ClaimsAuthenticationMixin, EagerLoadingViewMixin, generics.ListAPIView):
     """
     API endpoint for a Seller to list all of their own listings (active and inactive).
     """
@@ -157,12 +336,12 @@ class MyListingsAPIView(generics.ListAPIView):
     permission_classes = [permissions.IsAuthenticated, IsSellerUser]
 
     def get_queryset(self):
-        return Listing.objects.filter(seller=self.request.user).order_by('-created_at')
+        return Listing.objects.filter(seller_id=self.request.user.id).order_by('-created_at')
 
 
 
 
-class UserNFTListView(generics.ListAPIView):
+class UserNFTListView(ClaimsAuthenticationMixin, EagerLoadingViewMixin, generics.ListAPIView):
     """
     API endpoint for a user to list all of their own CarbonCredit tokens.
     """
@@ -170,10 +349,10 @@ class UserNFTListView(generics.ListAPIView):
     permission_classes = [permissions.IsAuthenticated]
 
     def get_queryset(self):
-        return CarbonCredit.objects.filter(owner=self.request.user)
+        return CarbonCredit.objects.filter(owner_id=self.request.user.id)
 
 
-class NFTDetailView(generics.RetrieveAPIView):
+class NFTDetailView(ClaimsAuthenticationMixin, EagerLoadingViewMixin, generics.RetrieveAPIView):
     """
     API endpoint to retrieve the details of a specific CarbonCredit token.
     """
@@ -184,49 +363,74 @@ class NFTDetailView(generics.RetrieveAPIView):
 
 class BuyCreditAPIView(generics.GenericAPIView):
     """
-    API endpoint for a buyer to purchase a listed credit.
-    This action is recorded off-chain.
+    API endpoint for a buyer to purchase a listed credit, or `quantity` tonnes of it.
+    This action is recorded off-chain. Concurrent buyers of the same listing get a 409
+    once it no longer holds what they asked for.
     """
+    serializer_class = PurchaseSerializer
     permission_classes = [permissions.IsAuthenticated, IsBuyerUser]
 
     def post(self, request, *args, **kwargs):
-        listing_id = self.kwargs.get('pk')
-        listing = get_object_or_404(Listing, pk=listing_id)
-
-        if not listing.is_active:
-            return Response({"error": "This listing is no longer active."}, status=status.HTTP_400_BAD_REQUEST)
-
-        # Mark listing as sold and transfer ownership
-        listing.is_active = False
-        listing.save()
-
-        credit = listing.credit
-        credit.owner = request.user
-        credit.status = CarbonCredit.CreditStatus.SOLD
-        credit.save()
-
+        serializer = self.get_serializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        try:
+            credit_id = purchase_listing(self.kwargs.get('pk'), request.user, serializer.validated_data.get('quantity'))
+        except Listing.DoesNotExist:
+            raise Http404
+        except ListingUnavailable:
+            return Response({"error": "This listing is no longer active or does not hold the requested quantity."}, status=status.HTTP_409_CONFLICT)
+
+        credit = CarbonCreditSerializer.setup_eager_loading(CarbonCredit.objects.all()).get(pk=credit_id)
         return Response(CarbonCreditSerializer(credit).data)
 
 
 class ClaimProceedsAPIView(generics.GenericAPIView):
     """
-    API endpoint for a seller to claim proceeds from a sale.
+    API endpoint for a seller to claim the unclaimed proceeds of one listing, recorded as a
+    settlement. Retries sending the same `Idempotency-Key` header get the same settlement;
+    a key already used to settle anything else is answered with 409.
     (Placeholder - actual fund transfer would be a separate process)
     """
     permission_classes = [permissions.IsAuthenticated, IsSellerUser]
 
     def post(self, request, *args, **kwargs):
-        listing_id = self.kwargs.get('pk')
-        listing = get_object_or_404(Listing, pk=listing_id, seller=request.user)
+        listing = get_object_or_404(Listing, pk=self.kwargs.get('pk'), seller=request.user)
+        key = request.headers.get('Idempotency-Key') or uuid.uuid4().hex
+        created, existing = settle(key, seller_ids=[request.user.pk], listing_ids=[listing.pk])
+        if existing and not existing[0].lines.filter(listing=listing).exists():
+            return Response(
+                {"error": "This Idempotency-Key was already used for another settlement."}, status=status.HTTP_409_CONFLICT
+            )
+        if not created and not existing:
+            return Response({"error": "This listing has no unclaimed proceeds."}, status=status.HTTP_400_BAD_REQUEST)
 
-        if listing.claimed:
-            return Response({"error": "Proceeds for this listing have already been claimed."}, status=status.HTTP_400_BAD_REQUEST)
+        listing = ListingSerializer.setup_eager_loading(Listing.objects.all()).get(pk=listing.pk)
+        return Response(ListingSerializer(listing).data)
 
-        listing.claimed = True
-        listing.save()
 
-        serializer = ListingSerializer(listing)
-        return Response(serializer.data)
+class SettlementListCreateAPIView(generics.ListCreateAPIView):
+    """
+    API endpoint for a seller's settlements.
+    List (GET): the requesting seller's settlements, newest first.
+    Create (POST): claims the unclaimed proceeds of all the seller's listings at once as one
+    settlement (201), or answers 400 when there is nothing to claim. Retries sending the same
+    `Idempotency-Key` header get the settlement already made (200).
+    """
+    serializer_class = SettlementSerializer
+    permission_classes = [permissions.IsAuthenticated, IsSellerUser]
+
+    def get_queryset(self):
+        return Settlement.objects.filter(seller_id=self.request.user.id)
+
+    def create(self, request, *args, **kwargs):
+        key = request.headers.get('Idempotency-Key') or uuid.uuid4().hex
+        created, existing = settle(key, seller_ids=[request.user.pk])
+        if existing:
+            return Response(SettlementSerializer(existing[0]).data)
+        if not created:
+            return Response({"error": "There are no unclaimed proceeds to settle."}, status=status.HTTP_400_BAD_REQUEST)
+        return Response(SettlementSerializer(created[0]).data, status=status.HTTP_201_CREATED)
+
 
 class WithdrawCreditAPIView(generics.GenericAPIView):
     """
@@ -236,12 +440,251 @@ class WithdrawCreditAPIView(generics.GenericAPIView):
 
     def post(self, request, *args, **kwargs):
         listing_id = self.kwargs.get('pk')
-        listing = get_object_or_404(Listing, pk=listing_id, credit__owner=request.user)
+        listing = get_object_or_404(Listing.objects.select_related('credit'), pk=listing_id, credit__owner=request.user)
 
-        if not listing.is_active:
+        if not listing.is_active or not withdraw_listing(listing):
             return Response({"error": "This listing is not active."}, status=status.HTTP_400_BAD_REQUEST)
 
-        listing.is_active = False
-        listing.save()
+        return Response({"message": "Listing has been withdrawn."})
+
+
+class BulkListingCreateAPIView(generics.GenericAPIView):
+    """
+    API endpoint for a seller to list many whole credits at once.
+    Returns one result per item; items that fail validation do not block the others.
+    """
+    serializer_class = BulkListingCreateSerializer
+    permission_classes = [permissions.IsAuthenticated, IsSellerUser]
+
+    def post(self, request, *args, **kwargs):
+        serializer = self.get_serializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        items = [(item['credit'], item['price']) for item in serializer.validated_data['items']]
+        return Response({'results': bulk_list_credits(request.user, items)})
+
+
+class BulkWithdrawAPIView(generics.GenericAPIView):
+    """
+    API endpoint for a seller to withdraw many unsold listings at once.
+    Returns one result per listing id.
+    """
+    serializer_class = BulkWithdrawSerializer
+    permission_classes = [permissions.IsAuthenticated, IsSellerUser]
+
+    def post(self, request, *args, **kwargs):
+        serializer = self.get_serializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        return Response({'results': bulk_withdraw_listings(request.user, serializer.validated_data['listings'])})
+
+
+class ListingFeedCacheStatsAPIView(APIView):
+    """
+    API endpoint for admins to read hit/miss counters of the cached listings feed.
+    """
+    permission_classes = [permissions.IsAdminUser]
+
+    def get(self, request, *args, **kwargs):
+        return Response(listing_feed_cache.stats())
+
+
+class ExchangeRateAPIView(APIView):
+    """
+    API endpoint returning the stored HBAR/USD rate. Served from the per-process rate cache,
+    so it never calls the upstream price provider; 503 until `refresh_prices` has run.
+    """
+    permission_classes = [permissions.AllowAny]
+    pair = HBAR_USD
+
+    def get(self, request, *args, **kwargs):
+        rate = rate_cache.get(self.pair)
+        if rate is None:
+            return Response({"error": "No exchange rate is available yet."}, status=status.HTTP_503_SERVICE_UNAVAILABLE)
+        response = Response({
+            'pair': rate.pair,
+            'rate': str(rate.rate),
+            'source': rate.source,
+            'fetched_at': rate.fetched_at,
+            'stale': is_stale(rate),
+        })
+        patch_cache_control(response, public=True, max_age=settings.PRICE_CACHE_TIMEOUT)
+        return response
+
+
+class IpfsContentAPIView(APIView):
+    """
+    API endpoint serving a project's IPFS content (metadata, image, document) from the local
+    content-addressed store, fetching and verifying it on a miss. Only CIDs referenced by a
+    project are fetched, so the endpoint cannot be used as an open gateway. Content never
+    changes for a CID, so responses are cacheable forever.
+    """
+    authentication_classes = []
+    permission_classes = [permissions.AllowAny]
+    chunk_size = 64 * 1024
+
+    def get(self, request, cid, *args, **kwargs):
+        try:
+            parse_cid(cid)
+        except InvalidCID:
+            raise Http404
+        etag = f'"{cid}"'
+        if request.headers.get('If-None-Match') == etag:
+            return self._cache_headers(HttpResponseNotModified(), etag)
+
+        content = content_store.open(cid)
+        if content is None:
+            if not Project.objects.filter(Q(metadata_cid=cid) | Q(image_cid=cid) | Q(document_cid=cid)).exists():
+                raise Http404
+            try:
+                content = content_store.fetch(cid)
+            except ContentUnavailable:
+                return Response({"error": "This content could not be retrieved from IPFS."}, status=status.HTTP_502_BAD_GATEWAY)
+
+        response = StreamingHttpResponse(self._stream(content), content_type=content_type(content[:512]))
+        response['Content-Length'] = len(content)
+        # SVG and JSON come from untrusted uploads: never run them as a page on this origin.
+        response['Content-Security-Policy'] = "default-src 'none'; style-src 'unsafe-inline'; sandbox"
+        response['X-Content-Type-Options'] = 'nosniff'
+        return self._cache_headers(response, etag)
+
+    def _stream(self, content):
+        try:
+            for offset in range(0, len(content), self.chunk_size):
+                yield content[offset:offset + self.chunk_size]
+        finally:
+            if not isinstance(content, bytes):
+                content.close()
+
+    def _cache_headers(self, response, etag):
+        response['ETag'] = etag
+        patch_cache_control(response, public=True, max_age=365 * 24 * 3600, immutable=True)
+        return response
+
+
+class ExportAPIView(APIView):
+    """
+    API endpoint streaming a full or incremental dump of projects, credits, trades (listing
+    sales) or fills (order book trades) as CSV or NDJSON (Verifiers and admins).
+    `?since=<ISO timestamp>` limits the dump to rows changed after it; pass the returned
+    `X-Export-Until` as `since` on the next run.
+    """
+    permission_classes = [permissions.IsAuthenticated, IsVerifierUser | permissions.IsAdminUser]
+
+    def get(self, request, dataset, export_format, *args, **kwargs):
+        if dataset not in EXPORTS or export_format not in FORMATS:
+            raise Http404
+        try:
+            since = parse_since(request.query_params.get('since'))
+        except ValueError as exc:
+            raise ValidationError({'since': str(exc)})
+        until = timezone.now()
+        response = StreamingHttpResponse(
+            stream_export(dataset, export_format, since, until), content_type=FORMATS[export_format]
+        )
+        response['Content-Disposition'] = f'attachment; filename="{dataset}-{until:%Y%m%dT%H%M%SZ}.{export_format}"'
+        response['X-Export-Until'] = until.isoformat()
+        return response
+
+
+class MarketAnalyticsAPIView(ClaimsAuthenticationMixin, APIView):
+    """
+    API endpoint for marketplace analytics per vintage, location, project or seller ('all'
+    for the whole market): listings, listed and sold tonnes, trades, traded volume and
+    average/median price per tonne. Optional query parameters: `start` and `end` dates,
+    repeated `key` values, and `period` (day, week or month) for a time series.
+    Per-seller figures are limited to the requesting seller, except for Verifiers and admins.
+    """
+    permission_classes = [permissions.IsAuthenticated]
+
+    def get(self, request, dimension, *args, **kwargs):
+        if dimension not in DIMENSIONS:
+            raise Http404
+        serializer = AnalyticsQuerySerializer(data=request.query_params)
+        serializer.is_valid(raise_exception=True)
+        params = serializer.validated_data
+        keys = params.get('key')
+        if dimension == 'seller' and not request.user.is_staff and get_role(request) != UserProfile.Role.VERIFIER:
+            keys = [str(request.user.id)]
+        results = summarize(dimension, params.get('start'), params.get('end'), keys, params.get('period'))
+        return Response({'results': MarketAnalyticsSerializer(results, many=True).data})
+
+
+class PortfolioSummaryAPIView(ClaimsAuthenticationMixin, APIView):
+    """
+    API endpoint for the requesting user's dashboard totals: projects by status, credits
+    and tonnes owned and available, active listings, tonnes listed and sold, and unclaimed
+    proceeds. Reads one denormalized row instead of aggregating the user's projects,
+    credits and listings on every page view.
+    """
+    permission_classes = [permissions.IsAuthenticated]
+
+    def get(self, request, *args, **kwargs):
+        summary = PortfolioSummary.objects.filter(user_id=request.user.id).first()
+        if summary is None:
+            rebuild([request.user.id])
+            summary = PortfolioSummary.objects.get(user_id=request.user.id)
+        return Response(PortfolioSummarySerializer(summary).data)
+
+
+class OrderListCreateAPIView(ClaimsAuthenticationMixin, generics.ListCreateAPIView):
+    """
+    API endpoint for a user's limit orders.
+    List (GET): the requesting user's orders, newest first (optional `?status=`).
+    Create (POST): Buyers place bids on a project; Sellers place asks on one of their
+    credits. The order is journaled for the matching engine and answered with 202 while
+    PENDING; it is OPEN, FILLED or CANCELLED once the engine has seen it.
+    """
+    permission_classes = [permissions.IsAuthenticated]
+
+    def get_serializer_class(self):
+        return OrderCreateSerializer if self.request.method == 'POST' else OrderSerializer
+
+    def get_queryset(self):
+        queryset = Order.objects.filter(owner_id=self.request.user.id)
+        order_status = self.request.query_params.get('status')
+        if order_status:
+            queryset = queryset.filter(status=order_status.upper())
+        return queryset
 
-        return Response({"message": "Listing has been withdrawn."})
\ No newline at end of file
+    def create(self, request, *args, **kwargs):
+        serializer = self.get_serializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        data = serializer.validated_data
+        role = UserProfile.Role.BUYER if data['side'] == Order.Side.BID else UserProfile.Role.SELLER
+        if get_role(request) != role:
+            raise PermissionDenied(f"Only {role.label} users can place {data['side'].lower()}s.")
+        try:
+            order = place_order(
+                request.user, data['side'], data['price'], data.get('quantity'), data.get('project'), data.get('credit'),
+            )
+        except LotUnavailable:
+            raise ValidationError({"credit": "This credit is not available for sale."})
+        return Response(OrderSerializer(order).data, status=status.HTTP_202_ACCEPTED)
+
+
+class OrderCancelAPIView(generics.GenericAPIView):
+    """
+    API endpoint to cancel one of the user's pending or open orders. The cancellation is
+    journaled and answered with 202; whatever fills before the engine applies it stays filled.
+    """
+    permission_classes = [permissions.IsAuthenticated]
+
+    def post(self, request, *args, **kwargs):
+        order = get_object_or_404(Order, pk=self.kwargs.get('pk'), owner=request.user)
+        if not cancel_order(order):
+            return Response({"error": "This order was already filled or cancelled."}, status=status.HTTP_400_BAD_REQUEST)
+        return Response(OrderSerializer(order).data, status=status.HTTP_202_ACCEPTED)
+
+
+class OrderBookAPIView(APIView):
+    """
+    API endpoint for the top of a project's order book: open tonnes and order count per
+    price level, best first, for `?levels=` (default 10, max 50) levels a side.
+    """
+    permission_classes = [permissions.AllowAny]
+
+    def get(self, request, project_id, *args, **kwargs):
+        try:
+            levels = min(max(int(request.query_params.get('levels', 10)), 1), 50)
+        except ValueError:
+            raise ValidationError({'levels': 'A whole number is required.'})
+        return Response(BookDepthSerializer(book_depth(project_id, levels)).data)
@@ -125,6 +125,32 @@ AUTH_PASSWORD_VALIDATORS = [
     },
 ]
 
+# Password hashing. PASSWORD_HASHER=argon2 makes Argon2 (requires `pip install argon2-cffi`)
+# the algorithm for new hashes; the others stay listed so existing hashes still verify and
+# are rehashed with the preferred algorithm/cost the next time their owner logs in.
+PASSWORD_HASHER = os.environ.get('PASSWORD_HASHER', 'pbkdf2')
+PBKDF2_ITERATIONS = int(os.environ.get('PBKDF2_ITERATIONS', 720000))
+ARGON2_TIME_COST = int(os.environ.get('ARGON2_TIME_COST', 2))
+ARGON2_MEMORY_COST = int(os.environ.get('ARGON2_MEMORY_COST', 102400))  # KiB
+ARGON2_PARALLELISM = int(os.environ.get('ARGON2_PARALLELISM', 8))
+
+PASSWORD_HASHERS = [
+    'users.hashers.PooledPBKDF2PasswordHasher',
+    'users.hashers.PooledArgon2PasswordHasher',
+    'django.contrib.auth.hashers.PBKDF2SHA1PasswordHasher',
+    'django.contrib.auth.hashers.ScryptPasswordHasher',
+]
+if PASSWORD_HASHER == 'argon2':
+    PASSWORD_HASHERS.insert(0, PASSWORD_HASHERS.pop(1))
+
+# Hash in a pool of this many threads per process (0 hashes on the request thread), so a
+# burst of logins/registrations cannot occupy every worker. Requests wait up to
+# PASSWORD_HASHING_QUEUE_TIMEOUT seconds for one of PASSWORD_HASHING_QUEUE queued slots,
+# then get 429.
+PASSWORD_HASHING_WORKERS = int(os.environ.get('PASSWORD_HASHING_WORKERS', 0))
+PASSWORD_HASHING_QUEUE = int(os.environ.get('PASSWORD_HASHING_QUEUE', 32))
+PASSWORD_HASHING_QUEUE_TIMEOUT = float(os.environ.get('PASSWORD_HASHING_QUEUE_TIMEOUT', 5))
+
 
 # Internationalization
 # https://docs.djangoproject.com/en/5.0/topics/i18n/
@@ -151,6 +177,82 @@ MEDIA_ROOT = BASE_DIR / 'media'
 
 
 
+# Caches
+# https://docs.djangoproject.com/en/5.0/topics/cache/
+
+if os.environ.get('REDIS_URL'):
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.redis.RedisCache',
+            'LOCATION': os.environ['REDIS_URL'],
+        }
+    }
+else:
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        }
+    }
+
+# Pre-serialized public listings feed (api.cache.ListingFeedCache)
+LISTING_FEED_CACHE_ALIAS = 'default'
+LISTING_FEED_CACHE_TIMEOUT = 300
+
+
+# Rows per INSERT when registering minted serials in bulk (api.marketplace.mint_serials)
+BULK_MINT_CHUNK_SIZE = 5000
+
+# Hedera mirror-node ingestion (api.mirror_node). The marketplace account is the escrow
+# contract that holds NFTs while they are listed; transfers to and from it are listings,
+# sales and withdrawals.
+MIRROR_NODE_URL = os.environ.get('MIRROR_NODE_URL', 'https://testnet.mirrornode.hedera.com')
+HEDERA_MARKETPLACE_ACCOUNT_ID = os.environ.get('HEDERA_MARKETPLACE_ACCOUNT_ID', '')
+
+# Transactional outbox (api.outbox): attempts before an event is marked FAILED, and seconds
+# a worker has to process a claimed event (network handlers included) before another
+# worker may take it over.
+OUTBOX_MAX_ATTEMPTS = 8
+OUTBOX_LEASE = 600
+
+# Exchange rates (api.prices): `refresh_prices` fetches from PRICE_PROVIDER every
+# PRICE_REFRESH_INTERVAL seconds; each process re-reads the stored rate at most every
+# PRICE_CACHE_TIMEOUT seconds. Use 'api.prices.StubPriceProvider' to work offline.
+PRICE_PROVIDER = os.environ.get('PRICE_PROVIDER', 'api.prices.CoinGeckoProvider')
+PRICE_STUB_RATE = os.environ.get('PRICE_STUB_RATE', '0.05')
+PRICE_REFRESH_INTERVAL = int(os.environ.get('PRICE_REFRESH_INTERVAL', 60))
+PRICE_CACHE_TIMEOUT = 30
+# Adds `price_usd` to serialized listings.
+LISTING_PRICE_USD = True
+
+# IPFS content cache (api.ipfs): content is fetched block by block from IPFS_GATEWAY_URL,
+# verified against its CID and kept on disk under IPFS_CACHE_DIR, up to IPFS_CACHE_MAX_BYTES.
+IPFS_GATEWAY_URL = os.environ.get('IPFS_GATEWAY_URL', 'https://ipfs.io')
+IPFS_CACHE_DIR = os.environ.get('IPFS_CACHE_DIR', BASE_DIR / 'ipfs-cache')
+IPFS_CACHE_MAX_BYTES = int(os.environ.get('IPFS_CACHE_MAX_BYTES', 1024 ** 3))
+IPFS_MAX_CONTENT_BYTES = 50 * 1024 ** 2
+IPFS_FETCH_TIMEOUT = 30
+IPFS_FETCH_WORKERS = 8
+
+# Rows fetched per round trip by the streaming exports (api.exports).
+EXPORT_CHUNK_SIZE = 2000
+
+# Width of the price bands behind analytics medians (api.analytics): 1.02 = 2% bands.
+ANALYTICS_PRICE_BAND_RATIO = 1.02
+
+# Realtime marketplace feed (api.realtime), served over ASGI. Each process polls the outbox
+# every REALTIME_POLL_INTERVAL seconds for events recorded in the last REALTIME_COMMIT_GRACE
+# seconds (longer than a write transaction takes). A client whose REALTIME_QUEUE_SIZE events
+# are not written yet is disconnected and catches up on reconnect from its Last-Event-ID,
+# up to REALTIME_REPLAY_LIMIT events back.
+REALTIME_POLL_INTERVAL = 0.5
+REALTIME_COMMIT_GRACE = 10
+REALTIME_QUEUE_SIZE = 256
+REALTIME_REPLAY_LIMIT = 1000
+REALTIME_MAX_SUBSCRIBERS = int(os.environ.get('REALTIME_MAX_SUBSCRIBERS', 5000))
+REALTIME_HEARTBEAT = 15
+REALTIME_RETRY_MS = 3000
+
+
 # Default primary key field type
 # https://docs.djangoproject.com/en/5.0/ref/settings/#default-auto-field
 
@@ -165,6 +267,8 @@ REST_FRAMEWORK = {
     'DEFAULT_PERMISSION_CLASSES': [
         'rest_framework.permissions.IsAuthenticated',
     ],
+    'DEFAULT_PAGINATION_CLASS': 'api.pagination.CreatedAtCursorPagination',
+    'PAGE_SIZE': 50,
 }
 
 from datetime import timedelta
@@ -180,5 +284,11 @@ SIMPLE_JWT = {
 
 }
 
+# Cache of changed user roles (users.roles), read instead of the role claim of access
+# tokens; must be shared by every process (`check --deploy` warns if it is not). Entries
+# last the access token lifetime, so every token issued before a role change has expired.
+USER_ROLE_CACHE_ALIAS = 'default'
+USER_ROLE_CACHE_TIMEOUT = int(SIMPLE_JWT['ACCESS_TOKEN_LIFETIME'].total_seconds())
+
 
 
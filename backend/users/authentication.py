@@ -0,0 +1,52 @@
+from django.contrib.auth.models import User
+from django.utils.functional import cached_property
+from rest_framework.permissions import SAFE_METHODS
+from rest_framework_simplejwt.authentication import JWTAuthentication
+from rest_framework_simplejwt.exceptions import InvalidToken
+from rest_framework_simplejwt.models import TokenUser
+from rest_framework_simplejwt.settings import api_settings
+
+
+class ClaimsUser(TokenUser):
+    """
+    Request user backed by a verified access token: id, username, role and staff status are
+    read from its claims. `instance` loads the full User row for the rare read that needs
+    the model.
+    """
+    @cached_property
+    def role(self):
+        return self.token.get('role')
+
+    @cached_property
+    def is_staff(self):
+        # Tokens issued before the claim existed count as non-staff until refreshed.
+        return bool(self.token.get('is_staff', False))
+
+    @cached_property
+    def instance(self):
+        return User.objects.get(pk=self.pk)
+
+
+class ReadOnlyClaimsJWTAuthentication(JWTAuthentication):
+    """
+    JWT authentication that skips the `auth_user` lookup for safe (read-only) methods and
+    returns a ClaimsUser instead. Writes load the User exactly like JWTAuthentication.
+
+    Reads are therefore trusted for the lifetime of the access token: a user deactivated
+    in the meantime keeps read access until it expires, but cannot write.
+    """
+    def authenticate(self, request):
+        if request.method not in SAFE_METHODS:
+            return super().authenticate(request)
+
+        header = self.get_header(request)
+        if header is None:
+            return None
+        raw_token = self.get_raw_token(header)
+        if raw_token is None:
+            return None
+
+        validated_token = self.get_validated_token(raw_token)
+        if api_settings.USER_ID_CLAIM not in validated_token:
+            raise InvalidToken("Token contained no recognizable user identification")
+        return ClaimsUser(validated_token), validated_token
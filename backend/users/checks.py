@@ -0,0 +1,25 @@
+from django.conf import settings
+from django.core.checks import Tags, Warning, register
+
+
+# Cache backends whose entries are private to one process.
+PROCESS_LOCAL_CACHES = (
+    'django.core.cache.backends.locmem.LocMemCache',
+    'django.core.cache.backends.dummy.DummyCache',
+)
+
+
+@register(Tags.caches, deploy=True)
+def check_role_cache(app_configs, **kwargs):
+    backend = settings.CACHES.get(settings.USER_ROLE_CACHE_ALIAS, {}).get('BACKEND')
+    if backend not in PROCESS_LOCAL_CACHES:
+        return []
+    return [Warning(
+        f"The role cache ('{settings.USER_ROLE_CACHE_ALIAS}') is local to each process.",
+        hint=(
+            'Role changes then only reach reads served by the process that made them, until the '
+            'access tokens issued before the change expire. Set REDIS_URL or point '
+            'USER_ROLE_CACHE_ALIAS at a shared cache.'
+        ),
+        id='users.W001',
+    )]
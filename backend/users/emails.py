@@ -0,0 +1,31 @@
+from django.contrib.auth.models import User
+from django.db.models import BooleanField, Func
+from django.db.models.functions import Lower
+
+
+# Unique index over LOWER(email), created by migration 0004. Accounts without an email
+# (e.g. from createsuperuser) are left out so any number of them can exist.
+EMAIL_INDEX_NAME = 'auth_user_email_lower_uniq'
+
+
+class NonEmpty(Func):
+    """
+    `<column> <> ''` with the empty string inlined rather than bound as a parameter, so
+    SQLite and PostgreSQL can match it against the predicate of the partial email index.
+    """
+    template = "%(expressions)s <> ''"
+    output_field = BooleanField()
+
+
+def normalize_email(email):
+    return email.strip().lower()
+
+
+def users_by_email(email):
+    """
+    Users whose email equals `email`, ignoring case. Resolved through the unique
+    LOWER(email) index, so it is a single index probe however many users exist.
+    """
+    return User.objects.annotate(email_lower=Lower('email')).filter(
+        NonEmpty('email'), email_lower=normalize_email(email)
+    )
@@ -0,0 +1,56 @@
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+from rest_framework.exceptions import Throttled
+
+
+_state = threading.local()
+_lock = threading.Lock()
+_pool = None
+
+
+class HashingBusy(Throttled):
+    default_detail = "Too many sign-in attempts are being processed. Please retry shortly."
+
+
+def _get_pool():
+    global _pool
+    with _lock:
+        if _pool is None:
+            workers = settings.PASSWORD_HASHING_WORKERS
+            _pool = (
+                ThreadPoolExecutor(max_workers=workers, thread_name_prefix='password-hashing'),
+                threading.BoundedSemaphore(workers + settings.PASSWORD_HASHING_QUEUE),
+            )
+        return _pool
+
+
+def _run(func, args, kwargs):
+    _state.in_pool = True
+    try:
+        return func(*args, **kwargs)
+    finally:
+        _state.in_pool = False
+
+
+def offload(func, *args, **kwargs):
+    """
+    Runs `func` (a password hash or verification) on the hashing pool and returns its result.
+
+    At most PASSWORD_HASHING_WORKERS hashes run at once per process and at most
+    PASSWORD_HASHING_QUEUE more wait for a thread; beyond that the caller waits up to
+    PASSWORD_HASHING_QUEUE_TIMEOUT seconds and then gets HashingBusy (HTTP 429). Threads are
+    enough here: hashlib's PBKDF2 and argon2-cffi release the GIL while hashing.
+    Runs inline when the pool is disabled or when already on a pool thread.
+    """
+    if not settings.PASSWORD_HASHING_WORKERS or getattr(_state, 'in_pool', False):
+        return func(*args, **kwargs)
+
+    executor, slots = _get_pool()
+    if not slots.acquire(timeout=settings.PASSWORD_HASHING_QUEUE_TIMEOUT):
+        raise HashingBusy(wait=settings.PASSWORD_HASHING_QUEUE_TIMEOUT)
+    try:
+        return executor.submit(_run, func, args, kwargs).result()
+    finally:
+        slots.release()
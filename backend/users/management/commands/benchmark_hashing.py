@@ -0,0 +1,56 @@
+import os
+import threading
+import time
+
+from django.contrib.auth.hashers import get_hasher, get_hashers
+from django.core.management.base import BaseCommand
+
+from users.hashing import HashingBusy
+
+
+class Command(BaseCommand):
+    help = (
+        "Measures password verifications (the CPU cost of a login) per second and per core for "
+        "each configured hasher, using the current cost and pool settings."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--threads', type=int, default=os.cpu_count(), help='Concurrent callers.')
+        parser.add_argument('--seconds', type=float, default=5.0, help='Duration per hasher.')
+
+    def handle(self, *args, **options):
+        cores = min(options['threads'], os.cpu_count())
+        self.stdout.write(f"{options['threads']} thread(s) on {os.cpu_count()} core(s); preferred hasher: {get_hasher().algorithm}")
+        for hasher in get_hashers():
+            if hasher.algorithm not in ('pbkdf2_sha256', 'argon2'):
+                continue
+            try:
+                encoded = hasher.encode('correct horse battery staple', hasher.salt())
+            except ValueError as exc:
+                self.stdout.write(f'{hasher.algorithm:14} skipped: {exc}')
+                continue
+            done, busy = self._run(hasher, encoded, options['threads'], options['seconds'])
+            rate = done / options['seconds']
+            self.stdout.write(
+                f'{hasher.algorithm:14} {rate:8.1f} logins/s  {rate / cores:8.1f} per core  '
+                f'{1000 / rate * options["threads"]:8.1f} ms each  {busy} rejected (429)'
+            )
+
+    def _run(self, hasher, encoded, threads, seconds):
+        deadline = time.perf_counter() + seconds
+        counts = [[0, 0] for _ in range(threads)]
+
+        def worker(count):
+            while time.perf_counter() < deadline:
+                try:
+                    assert hasher.verify('correct horse battery staple', encoded)
+                    count[0] += 1
+                except HashingBusy:
+                    count[1] += 1
+
+        workers = [threading.Thread(target=worker, args=(count,)) for count in counts]
+        for thread in workers:
+            thread.start()
+        for thread in workers:
+            thread.join()
+        return sum(count[0] for count in counts), sum(count[1] for count in counts)
@@ -20,7 +20,7 @@ class UserProfile(models.Model):
 
     user = models.OneToOneField(User, on_delete=models.CASCADE, related_name='profile')
     role = models.CharField(max_length=10, choices=Role.choices, default=Role.BUYER)
-    hedera_account_id = models.CharField(max_length=255, blank=True, null=True)
+    hedera_account_id = models.CharField(max_length=255, blank=True, null=True, db_index=True) # Mirror-node ingestion maps accounts to users by it
 
     def __str__(self):
         return f'{self.user.username} - {self.get_role_display()}'
\ No newline at end of file
@@ -0,0 +1,62 @@
+from django.conf import settings
+from django.core.cache import caches
+from rest_framework.permissions import SAFE_METHODS
+
+from .models import UserProfile
+
+
+def _cache():
+    return caches[settings.USER_ROLE_CACHE_ALIAS]
+
+
+def _cache_key(user_id):
+    return f'user-role:{user_id}'
+
+
+def get_role(request):
+    """
+    Returns the role of the authenticated user, without a database query for reads in the
+    common case.
+
+    Writes always read the role from the profile, so a role change restricts them at once
+    in every process. For reads, a cached role is authoritative: it is written whenever a
+    role changes and overrides the claim of access tokens issued before the change.
+    Otherwise the `role` claim of the JWT is used, and only session-authenticated requests
+    (or tokens issued before the claim existed) fall back to loading the profile, whose
+    role is then cached.
+    """
+    user = request.user
+    if request.method not in SAFE_METHODS:
+        return UserProfile.objects.values_list('role', flat=True).get(user_id=user.pk)
+    role = _cache().get(_cache_key(user.pk))
+    if role is None and hasattr(request.auth, 'get'):
+        role = request.auth.get('role')
+    if role is None:
+        role = UserProfile.objects.values_list('role', flat=True).get(user_id=user.pk)
+        _cache().set(_cache_key(user.pk), role, settings.USER_ROLE_CACHE_TIMEOUT)
+    return role
+
+
+async def aget_role(request):
+    """
+    get_role for async views.
+    """
+    user = request.user
+    if request.method not in SAFE_METHODS:
+        return await UserProfile.objects.values_list('role', flat=True).aget(user_id=user.pk)
+    role = await _cache().aget(_cache_key(user.pk))
+    if role is None and hasattr(request.auth, 'get'):
+        role = request.auth.get('role')
+    if role is None:
+        role = await UserProfile.objects.values_list('role', flat=True).aget(user_id=user.pk)
+        await _cache().aset(_cache_key(user.pk), role, settings.USER_ROLE_CACHE_TIMEOUT)
+    return role
+
+
+def set_role(user_id, role):
+    """
+    Records a role change so reads apply it immediately, even for outstanding access tokens.
+    Every process must share the USER_ROLE_CACHE_ALIAS cache for this (`manage.py check
+    --deploy` warns otherwise); writes never depend on it.
+    """
+    _cache().set(_cache_key(user_id), role, settings.USER_ROLE_CACHE_TIMEOUT)
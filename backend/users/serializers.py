@@ -1,6 +1,8 @@
 from rest_framework import serializers
 from django.contrib.auth.models import User
 from django.contrib.auth import authenticate
+from django.db import IntegrityError, transaction
+from .emails import normalize_email, users_by_email
 from .models import UserProfile
 from rest_framework_simplejwt.tokens import RefreshToken, TokenError
 
@@ -19,7 +21,7 @@ class LoginSerializer(serializers.Serializer):
 
         try:
             # We must fetch the user by email to get their actual username
-            user_obj = User.objects.get(email=email)
+            user_obj = users_by_email(email).get()
         except User.DoesNotExist:
             raise serializers.ValidationError("Impossible de se connecter avec les informations d'identification fournies.", code='authorization')
 
@@ -54,26 +56,35 @@ class RegisterSerializer(serializers.Serializer):
     password = serializers.CharField(write_only=True)
     role = serializers.ChoiceField(choices=UserProfile.Role.choices, write_only=True)
 
+    duplicate_email_message = "Un utilisateur avec cet e-mail existe déjà."
+
     def validate_email(self, value):
-        if User.objects.filter(email=value).exists():
-            raise serializers.ValidationError("Un utilisateur avec cet e-mail existe déjà.")
+        # Emails are stored lower-cased; the unique LOWER(email) index backs this check.
+        value = normalize_email(value)
+        if users_by_email(value).exists():
+            raise serializers.ValidationError(self.duplicate_email_message)
         return value
 
     def create(self, validated_data):
         role = validated_data.pop('role')
 
-        # Create the Django User
-        user = User.objects.create_user(
-            username=validated_data['email'],
-            email=validated_data['email'],
-            password=validated_data['password']
-        )
-
-        # Create the UserProfile
-        UserProfile.objects.create(
-            user=user, 
-            role=role
-        )
+        try:
+            with transaction.atomic():
+                # Create the Django User
+                user = User.objects.create_user(
+                    username=validated_data['email'],
+                    email=validated_data['email'],
+                    password=validated_data['password']
+                )
+
+                # Create the UserProfile
+                UserProfile.objects.create(
+                    user=user, 
+                    role=role
+                )
+        except IntegrityError:
+            # A concurrent registration took the email between validation and insert.
+            raise serializers.ValidationError({'email': [self.duplicate_email_message]})
         return user
 
 
@@ -1,3 +1,143 @@
-from django.test import TestCase
+import threading
+from unittest import mock
 
-# Create your tests here.
+from django.conf import settings
+from django.contrib.auth.hashers import PBKDF2PasswordHasher, PBKDF2SHA1PasswordHasher, check_password, make_password
+from django.contrib.auth.models import User
+from django.test import TestCase, override_settings
+from django.urls import reverse
+from rest_framework.test import APIClient
+
+from . import hashing
+from .hashers import PooledPBKDF2PasswordHasher
+from .models import UserProfile
+
+
+class EmailCaseTests(TestCase):
+    """
+    Emails identify accounts regardless of case, at login and at registration.
+    """
+    password = 'pw-12345!'
+
+    def setUp(self):
+        self.client = APIClient()
+
+    def register(self, email):
+        return self.client.post(
+            reverse('users:register'), {'email': email, 'password': self.password, 'role': 'BUYER'}, format='json'
+        )
+
+    def login(self, email):
+        return self.client.post(reverse('users:login'), {'email': email, 'password': self.password}, format='json')
+
+    def test_login_ignores_the_case_of_the_email(self):
+        self.assertEqual(self.register('Alice@Example.com').status_code, 200)
+        self.assertEqual(User.objects.get().email, 'alice@example.com')
+
+        response = self.login('ALICE@example.COM')
+        self.assertEqual(response.status_code, 200, response.content)
+        self.assertEqual(response.json()['user']['email'], 'alice@example.com')
+
+    def test_login_finds_an_account_stored_with_mixed_case(self):
+        # Accounts registered before emails were lower-cased keep their original spelling.
+        user = User.objects.create_user(username='bob', email='Bob@Example.com', password=self.password)
+        UserProfile.objects.create(user=user)
+
+        response = self.login('bob@example.com')
+        self.assertEqual(response.status_code, 200, response.content)
+        self.assertEqual(response.json()['user']['id'], user.pk)
+
+    def test_registration_rejects_an_email_differing_only_in_case(self):
+        self.assertEqual(self.register('carol@example.com').status_code, 200)
+
+        response = self.register('  CAROL@Example.com ')
+        self.assertEqual(response.status_code, 400)
+        self.assertIn('email', response.json())
+        self.assertEqual(User.objects.count(), 1)
+
+    def test_registration_losing_a_race_for_the_email_is_rejected(self):
+        # The concurrent account got in between validation and insert: only the unique
+        # LOWER(email) index sees it.
+        User.objects.create_user(username='dave', email='Dave@Example.com', password=self.password)
+
+        with mock.patch('users.serializers.users_by_email', return_value=User.objects.none()):
+            response = self.register('dave@example.com')
+        self.assertEqual(response.status_code, 400, response.content)
+        self.assertIn('email', response.json())
+        self.assertEqual(list(User.objects.values_list('username', flat=True)), ['dave'])
+        self.assertFalse(UserProfile.objects.exists())
+
+
+@override_settings(PASSWORD_HASHING_WORKERS=2, PASSWORD_HASHING_QUEUE=0, PASSWORD_HASHING_QUEUE_TIMEOUT=0.05)
+class HashingPoolTests(TestCase):
+    password = 'pw-12345!'
+
+    def setUp(self):
+        self.reset_pool()
+        self.addCleanup(self.reset_pool)
+        self.client = APIClient()
+        self.user = User.objects.create_user(username='erin@example.com', email='erin@example.com', password=self.password)
+        UserProfile.objects.create(user=self.user)
+
+    def reset_pool(self):
+        # The pool is sized from the settings when first used.
+        if hashing._pool is not None:
+            hashing._pool[0].shutdown()
+        hashing._pool = None
+
+    def login(self, password=None):
+        return self.client.post(
+            reverse('users:login'), {'email': self.user.email, 'password': password or self.password}, format='json'
+        )
+
+    def test_hashes_and_verifies_on_the_pool(self):
+        threads = []
+        encode = PBKDF2PasswordHasher.encode
+
+        def recording_encode(hasher, *args, **kwargs):
+            threads.append(threading.current_thread().name)
+            return encode(hasher, *args, **kwargs)
+
+        with mock.patch.object(PBKDF2PasswordHasher, 'encode', recording_encode):
+            encoded = make_password('s3cret-pass')
+            self.assertTrue(check_password('s3cret-pass', encoded))
+            self.assertFalse(check_password('wrong-pass', encoded))
+        self.assertTrue(encoded.startswith(f'pbkdf2_sha256${settings.PBKDF2_ITERATIONS}$'))
+        self.assertTrue(threads)
+        self.assertTrue(all(name.startswith('password-hashing') for name in threads), threads)
+
+    def test_a_full_pool_answers_429(self):
+        _, slots = hashing._get_pool()
+        for _ in range(2):
+            slots.acquire()
+            self.addCleanup(slots.release)
+
+        self.assertEqual(self.login().status_code, 429)
+        response = self.client.post(
+            reverse('users:register'), {'email': 'frank@example.com', 'password': self.password, 'role': 'BUYER'},
+            format='json',
+        )
+        self.assertEqual(response.status_code, 429)
+        self.assertFalse(User.objects.filter(email='frank@example.com').exists())
+
+    def test_login_rehashes_a_password_stored_with_old_parameters(self):
+        hasher = PooledPBKDF2PasswordHasher()
+        for encoded in (
+            hasher.encode(self.password, hasher.salt(), iterations=1000),
+            PBKDF2SHA1PasswordHasher().encode(self.password, hasher.salt()),
+        ):
+            with self.subTest(encoded=encoded.split('$')[0]):
+                User.objects.filter(pk=self.user.pk).update(password=encoded)
+                self.assertEqual(self.login().status_code, 200)
+                self.user.refresh_from_db()
+                self.assertTrue(self.user.password.startswith(f'pbkdf2_sha256${settings.PBKDF2_ITERATIONS}$'))
+                self.assertTrue(self.user.check_password(self.password))
+
+    def test_a_wrong_password_is_not_rehashed(self):
+        hasher = PooledPBKDF2PasswordHasher()
+        encoded = hasher.encode(self.password, hasher.salt(), iterations=1000)
+        User.objects.filter(pk=self.user.pk).update(password=encoded)
+
+        self.assertEqual(self.login('wrong-pass').status_code, 400)
+        self.user.refresh_from_db()
+        self.assertEqual(self.user.password, encoded)
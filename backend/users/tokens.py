@@ -0,0 +1,16 @@
+from rest_framework_simplejwt.tokens import RefreshToken
+
+
+class RoleRefreshToken(RefreshToken):
+    """
+    Refresh token carrying the user's username, role and staff status as claims. Access
+    tokens derived from it copy them, so permission checks can authorize without loading
+    the user or the profile.
+    """
+    @classmethod
+    def for_user(cls, user):
+        token = super().for_user(user)
+        token['username'] = user.get_username()
+        token['role'] = user.profile.role
+        token['is_staff'] = user.is_staff
+        return token
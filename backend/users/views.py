@@ -1,10 +1,11 @@
 from rest_framework import generics, permissions, status
 from rest_framework.response import Response
 from .serializers import RegisterSerializer, UserSerializer, LoginSerializer, LogoutSerializer, UserProfileSerializer
-from rest_framework_simplejwt.tokens import RefreshToken
+from .roles import set_role
+from .tokens import RoleRefreshToken
 
 def get_tokens_for_user(user):
-    refresh = RefreshToken.for_user(user)
+    refresh = RoleRefreshToken.for_user(user)
     return {
         'refresh': str(refresh),
         'access': str(refresh.access_token),
@@ -60,4 +61,7 @@ class UserProfileDetailAPIView(generics.RetrieveUpdateAPIView):
         serializer = UserProfileSerializer(user_profile, data=request.data, partial=True)
         serializer.is_valid(raise_exception=True)
         serializer.save()
+        if 'role' in serializer.validated_data:
+            # Outstanding access tokens still carry the previous role claim.
+            set_role(request.user.pk, user_profile.role)
         return Response(UserSerializer(request.user).data)
@@ -7,6 +7,7 @@ import { useRouter } from 'next/router';
 import { useSelector, useDispatch } from 'react-redux';
 import { RootState, AppDispatch } from '../store';
 import { getActiveListings } from '../store/carbonSlice';
+import ipfsService from '../services/ipfsService';
 
 export function FeaturedListings() {
   const router = useRouter();
@@ -14,8 +15,9 @@ export function FeaturedListings() {
   const { currentUser } = useSelector((state: RootState) => state.user);
   const { listings, isLoading } = useSelector((state: RootState) => state.carbon);
 
+  // Only the newest few are shown, so only those are fetched.
   useEffect(() => {
-    dispatch(getActiveListings());
+    dispatch(getActiveListings({ pageSize: 3 }));
   }, [dispatch]);
 
   const handleBuyNow = (listingId: number) => {
@@ -57,7 +59,7 @@ export function FeaturedListings() {
                 <div className="bg-gray-200 h-48 flex items-center justify-center">
                   {listing.credit.project.image_cid ? (
                       <img 
-                        src={`https://ipfs.io/ipfs/${listing.credit.project.image_cid}`}
+                        src={ipfsService.contentUrl(listing.credit.project.image_cid)}
                         alt={listing.credit.project.name} 
                         className="w-full h-full object-cover"
                       />
@@ -88,7 +90,7 @@ export function FeaturedListings() {
                   <div className="flex items-center justify-between py-3 border-y border-gray-200">
                     <div>
                       <p className="text-xs text-gray-500">Available Tonnage</p>
-                      <p className="text-lg text-gray-900">{listing.credit.project.tonnage.toLocaleString()} t</p>
+                      <p className="text-lg text-gray-900">{listing.credit.quantity.toLocaleString()} t</p>
                     </div>
                     <div className="text-right">
                       <p className="text-xs text-gray-500">Price/ton</p>
@@ -4,6 +4,7 @@ import { Button } from './ui/button';
 import { Badge } from './ui/badge';
 import { toast } from 'sonner';
 import { Listing } from '../store/carbonSlice';
+import ipfsService from '../services/ipfsService';
 
 interface ListingCardProps {
   listing: Listing;
@@ -22,7 +23,7 @@ export const ListingCard = React.memo(({ listing, hbarToUsdRate }: ListingCardPr
             <div className="bg-gray-200 h-48 flex items-center justify-center">
                 {listing.credit.project.image_cid ? (
                     <img 
-                        src={`https://ipfs.io/ipfs/${listing.credit.project.image_cid}`}
+                        src={ipfsService.contentUrl(listing.credit.project.image_cid)}
                         alt={listing.credit.project.name} 
                         className="w-full h-full object-cover"
                     />
@@ -1,4 +1,4 @@
-import React, { useEffect, useMemo, useState } from 'react';
+import React, { useEffect, useMemo, useRef, useState } from 'react';
 import { Card } from './ui/card';
 import { Button } from './ui/button';
 import { Badge } from './ui/badge';
@@ -9,11 +9,14 @@ import { RootState, AppDispatch } from '../store';
 import { getActiveListings, buyCredit, Listing, getMyListings, getCarbonCredits } from '../store/carbonSlice';
 import { toast } from 'sonner';
 import { Dialog, DialogContent, DialogHeader, DialogTitle } from './ui/dialog';
+import { Input } from './ui/input';
 import { PurchaseProgress } from './PurchaseProgress';
+import projectService, { ListingQuery } from '../services/projectService';
+import ipfsService from '../services/ipfsService';
 
 export function Marketplace() {
   const { currentUser } = useSelector((state: RootState) => state.user);
-  const { listings, isLoading } = useSelector((state: RootState) => state.carbon);
+  const { listings, listingsNext, isLoading } = useSelector((state: RootState) => state.carbon);
   const dispatch = useDispatch<AppDispatch>();
   const router = useRouter();
 
@@ -29,9 +32,7 @@ export function Marketplace() {
   useEffect(() => {
     const fetchHbarPrice = async () => {
       try {
-        const response = await fetch('https://api.coingecko.com/api/v3/simple/price?ids=hedera-hashgraph&vs_currencies=usd');
-        const data = await response.json();
-        setHbarToUsdRate(data['hedera-hashgraph'].usd);
+        setHbarToUsdRate(await projectService.getHbarUsdRate());
       } catch (error) {
         console.error('Error fetching HBAR price:', error);
       }
@@ -42,17 +43,63 @@ export function Marketplace() {
 
   const [showFullDescription, setShowFullDescription] = useState(false);
 
-  // Pagination for listings
+  // Filters being edited, and the ones the loaded listings were fetched with.
+  const [showFilters, setShowFilters] = useState(false);
+  const [filterForm, setFilterForm] = useState<ListingQuery>({ ordering: 'newest' });
+  const [query, setQuery] = useState<ListingQuery>({ ordering: 'newest' });
+
+  // The backend filters and sorts the listings and sends them a page at a time; pages
+  // already loaded are kept, and Next fetches the following one when it is needed.
   const paginatedListings = useMemo(() => {
-    const sortedListings = [...listings].sort((a, b) => new Date(b.created_at).getTime() - new Date(a.created_at).getTime());
     const startIndex = (listingsPage - 1) * itemsPerPage;
-    return sortedListings.slice(startIndex, startIndex + itemsPerPage);
+    return listings.slice(startIndex, startIndex + itemsPerPage);
   }, [listings, listingsPage, itemsPerPage]);
 
-  const totalListingPages = Math.ceil(listings.length / itemsPerPage);
+  const loadedListingPages = Math.ceil(listings.length / itemsPerPage);
+  const hasNextListingPage = listingsPage < loadedListingPages || listingsNext !== null;
+
+  const handleNextListingPage = async () => {
+    if (listingsPage >= loadedListingPages) {
+      try {
+        await dispatch(getActiveListings({ more: true })).unwrap();
+      } catch (error) {
+        console.error('Error fetching listings:', error);
+        return;
+      }
+    }
+    setListingsPage(p => p + 1);
+  };
+
+  const applyFilters = () => {
+    setQuery(filterForm);
+    setListingsPage(1);
+  };
 
   useEffect(() => {
-    dispatch(getActiveListings());
+    dispatch(getActiveListings({ query, pageSize: itemsPerPage }));
+  }, [dispatch, query]);
+
+  // Reloads the listings for the current filters, keeping the pages already browsed.
+  const reloadListings = useRef(() => {});
+  reloadListings.current = () => {
+    dispatch(getActiveListings({ query, pageSize: Math.min(Math.max(listings.length, itemsPerPage), 200) }));
+  };
+
+  // Reloads the listings when the backend pushes a change, once per burst of events.
+  useEffect(() => {
+    let timer: ReturnType<typeof setTimeout> | null = null;
+    const close = projectService.subscribeMarketplace(() => {
+      if (!timer) {
+        timer = setTimeout(() => {
+          timer = null;
+          reloadListings.current();
+        }, 500);
+      }
+    }, { events: 'listing-created,listing-sold,listing-withdrawn' });
+    return () => {
+      close();
+      if (timer) clearTimeout(timer);
+    };
   }, [dispatch]);
 
   const handleBuy = async (listing: Listing) => {
@@ -77,7 +124,7 @@ export function Marketplace() {
       setPurchaseStep(3); // Assuming step 3 is finalization
 
       toast.success("Purchase successful!");
-      dispatch(getActiveListings());
+      reloadListings.current();
       dispatch(getMyListings());
       dispatch(getCarbonCredits());
       setTimeout(() => {
@@ -104,7 +151,7 @@ export function Marketplace() {
     }
 
     const activeProjectIds = new Set(listings.map(l => l.credit.project.id));
-    const availableTons = listings.reduce((sum, l) => sum + l.credit.project.tonnage, 0);
+    const availableTons = listings.reduce((sum, l) => sum + l.credit.quantity, 0);
     const totalPrice = listings.reduce((sum, l) => sum + parseFloat(l.price), 0);
     const avgPrice = totalPrice / listings.length;
 
@@ -173,7 +220,7 @@ export function Marketplace() {
 
         {/* Filters */}
         <div className="flex flex-wrap items-center gap-3 mb-8">
-          <Button variant="outline" size="sm">
+          <Button variant="outline" size="sm" onClick={() => setShowFilters(!showFilters)}>
             <Filter className="w-4 h-4 mr-2" />
             Filters
           </Button>
@@ -189,6 +236,43 @@ export function Marketplace() {
           ))}
         </div>
 
+        {showFilters && (
+          <div className="flex flex-wrap items-end gap-3 mb-8">
+            <select
+              className="h-9 rounded-md border border-gray-300 px-3 text-sm"
+              value={filterForm.ordering}
+              onChange={(e) => setFilterForm({ ...filterForm, ordering: e.target.value as ListingQuery['ordering'] })}
+            >
+              <option value="newest">Newest</option>
+              <option value="price">Price: low to high</option>
+              <option value="-price">Price: high to low</option>
+              <option value="tonnage">Tonnes: low to high</option>
+              <option value="-tonnage">Tonnes: high to low</option>
+            </select>
+            {([
+              ['min_price', 'Min price (HBAR)'], ['max_price', 'Max price (HBAR)'],
+              ['min_vintage', 'Min vintage'], ['max_vintage', 'Max vintage'],
+              ['min_tonnage', 'Min tonnes'], ['max_tonnage', 'Max tonnes'],
+            ] as [keyof ListingQuery, string][]).map(([name, label]) => (
+              <Input
+                key={name}
+                type="number"
+                placeholder={label}
+                className="w-36"
+                value={filterForm[name] || ''}
+                onChange={(e) => setFilterForm({ ...filterForm, [name]: e.target.value })}
+              />
+            ))}
+            <Input
+              placeholder="Location"
+              className="w-36"
+              value={filterForm.location || ''}
+              onChange={(e) => setFilterForm({ ...filterForm, location: e.target.value })}
+            />
+            <Button size="sm" className="bg-emerald-600 hover:bg-emerald-700 text-white" onClick={applyFilters}>Apply</Button>
+          </div>
+        )}
+
         {/* Listings Grid */}
         <div className="grid md:grid-cols-2 lg:grid-cols-4 gap-6 mb-8 min-h-[300px]">
           {isLoading ? (
@@ -205,7 +289,7 @@ export function Marketplace() {
                 <div className="bg-gray-200 h-40 flex items-center justify-center">
                   {listing.credit.project.image_cid ? (
                     <img 
-                      src={`https://ipfs.io/ipfs/${listing.credit.project.image_cid}`}
+                      src={ipfsService.contentUrl(listing.credit.project.image_cid)}
                       alt={listing.credit.project.name} 
                       className="w-full h-full object-cover"
                     />
@@ -246,7 +330,7 @@ export function Marketplace() {
                     </div>
                     <div className="flex items-center justify-between">
                       <span className="text-xs text-gray-500">Available</span>
-                      <span className="text-sm text-gray-700">{listing.credit.project.tonnage.toLocaleString()} t</span>
+                      <span className="text-sm text-gray-700">{listing.credit.quantity.toLocaleString()} t</span>
                     </div>
                   </div>
 
@@ -263,11 +347,11 @@ export function Marketplace() {
             ))
           )}
         </div>
-        {totalListingPages > 1 && (
+        {(listingsPage > 1 || hasNextListingPage) && (
           <div className="flex justify-center items-center gap-4 mt-8">
             <Button onClick={() => setListingsPage(p => Math.max(1, p - 1))} disabled={listingsPage === 1}>Previous</Button>
-            <span>Page {listingsPage} of {totalListingPages}</span>
-            <Button onClick={() => setListingsPage(p => Math.min(totalListingPages, p + 1))} disabled={listingsPage === totalListingPages}>Next</Button>
+            <span>Page {listingsPage}</span>
+            <Button onClick={handleNextListingPage} disabled={!hasNextListingPage || isLoading}>Next</Button>
           </div>
         )}
 
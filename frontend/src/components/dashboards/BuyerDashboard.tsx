@@ -1,7 +1,8 @@
 import { useEffect, useState, useMemo } from 'react';
 import { useSelector, useDispatch } from 'react-redux';
 import { RootState, AppDispatch } from '../../store';
-import { getCarbonCredits } from '../../store/carbonSlice';
+import { getCarbonCredits, PortfolioSummary } from '../../store/carbonSlice';
+import projectService from '../../services/projectService';
 import { Card } from "../ui/card";
 import { Badge } from "../ui/badge";
 import { WalletAlert } from "../WalletAlert";
@@ -14,11 +15,12 @@ import {
 
 import { useHashConnect } from "../../hooks/useHashConnect";
 import { Button } from '../ui/button';
+import ipfsService from '../../services/ipfsService';
 
 export function BuyerDashboard() {
   const dispatch = useDispatch<AppDispatch>();
   const { currentUser } = useSelector((state: RootState) => state.user);
-  const { carbonCredits } = useSelector((state: RootState) => state.carbon);
+  const { carbonCredits, carbonCreditsNext, isLoading } = useSelector((state: RootState) => state.carbon);
   const { isConnected } = useSelector((state: RootState) => state.hashconnect);
   const { connect } = useHashConnect();
 
@@ -27,9 +29,7 @@ export function BuyerDashboard() {
   useEffect(() => {
     const fetchHbarPrice = async () => {
       try {
-        const response = await fetch('https://api.coingecko.com/api/v3/simple/price?ids=hedera-hashgraph&vs_currencies=usd');
-        const data = await response.json();
-        setHbarToUsdRate(data['hedera-hashgraph'].usd);
+        setHbarToUsdRate(await projectService.getHbarUsdRate());
       } catch (error) {
         console.error('Error fetching HBAR price:', error);
       }
@@ -38,10 +38,17 @@ export function BuyerDashboard() {
     fetchHbarPrice();
   }, []);
 
+  const [summary, setSummary] = useState<PortfolioSummary | null>(null);
+
   useEffect(() => {
     if (currentUser) {
       dispatch(getCarbonCredits());
     }
+    if (currentUser?.access) {
+      projectService.getPortfolioSummary(currentUser.access)
+        .then(setSummary)
+        .catch((error) => console.error('Error fetching portfolio summary:', error));
+    }
   }, [dispatch, currentUser]);
 
   const [creditsPage, setCreditsPage] = useState(1);
@@ -59,7 +66,8 @@ export function BuyerDashboard() {
 
   const totalCreditPages = Math.ceil(myCredits.length / itemsPerPage);
 
-  const totalTonnes = myCredits.reduce((sum, credit) => sum + credit.project.tonnage, 0);
+  const totalCredits = summary ? summary.credits_owned : myCredits.length;
+  const totalTonnes = summary ? summary.tonnes_owned : myCredits.reduce((sum, credit) => sum + credit.project.tonnage, 0);
   const totalSpent = 0; // This needs to be calculated from actual purchase price, which is not stored yet.
 
 const [showFullDescription, setShowFullDescription] = useState(false);
@@ -79,7 +87,7 @@ const [showFullDescription, setShowFullDescription] = useState(false);
           <div className="flex items-center justify-between">
             <div>
               <p className="text-sm text-gray-500">Total Credits</p>
-              <p className="text-2xl text-gray-900">{myCredits.length}</p>
+              <p className="text-2xl text-gray-900">{totalCredits}</p>
             </div>
             <div className="w-12 h-12 bg-blue-100 rounded-lg flex items-center justify-center">
               <Leaf className="w-6 h-6 text-blue-600" />
@@ -113,7 +121,7 @@ const [showFullDescription, setShowFullDescription] = useState(false);
                   <div className="bg-gray-200 h-48 flex items-center justify-center">
                       {credit.project.image_cid ? (
                           <img 
-                              src={`https://ipfs.io/ipfs/${credit.project.image_cid}`}
+                              src={ipfsService.contentUrl(credit.project.image_cid)}
                               alt={credit.project.name} 
                               className="w-full h-full object-cover"
                           />
@@ -165,6 +173,11 @@ const [showFullDescription, setShowFullDescription] = useState(false);
                 <Button onClick={() => setCreditsPage(p => Math.min(totalCreditPages, p + 1))} disabled={creditsPage === totalCreditPages}>Next</Button>
               </div>
             )}
+            {carbonCreditsNext && (
+              <div className="flex justify-center mt-4">
+                <Button variant="outline" onClick={() => dispatch(getCarbonCredits(true))} disabled={isLoading}>Load more credits</Button>
+              </div>
+            )}
           </>
         )}
       </div>
@@ -1,8 +1,9 @@
 import React, { useEffect, useState, useMemo } from 'react';
 import { useSelector, useDispatch } from 'react-redux';
 import { RootState, AppDispatch } from '../../store';
-import { getProjects, addProject, getCarbonCredits, listCredit, claimProceeds, CarbonCredit, getMyListings, Listing, getActiveListings } from '../../store/carbonSlice';
+import { getProjects, addProject, getCarbonCredits, listCredit, claimProceeds, CarbonCredit, getMyListings, Listing, getActiveListings, PortfolioSummary } from '../../store/carbonSlice';
 import ipfsService from '../../services/ipfsService';
+import projectService from '../../services/projectService';
 import { Button } from '../ui/button';
 import { Card } from '../ui/card';
 import { Badge } from '../ui/badge';
@@ -23,7 +24,7 @@ import { ListingCard } from '../ListingCard';
 export function SellerDashboard() {
   const dispatch = useDispatch<AppDispatch>();
   const { currentUser } = useSelector((state: RootState) => state.user);
-  const { projects, carbonCredits, myListings, isLoading } = useSelector((state: RootState) => state.carbon);
+  const { projects, carbonCredits, myListings, projectsNext, carbonCreditsNext, myListingsNext, isLoading } = useSelector((state: RootState) => state.carbon);
   const { isConnected, accountId } = useSelector(selectHashConnect);
   const { connect } = useHashConnect();
 
@@ -32,9 +33,7 @@ export function SellerDashboard() {
   useEffect(() => {
     const fetchHbarPrice = async () => {
       try {
-        const response = await fetch('https://api.coingecko.com/api/v3/simple/price?ids=hedera-hashgraph&vs_currencies=usd');
-        const data = await response.json();
-        setHbarToUsdRate(data['hedera-hashgraph'].usd);
+        setHbarToUsdRate(await projectService.getHbarUsdRate());
       } catch (error) {
         console.error('Error fetching HBAR price:', error);
       }
@@ -65,12 +64,24 @@ export function SellerDashboard() {
   const [imageFile, setImageFile] = useState<File | null>(null);
   const [documentFile, setDocumentFile] = useState<File | null>(null);
 
+  // Totals come from the backend's portfolio counters: the lists only hold the pages loaded so far.
+  const [summary, setSummary] = useState<PortfolioSummary | null>(null);
+
+  const loadSummary = () => {
+    if (currentUser?.access) {
+      projectService.getPortfolioSummary(currentUser.access)
+        .then(setSummary)
+        .catch((error) => console.error('Error fetching portfolio summary:', error));
+    }
+  };
+
   useEffect(() => {
     if (currentUser) {
         dispatch(getProjects());
         dispatch(getCarbonCredits());
         dispatch(getMyListings());
     }
+    loadSummary();
   }, [dispatch, currentUser]);
 
   const [isDialogOpen, setIsDialogOpen] = useState(false);
@@ -141,6 +152,13 @@ const itemsPerPage = 6;
     return creditsToPaginate.slice(startIndex, startIndex + itemsPerPage);
   }, [activeCreditFilter, creditsPage, itemsPerPage, mintedCredits, myActiveListings, mySoldListings]);
 
+  const totalPending = summary ? summary.projects_pending : pendingProjects.length;
+  const totalRejected = summary ? summary.projects_rejected : rejectedProjects.length;
+  const totalProjects = summary ? summary.projects_pending + summary.projects_approved + summary.projects_rejected : myProjects.length;
+  const tonnesAvailable = summary ? summary.tonnes_available : mintedCredits.reduce((sum, c) => sum + c.quantity, 0);
+  const activeListingCount = summary ? summary.listings_active : myActiveListings.length;
+  const tonnesSold = summary ? summary.tonnes_sold : myListings.reduce((sum, l) => sum + l.quantity_sold, 0);
+
   const totalProjectPages = Math.ceil(filteredProjects.length / itemsPerPage);
   const totalCreditPages = Math.ceil(
     (activeCreditFilter === 'MINTED' ? mintedCredits.length :
@@ -193,6 +211,7 @@ const itemsPerPage = 6;
       toast.success(`Project submitted for verification!`);
 
       dispatch(getProjects());
+      loadSummary();
       setFormData({ name: '', description: '', location: '', tonnage: '', vintage: '2024' });
       setImageFile(null);
       setDocumentFile(null);
@@ -247,6 +266,7 @@ const itemsPerPage = 6;
       dispatch(getActiveListings());
       dispatch(getCarbonCredits());
       dispatch(getMyListings());
+      loadSummary();
       setIsListingOpen(false); // Close dialog on success
 
     } catch (error: any) {
@@ -297,6 +317,7 @@ const itemsPerPage = 6;
       dispatch(getActiveListings());
       dispatch(getCarbonCredits());
       dispatch(getMyListings());
+      loadSummary();
       setIsClaimingOpen(false); // Close dialog on success
 
     } catch (error: any) {
@@ -413,7 +434,7 @@ const itemsPerPage = 6;
       <div className="grid md:grid-cols-1 gap-4">
         <Card className="p-6 bg-gray-50">
           <div className="flex items-center justify-between">
-            <div><p className="text-sm text-gray-500">Credits for Sale</p><p className="text-2xl text-gray-900">{myActiveListings.length}</p></div>
+            <div><p className="text-sm text-gray-500">Credits for Sale</p><p className="text-2xl text-gray-900">{activeListingCount}</p></div>
             <div className="w-12 h-12 bg-purple-100 rounded-lg flex items-center justify-center"><ShoppingCart className="w-6 h-6 text-purple-600" /></div>
           </div>
         </Card>
@@ -437,7 +458,7 @@ const itemsPerPage = 6;
               onClick={() => setActiveProjectFilter('ALL')}
             >
               <div className="flex items-center justify-between">
-                <div><p className="text-sm text-gray-500">All Projects</p><p className="text-2xl text-gray-900">{myProjects.length}</p></div>
+                <div><p className="text-sm text-gray-500">All Projects</p><p className="text-2xl text-gray-900">{totalProjects}</p></div>
                 <div className="w-12 h-12 bg-blue-100 rounded-lg flex items-center justify-center"><Leaf className="w-6 h-6 text-blue-600" /></div>
               </div>
             </Card>
@@ -446,7 +467,7 @@ const itemsPerPage = 6;
               onClick={() => setActiveProjectFilter('PENDING')}
             >
               <div className="flex items-center justify-between">
-                <div><p className="text-sm text-gray-500">Pending Projects</p><p className="text-2xl text-gray-900">{pendingProjects.length}</p></div>
+                <div><p className="text-sm text-gray-500">Pending Projects</p><p className="text-2xl text-gray-900">{totalPending}</p></div>
                 <div className="w-12 h-12 bg-yellow-100 rounded-lg flex items-center justify-center"><Clock className="w-6 h-6 text-yellow-600" /></div>
               </div>
             </Card>
@@ -455,7 +476,7 @@ const itemsPerPage = 6;
               onClick={() => setActiveProjectFilter('REJECTED')}
             >
               <div className="flex items-center justify-between">
-                <div><p className="text-sm text-gray-500">Rejected Projects</p><p className="text-2xl text-gray-900">{rejectedProjects.length}</p></div>
+                <div><p className="text-sm text-gray-500">Rejected Projects</p><p className="text-2xl text-gray-900">{totalRejected}</p></div>
                 <div className="w-12 h-12 bg-red-100 rounded-lg flex items-center justify-center"><XCircle className="w-6 h-6 text-red-600" /></div>
               </div>
             </Card>
@@ -478,6 +499,11 @@ const itemsPerPage = 6;
               <Button onClick={() => setProjectsPage(p => Math.min(totalProjectPages, p + 1))} disabled={projectsPage === totalProjectPages}>Next</Button>
             </div>
           )}
+          {projectsNext && (
+            <div className="flex justify-center mt-4">
+              <Button variant="outline" onClick={() => dispatch(getProjects(true))} disabled={isLoading}>Load more projects</Button>
+            </div>
+          )}
         </TabsContent>
         <TabsContent value="credits" className="space-y-4">
           
@@ -488,7 +514,7 @@ const itemsPerPage = 6;
               onClick={() => setActiveCreditFilter('MINTED')}
             >
               <div className="flex items-center justify-between">
-                <div><p className="text-sm text-gray-500">Available Credits</p><p className="text-2xl text-gray-900">{mintedCredits.length}</p></div>
+                <div><p className="text-sm text-gray-500">Available Credits</p><p className="text-2xl text-gray-900">{tonnesAvailable.toLocaleString()} t</p></div>
                 <div className="w-12 h-12 bg-blue-100 rounded-lg flex items-center justify-center"><Leaf className="w-6 h-6 text-blue-600" /></div>
               </div>
             </Card>
@@ -497,7 +523,7 @@ const itemsPerPage = 6;
               onClick={() => setActiveCreditFilter('LISTED')}
             >
               <div className="flex items-center justify-between">
-                <div><p className="text-sm text-gray-500">Credits for Sale</p><p className="text-2xl text-gray-900">{myActiveListings.length}</p></div>
+                <div><p className="text-sm text-gray-500">Credits for Sale</p><p className="text-2xl text-gray-900">{activeListingCount}</p></div>
                 <div className="w-12 h-12 bg-yellow-100 rounded-lg flex items-center justify-center"><ShoppingCart className="w-6 h-6 text-yellow-600" /></div>
               </div>
             </Card>
@@ -506,7 +532,7 @@ const itemsPerPage = 6;
               onClick={() => setActiveCreditFilter('SOLD')}
             >
               <div className="flex items-center justify-between">
-                <div><p className="text-sm text-gray-500">Sold Credits</p><p className="text-2xl text-gray-900">{mySoldListings.length}</p></div>
+                <div><p className="text-sm text-gray-500">Sold Credits</p><p className="text-2xl text-gray-900">{tonnesSold.toLocaleString()} t</p></div>
                 <div className="w-12 h-12 bg-gray-100 rounded-lg flex items-center justify-center"><Check className="w-6 h-6 text-gray-600" /></div>
               </div>
             </Card>
@@ -531,6 +557,17 @@ const itemsPerPage = 6;
                 <Button onClick={() => setCreditsPage(p => Math.min(totalCreditPages, p + 1))} disabled={creditsPage === totalCreditPages}>Next</Button>
               </div>
             )}
+          {(activeCreditFilter === 'MINTED' ? carbonCreditsNext : myListingsNext) && (
+            <div className="flex justify-center mt-4">
+              <Button
+                variant="outline"
+                onClick={() => dispatch(activeCreditFilter === 'MINTED' ? getCarbonCredits(true) : getMyListings(true))}
+                disabled={isLoading}
+              >
+                Load more credits
+              </Button>
+            </div>
+          )}
         </TabsContent>
       </Tabs>
     </div>
@@ -554,7 +591,7 @@ const ProjectCard = React.memo(({ project }: { project: any }) => {
             <div className="bg-gray-200 h-48 flex items-center justify-center">
                 {project.image_cid ? (
                     <img 
-                        src={`https://ipfs.io/ipfs/${project.image_cid}`}
+                        src={ipfsService.contentUrl(project.image_cid)}
                         alt={project.name} 
                         className="w-full h-full object-cover"
                     />
@@ -630,7 +667,7 @@ const CreditCard = React.memo(({ credit, listingId, onOpenListingDialog, onOpenC
 
                         <img 
 
-                            src={`https://ipfs.io/ipfs/${credit.project.image_cid}`}
+                            src={ipfsService.contentUrl(credit.project.image_cid)}
 
                             alt={credit.project.name} 
 
@@ -658,7 +695,7 @@ const CreditCard = React.memo(({ credit, listingId, onOpenListingDialog, onOpenC
 
                                 credit.status === 'MINTED' ? 'bg-blue-100 text-blue-700' :
 
-                                credit.status === 'LISTED' ? 'bg-yellow-100 text-yellow-700' :
+                                credit.status === 'LISTED' || credit.status === 'RESERVED' ? 'bg-yellow-100 text-yellow-700' :
 
                                 'bg-gray-100 text-gray-700'
 
@@ -13,11 +13,12 @@ import { Label } from '../ui/label';
 import { CheckCircle, XCircle, TrendingUp, Calendar, MapPin, Clock, FileText, Loader2 } from 'lucide-react';
 import { toast } from 'sonner';
 import { VerificationProgress } from '../VerificationProgress';
+import ipfsService from '../../services/ipfsService';
 
 export function VerifierDashboard() {
   const dispatch = useDispatch<AppDispatch>();
   const { currentUser } = useSelector((state: RootState) => state.user);
-  const { projects, isLoading } = useSelector((state: RootState) => state.carbon);
+  const { projects, projectsNext, isLoading } = useSelector((state: RootState) => state.carbon);
 
   const [activeFilter, setActiveFilter] = useState<'PENDING' | 'APPROVED' | 'REJECTED'>('PENDING');
 
@@ -198,7 +199,7 @@ export function VerifierDashboard() {
                 <div className="bg-gray-200 h-48 flex items-center justify-center">
                     {project.image_cid ? (
                         <img 
-                            src={`https://ipfs.io/ipfs/${project.image_cid}`}
+                            src={ipfsService.contentUrl(project.image_cid)}
                             alt={project.name} 
                             className="w-full h-full object-cover"
                         />
@@ -210,7 +211,7 @@ export function VerifierDashboard() {
                     <div>
                         <div className="flex items-start justify-between mb-2">
                             <h3 className="text-xl text-gray-900 mb-2">{project.name}</h3>
-                            <a href={`https://ipfs.io/ipfs/${project.document_cid}`} target="_blank" rel="noopener noreferrer">
+                            <a href={ipfsService.contentUrl(project.document_cid)} target="_blank" rel="noopener noreferrer">
                               <Button variant="outline" size="sm">
                                 <FileText className="w-4 h-4 mr-2" />
                                 Document
@@ -274,6 +275,11 @@ export function VerifierDashboard() {
           <Button onClick={() => setProjectsPage(p => Math.min(totalProjectPages, p + 1))} disabled={projectsPage === totalProjectPages}>Next</Button>
         </div>
       )}
+      {projectsNext && (
+        <div className="flex justify-center mt-4">
+          <Button variant="outline" onClick={() => dispatch(getVerifierDashboardProjects(true))} disabled={isLoading}>Load more projects</Button>
+        </div>
+      )}
 
       {/* Verification Dialog */}
       <Dialog open={dialogOpen} onOpenChange={setDialogOpen}>
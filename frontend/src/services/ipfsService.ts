@@ -70,9 +70,13 @@ const uploadFileToIpfs = async (file: File): Promise<string> => {
   }
 };
 
+// Content is served by the backend's verified IPFS cache rather than a public gateway.
+const contentUrl = (cid?: string): string => `http://127.0.0.1:8000/api/ipfs/${cid}/`;
+
 const ipfsService = {
   uploadJsonToIpfs,
   uploadFileToIpfs,
+  contentUrl,
 };
 
 export default ipfsService;
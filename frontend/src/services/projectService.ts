@@ -2,34 +2,57 @@ import axios from 'axios';
 
 const API_BASE_URL = 'http://127.0.0.1:8000/api';
 
-const getProjects = async (token: string) => {
+// List endpoints are cursor-paginated: { next, previous, results }. Dashboards load one
+// page at a time and pass the `next` link back to load the following one.
+const PAGE_SIZE = 50;
+
+export interface Page<T = any> {
+  results: T[];
+  next: string | null;
+}
+
+const fetchPage = async (url: string, config: any, next?: string | null, params: Record<string, any> = {}): Promise<Page> => {
+  // `next` links already carry the page size and query parameters.
+  const response = await axios.get(next || url, next ? config : { ...config, params: { page_size: PAGE_SIZE, ...params } });
+  return { results: response.data.results, next: response.data.next };
+};
+
+// Filters and sort order of the public listings feed, applied by the backend's ListingFilterBackend.
+export interface ListingQuery {
+  ordering?: 'newest' | 'price' | '-price' | 'tonnage' | '-tonnage';
+  min_price?: string;
+  max_price?: string;
+  min_vintage?: string;
+  max_vintage?: string;
+  min_tonnage?: string;
+  max_tonnage?: string;
+  location?: string;
+  project_status?: string;
+  seller?: string;
+}
+
+const getProjects = async (token: string, next?: string | null) => {
   const config = {
     headers: {
       Authorization: `Bearer ${token}`,
     },
   };
-  const response = await axios.get(`${API_BASE_URL}/projects/my-projects/`, config);
-  return response.data;
+  return fetchPage(`${API_BASE_URL}/projects/my-projects/`, config, next);
 };
 
-const getActiveListings = async (token?: string) => {
-  const config = token ? {
-    headers: {
-      Authorization: `Bearer ${token}`,
-    },
-  } : {};
-  const response = await axios.get(`${API_BASE_URL}/listings/`, config);
-  return response.data;
+const getActiveListings = async (query: ListingQuery = {}, pageSize = PAGE_SIZE, next?: string | null) => {
+  // Empty filters are left out of the query string.
+  const params = Object.fromEntries(Object.entries(query).filter(([, value]) => value));
+  return fetchPage(`${API_BASE_URL}/listings/`, {}, next, { ...params, page_size: pageSize });
 };
 
-const getVerifierDashboardProjects = async (token: string) => {
+const getVerifierDashboardProjects = async (token: string, next?: string | null) => {
   const config = {
     headers: {
       Authorization: `Bearer ${token}`,
     },
   };
-  const response = await axios.get(`${API_BASE_URL}/projects/verifier-dashboard/`, config);
-  return response.data;
+  return fetchPage(`${API_BASE_URL}/projects/verifier-dashboard/`, config, next);
 };
 
 const addProject = async (projectData: any, token: string) => {
@@ -42,14 +65,13 @@ const addProject = async (projectData: any, token: string) => {
   return response.data;
 };
 
-const getCarbonCredits = async (token: string) => {
+const getCarbonCredits = async (token: string, next?: string | null) => {
   const config = {
     headers: {
       Authorization: `Bearer ${token}`,
     },
   };
-  const response = await axios.get(`${API_BASE_URL}/nfts/my-nfts/`, config);
-  return response.data;
+  return fetchPage(`${API_BASE_URL}/nfts/my-nfts/`, config, next);
 };
 
 const listCredit = async (listingData: { credit: number; price: number }, token: string) => {
@@ -72,16 +94,54 @@ const claimProceeds = async (listingId: number, token: string) => {
   return response.data;
 };
 
-const getMyListings = async (token: string) => {
+const getMyListings = async (token: string, next?: string | null) => {
   const config = {
     headers: {
       Authorization: `Bearer ${token}`,
     },
   };
-  const response = await axios.get(`${API_BASE_URL}/listings/my-listings/`, config);
+  return fetchPage(`${API_BASE_URL}/listings/my-listings/`, config, next);
+};
+
+// Dashboard totals of the logged-in user, from the backend's denormalized counters.
+const getPortfolioSummary = async (token: string) => {
+  const config = {
+    headers: {
+      Authorization: `Bearer ${token}`,
+    },
+  };
+  const response = await axios.get(`${API_BASE_URL}/portfolio/summary/`, config);
   return response.data;
 };
 
+// HBAR/USD rate stored by the backend's `refresh_prices` command.
+const getHbarUsdRate = async () => {
+  const response = await axios.get(`${API_BASE_URL}/prices/hbar-usd/`);
+  return parseFloat(response.data.rate);
+};
+
+// Marketplace events pushed by the backend as they happen (listing-created, listing-sold,
+// listing-withdrawn, project-approved, and `reset` when more was missed than can be replayed).
+// `filters` narrows them: events, project, seller, vintage. Returns a function that closes the stream.
+// Event ids remembered to drop the repeats a reconnect replays (see the backend README).
+const SEEN_EVENTS = 1000;
+
+const subscribeMarketplace = (onEvent: (type: string, data: any) => void, filters: Record<string, string> = {}) => {
+  const source = new EventSource(`${API_BASE_URL}/stream/marketplace/?${new URLSearchParams(filters)}`);
+  const seen = new Set<string>();
+  ['listing-created', 'listing-sold', 'listing-withdrawn', 'project-approved'].forEach((type) => {
+    source.addEventListener(type, (event) => {
+      const { lastEventId, data } = event as MessageEvent;
+      if (seen.has(lastEventId)) return;
+      seen.add(lastEventId);
+      if (seen.size > SEEN_EVENTS) seen.delete(seen.values().next().value as string);
+      onEvent(type, JSON.parse(data));
+    });
+  });
+  source.addEventListener('reset', (event) => onEvent('reset', JSON.parse((event as MessageEvent).data)));
+  return () => source.close();
+};
+
 const projectService = {
   getProjects,
   getActiveListings,
@@ -91,6 +151,9 @@ const projectService = {
   listCredit,
   claimProceeds,
   getMyListings,
+  getHbarUsdRate,
+  getPortfolioSummary,
+  subscribeMarketplace,
 };
 
 export default projectService;
\ No newline at end of file
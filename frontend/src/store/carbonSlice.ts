@@ -1,7 +1,7 @@
 import { createSlice, createAsyncThunk, PayloadAction } from '@reduxjs/toolkit';
 import {TokenId, AccountId, TransferTransaction, ContractExecuteTransaction, ContractFunctionParameters, NftId, Hbar } from '@hashgraph/sdk';
 import type { RootState } from './index';
-import projectService from '../services/projectService';
+import projectService, { ListingQuery, Page } from '../services/projectService';
 import escrowService from '../services/escrowService';
 import nftService from '../services/nftService';
 import { getHashConnect } from '../services/hashconnect';
@@ -10,7 +10,7 @@ import { useSelector } from 'react-redux';
 
 // Types should ideally be in a separate types file
 export type ProjectStatus = 'PENDING' | 'APPROVED' | 'REJECTED';
-export type CreditStatus = 'MINTED' | 'LISTED' | 'SOLD';
+export type CreditStatus = 'MINTED' | 'LISTED' | 'RESERVED' | 'SOLD';
 
 
 
@@ -37,6 +37,7 @@ export interface CarbonCredit {
   owner: any;
   hedera_token_id: string;
   serial_number: number;
+  quantity: number; // Tonnes in this lot
   status: CreditStatus;
   created_at: string;
 
@@ -47,16 +48,37 @@ export interface Listing {
     seller: any;
     credit: CarbonCredit;
     price: string;
+    price_usd?: string | null; // Price per tonne in USD at the backend's stored HBAR/USD rate
     is_active: boolean;
     claimed: boolean; // Added to track if proceeds have been claimed
+    quantity_sold: number; // Tonnes bought from this listing so far
     created_at: string;
 }
 
+export interface PortfolioSummary {
+    projects_pending: number;
+    projects_approved: number;
+    projects_rejected: number;
+    credits_owned: number;
+    tonnes_owned: number;
+    tonnes_available: number;
+    listings_active: number;
+    tonnes_listed: number;
+    tonnes_sold: number;
+    proceeds_unclaimed: string;
+    updated_at: string;
+}
+
 interface CarbonState {
   projects: Project[];
   carbonCredits: CarbonCredit[];
   listings: Listing[]; // For public marketplace
   myListings: Listing[]; // For seller dashboard
+  // Links to the next page of the lists above that are loaded page by page (null: all loaded)
+  listingsNext: string | null;
+  projectsNext: string | null;
+  carbonCreditsNext: string | null;
+  myListingsNext: string | null;
   isLoading: boolean;
   isError: boolean;
   message: string;
@@ -67,6 +89,10 @@ const initialState: CarbonState = {
   carbonCredits: [],
   listings: [],
   myListings: [],
+  listingsNext: null,
+  projectsNext: null,
+  carbonCreditsNext: null,
+  myListingsNext: null,
   isLoading: false,
   isError: false,
   message: '',
@@ -75,14 +101,15 @@ const initialState: CarbonState = {
 // ASYNC THUNKS
 export const getProjects = createAsyncThunk(
   'carbon/getProjects',
-  async (_, thunkAPI) => {
+  // Loads the first page, or the next one with `more`.
+  async (more: boolean | void, thunkAPI) => {
     try {
       const state = thunkAPI.getState() as RootState;
       const token = state.user.currentUser?.access;
       if (!token) {
         return thunkAPI.rejectWithValue('User not authenticated');
       }
-      return await projectService.getProjects(token);
+      return await projectService.getProjects(token, more ? state.carbon.projectsNext : null);
     } catch (error: any) {
       const message = (error.response && error.response.data && error.response.data.message) || error.message || error.toString();
       return thunkAPI.rejectWithValue(message);
@@ -90,11 +117,20 @@ export const getProjects = createAsyncThunk(
   }
 );
 
+interface ListingsRequest {
+  query?: ListingQuery;
+  pageSize?: number;
+  more?: boolean;
+}
+
 export const getActiveListings = createAsyncThunk(
   'carbon/getActiveListings',
-  async (_, thunkAPI) => {
+  // Loads the first page for `query`, or the next page of the last query with `more`.
+  async (options: ListingsRequest | void, thunkAPI) => {
     try {
-      return await projectService.getActiveListings();
+      const state = thunkAPI.getState() as RootState;
+      const { query, pageSize, more }: ListingsRequest = options || {};
+      return await projectService.getActiveListings(query, pageSize, more ? state.carbon.listingsNext : null);
     } catch (error: any) {
       const message = (error.response && error.response.data && error.response.data.message) || error.message || error.toString();
       return thunkAPI.rejectWithValue(message);
@@ -104,14 +140,15 @@ export const getActiveListings = createAsyncThunk(
 
 export const getCarbonCredits = createAsyncThunk(
   'carbon/getCarbonCredits',
-  async (_, thunkAPI) => {
+  // Loads the first page, or the next one with `more`.
+  async (more: boolean | void, thunkAPI) => {
     try {
       const state = thunkAPI.getState() as RootState;
       const token = state.user.currentUser?.access;
       if (!token) {
         return thunkAPI.rejectWithValue('User not authenticated');
       }
-      return await projectService.getCarbonCredits(token);
+      return await projectService.getCarbonCredits(token, more ? state.carbon.carbonCreditsNext : null);
     } catch (error: any) {
       const message = (error.response && error.response.data && error.response.data.message) || error.message || error.toString();
       return thunkAPI.rejectWithValue(message);
@@ -121,14 +158,15 @@ export const getCarbonCredits = createAsyncThunk(
 
 export const getMyListings = createAsyncThunk(
   'carbon/getMyListings',
-  async (_, thunkAPI) => {
+  // Loads the first page, or the next one with `more`.
+  async (more: boolean | void, thunkAPI) => {
     try {
       const state = thunkAPI.getState() as RootState;
       const token = state.user.currentUser?.access;
       if (!token) {
         return thunkAPI.rejectWithValue('User not authenticated');
       }
-      return await projectService.getMyListings(token);
+      return await projectService.getMyListings(token, more ? state.carbon.myListingsNext : null);
     } catch (error: any) {
       const message = (error.response && error.response.data && error.response.data.message) || error.message || error.toString();
       return thunkAPI.rejectWithValue(message);
@@ -282,7 +320,8 @@ export const buyCredit = createAsyncThunk(
 
 export const getVerifierDashboardProjects = createAsyncThunk(
   'carbon/getVerifierDashboardProjects',
-  async (_, thunkAPI) => {
+  // Loads the first page, or the next one with `more`.
+  async (more: boolean | void, thunkAPI) => {
     try {
       const state = thunkAPI.getState() as RootState;
       const token = state.user.currentUser?.access;
@@ -290,7 +329,7 @@ export const getVerifierDashboardProjects = createAsyncThunk(
       if (!token) {
         return thunkAPI.rejectWithValue('User not authenticated');
       }
-      return await projectService.getVerifierDashboardProjects(token);
+      return await projectService.getVerifierDashboardProjects(token, more ? state.carbon.projectsNext : null);
     } catch (error: any) {
       const message = (error.response && error.response.data && error.response.data.message) || error.message || error.toString();
       return thunkAPI.rejectWithValue(message);
@@ -325,9 +364,11 @@ const carbonSlice = createSlice({
   extraReducers: (builder) => {
     builder
       .addCase(getProjects.pending, (state) => { state.isLoading = true; })
-      .addCase(getProjects.fulfilled, (state, action: PayloadAction<Project[]>) => {
+      .addCase(getProjects.fulfilled, (state, action) => {
         state.isLoading = false;
-        state.projects = action.payload;
+        const page = action.payload as Page<Project>;
+        state.projects = action.meta.arg ? [...state.projects, ...page.results] : page.results;
+        state.projectsNext = page.next;
       })
       .addCase(getProjects.rejected, (state, action) => {
         state.isLoading = false;
@@ -335,9 +376,11 @@ const carbonSlice = createSlice({
         state.message = action.payload as string;
       })
       .addCase(getActiveListings.pending, (state) => { state.isLoading = true; })
-      .addCase(getActiveListings.fulfilled, (state, action: PayloadAction<Listing[]>) => {
+      .addCase(getActiveListings.fulfilled, (state, action) => {
         state.isLoading = false;
-        state.listings = action.payload;
+        const page = action.payload as Page<Listing>;
+        state.listings = action.meta.arg && action.meta.arg.more ? [...state.listings, ...page.results] : page.results;
+        state.listingsNext = page.next;
       })
       .addCase(getActiveListings.rejected, (state, action) => {
         state.isLoading = false;
@@ -345,9 +388,11 @@ const carbonSlice = createSlice({
         state.message = action.payload as string;
       })
       .addCase(getMyListings.pending, (state) => { state.isLoading = true; })
-      .addCase(getMyListings.fulfilled, (state, action: PayloadAction<Listing[]>) => {
+      .addCase(getMyListings.fulfilled, (state, action) => {
         state.isLoading = false;
-        state.myListings = action.payload;
+        const page = action.payload as Page<Listing>;
+        state.myListings = action.meta.arg ? [...state.myListings, ...page.results] : page.results;
+        state.myListingsNext = page.next;
       })
       .addCase(getMyListings.rejected, (state, action) => {
         state.isLoading = false;
@@ -356,9 +401,11 @@ const carbonSlice = createSlice({
       })
 
       .addCase(getCarbonCredits.pending, (state) => { state.isLoading = true; })
-      .addCase(getCarbonCredits.fulfilled, (state, action: PayloadAction<CarbonCredit[]>) => {
+      .addCase(getCarbonCredits.fulfilled, (state, action) => {
         state.isLoading = false;
-        state.carbonCredits = action.payload;
+        const page = action.payload as Page<CarbonCredit>;
+        state.carbonCredits = action.meta.arg ? [...state.carbonCredits, ...page.results] : page.results;
+        state.carbonCreditsNext = page.next;
       })
       .addCase(getCarbonCredits.rejected, (state, action) => {
         state.isLoading = false;
@@ -405,9 +452,11 @@ const carbonSlice = createSlice({
       .addCase(getVerifierDashboardProjects.pending, (state) => {
         state.isLoading = true;
       })
-      .addCase(getVerifierDashboardProjects.fulfilled, (state, action: PayloadAction<Project[]>) => {
+      .addCase(getVerifierDashboardProjects.fulfilled, (state, action) => {
         state.isLoading = false;
-        state.projects = action.payload;
+        const page = action.payload as Page<Project>;
+        state.projects = action.meta.arg ? [...state.projects, ...page.results] : page.results;
+        state.projectsNext = page.next;
       })
       .addCase(getVerifierDashboardProjects.rejected, (state, action) => {
         state.isLoading = false;